@@ -4,6 +4,7 @@ from app.models.cliente_model import ClienteModel
 from app.models.fornecedor_model import FornecedorModel
 from app.views.cli_view import CLIView
 from app.models.relatorio_model import RelatorioModel
+from app.models.database import DataAccessError
 from datetime import datetime
 from decimal import Decimal
 
@@ -32,22 +33,26 @@ class Controller:
         """
         while True:
             choice = self.view.show_main_menu()
-            if choice == '1': self.product_management()
-            elif choice == '2': self.sales_management()
-            elif choice == '3': self.customer_management()
-            elif choice == '4': self.supplier_management()
-            elif choice == '5': self.reports_management()
-            elif choice == '0': self.view.show_message("Saindo do sistema. Até logo!"); break
-            else: self.view.show_message("Opção inválida. Tente novamente.")
+            try:
+                if choice == '1': self.product_management()
+                elif choice == '2': self.sales_management()
+                elif choice == '3': self.customer_management()
+                elif choice == '4': self.supplier_management()
+                elif choice == '5': self.reports_management()
+                elif choice == '0': self.view.show_message("Saindo do sistema. Até logo!"); break
+                else: self.view.show_message("Opção inválida. Tente novamente.")
+            except DataAccessError as e:
+                # Banco fora do ar ou tempo limite excedido: mostra o erro real em vez de uma lista vazia
+                self.view.show_message(str(e))
 
     def product_management(self):
         """
         Gerencia o submenu de produtos. Permite ao usuário listar, criar,
-        atualizar estoque, filtrar produtos e buscar por ID.
+        atualizar estoque, filtrar produtos, buscar por ID e por palavras.
         """
         while True:
             choice = self.view.show_product_menu()
-            if choice == '1': self.view.show_products(self.produto_model.get_all())
+            if choice == '1': self._show_pages(self.produto_model.get_page, self.view.show_products)
             elif choice == '2':
                 # Coleta os detalhes do novo produto e o cria no banco
                 details = self.view.get_product_details()
@@ -64,18 +69,29 @@ class Controller:
                 produtos = self.produto_model.get_by_category(categoria)
                 self.view.show_products(produtos)
             elif choice == '5':
-                # Busca produto por ID
+                # Busca produtos por ID (um ou vários, separados por vírgula) em uma única consulta
                 try:
-                    pid = self.view.get_product_id()
-
-                    produto = self.produto_model.get_by_id(pid)
-                    if produto:
-                        # Reaproveita o método de exibição (lista com um item)
-                        self.view.show_products([produto])
-                    else:
-                        self.view.show_message(f"Produto com ID {pid} não encontrado.")
+                    texto = self.view.get_product_id()
+                    if not texto:
+                        continue
+                    ids = [int(i) for i in texto.replace(",", " ").split()]
+                    produtos = self.produto_model.get_by_ids(ids)
+                    encontrados = [produtos[i] for i in dict.fromkeys(ids) if i in produtos]
+                    faltando = [str(i) for i in dict.fromkeys(ids) if i not in produtos]
+                    if encontrados:
+                        self.view.show_products(encontrados)
+                    if faltando:
+                        self.view.show_message(f"Produto(s) com ID {', '.join(faltando)} não encontrado(s).")
+                except ValueError:
+                    self.view.show_message("IDs de produto devem ser números inteiros.")
                 except Exception as e:
                     self.view.show_message(f"Erro ao buscar produto por ID: {e}")
+            elif choice == '6':
+                # Busca por palavras, dos produtos mais relevantes para os menos, paginada
+                termos = self.view.get_search_terms()
+                if termos:
+                    self._show_pages(lambda page_size, cursor: self.produto_model.search_text(termos, page_size, cursor),
+                                     self.view.show_products)
             elif choice == '9': break
             else: self.view.show_message("Opção inválida.")
 
@@ -130,14 +146,8 @@ class Controller:
                 choice = input("Escolha: ").strip()
 
             if choice == "1":
-                rows = self.venda_model.get_all()
-                # reutiliza a mesma exibição que o view providenciar (se existir) ou imprime simples
-                if hasattr(self.view, "print_sales_rows"):
-                    self.view.print_sales_rows(rows)
-                else:
-                    print("\n--- Todas as Vendas ---")
-                    for r in rows:
-                        print(r)
+                # Uma página por vez, das vendas mais recentes para as mais antigas
+                self._show_pages(self.venda_model.get_page, self._show_sales_page)
             elif choice == "2":
                 # registrar venda via CLI (usa métodos da view se existirem)
                 try:
@@ -158,27 +168,8 @@ class Controller:
                 try:
                     inicio = self.view.get_input("Data de início (YYYY-MM-DD): ") if hasattr(self.view, "get_input") else input("Data de início (YYYY-MM-DD): ")
                     fim = self.view.get_input("Data de fim (YYYY-MM-DD): ") if hasattr(self.view, "get_input") else input("Data de fim (YYYY-MM-DD): ")
-                    raw = self.venda_model.get_by_period(inicio.strip(), fim.strip())
-                    sanitized = []
-                    for row in raw or []:
-                        if not row:
-                            continue
-                        new_row = []
-                        for v in row:
-                            if isinstance(v, datetime):
-                                new_row.append(v.strftime("%Y-%m-%d %H:%M:%S"))
-                            elif isinstance(v, Decimal):
-                                new_row.append(float(v))
-                            elif v is None:
-                                new_row.append("")
-                            else:
-                                new_row.append(v)
-                        # Se model retornou (id, produto, categoria, cliente, qtd, total, data) mapeia para exibição
-                        if len(new_row) == 7:
-                            mapped = (new_row[0], new_row[1], new_row[3], new_row[4], new_row[5], new_row[6])
-                        else:
-                            mapped = tuple(new_row)
-                        sanitized.append(mapped)
+                    raw = self.venda_model.iter_by_period(inicio.strip(), fim.strip())
+                    sanitized = (self._sanitize_sale_row(row) for row in raw if row)
 
                     if hasattr(self.view, "print_sales_rows"):
                         self.view.print_sales_rows(sanitized)
@@ -193,13 +184,49 @@ class Controller:
             else:
                 print("Opção inválida. Tente novamente.")
 
+    def _show_pages(self, get_page, show):
+        """
+        Exibe uma listagem paginada: busca uma página com get_page(page_size, cursor),
+        mostra com show(linhas) e pergunta se segue para a próxima, até a última.
+        """
+        cursor = None
+        while True:
+            rows, cursor = get_page(None, cursor)
+            show(rows)
+            if cursor is None or not self.view.ask_next_page():
+                break
+
+    def _show_sales_page(self, rows):
+        """Exibe uma página de vendas de get_page, descartando a coluna de categoria."""
+        self.view.show_sales([(r[0], r[1], r[3], r[4], r[5], r[6]) for r in rows])
+
+    def _sanitize_sale_row(self, row):
+        """
+        Converte Decimal -> float, datetime -> str e None -> "" numa linha de venda e,
+        se o model retornou (id, produto, categoria, cliente, qtd, total, data),
+        descarta a categoria para exibição.
+        """
+        new_row = []
+        for v in row:
+            if isinstance(v, datetime):
+                new_row.append(v.strftime("%Y-%m-%d %H:%M:%S"))
+            elif isinstance(v, Decimal):
+                new_row.append(float(v))
+            elif v is None:
+                new_row.append("")
+            else:
+                new_row.append(v)
+        if len(new_row) == 7:
+            return (new_row[0], new_row[1], new_row[3], new_row[4], new_row[5], new_row[6])
+        return tuple(new_row)
+
     def customer_management(self):
         """
         Gerencia o submenu de clientes. Permite ao usuário listar e cadastrar novos clientes.
         """
         while True:
             choice = self.view.show_customer_menu()
-            if choice == '1': self.view.show_customers(self.cliente_model.get_all())
+            if choice == '1': self._show_pages(self.cliente_model.get_page, self.view.show_customers)
             elif choice == '2':
                 details = self.view.get_customer_details()
                 new_id = self.cliente_model.create(*details)
@@ -213,7 +240,7 @@ class Controller:
         """
         while True:
             choice = self.view.show_supplier_menu()
-            if choice == '1': self.view.show_suppliers(self.fornecedor_model.get_all())
+            if choice == '1': self._show_pages(self.fornecedor_model.get_page, self.view.show_suppliers)
             elif choice == '2':
                 details = self.view.get_supplier_details()
                 new_id = self.fornecedor_model.create(*details)
@@ -26,8 +26,8 @@ class GuiController:
         return self.produto_model.get_all()
 
     def list_sales(self):
-        """Retorna uma lista de todas as vendas."""
-        return self.venda_model.get_all()
+        """Retorna um gerador com todas as vendas (streaming, memória constante)."""
+        return self.venda_model.iter_all()
 
     def list_customers(self):
         """Retorna uma lista de todos os clientes."""
@@ -36,6 +36,24 @@ class GuiController:
     def list_suppliers(self):
         """Retorna uma lista de todos os fornecedores."""
         return self.fornecedor_model.get_all()
+
+    # --- Listagens paginadas: retornam (linhas, cursor da próxima página ou None) ---
+    def list_products_page(self, cursor=None, page_size=None):
+        """Uma página de produtos; passe o cursor devolvido para buscar a seguinte."""
+        return self.produto_model.get_page(page_size, cursor)
+
+    def list_sales_page(self, cursor=None, page_size=None):
+        """Uma página de vendas (mais recentes primeiro) no formato da aba Vendas, sem a categoria."""
+        rows, next_cursor = self.venda_model.get_page(page_size, cursor)
+        return [(r[0], r[1], r[3], r[4], r[5], r[6]) for r in rows], next_cursor
+
+    def list_customers_page(self, cursor=None, page_size=None):
+        """Uma página de clientes."""
+        return self.cliente_model.get_page(page_size, cursor)
+
+    def list_suppliers_page(self, cursor=None, page_size=None):
+        """Uma página de fornecedores."""
+        return self.fornecedor_model.get_page(page_size, cursor)
     
     def get_estoque_critico(self):
         """Retorna produtos com estoque crítico."""
@@ -58,8 +76,8 @@ class GuiController:
         return self.relatorio_model.get_produtos_status_critico()
 
     def get_relatorio_vendas_completo(self):
-        """Retorna o relatório de vendas com produto, categoria e data."""
-        return self.venda_model.get_all()
+        """Retorna o relatório de vendas com produto, categoria e data (gerador)."""
+        return self.venda_model.iter_all()
 
     def get_produtos_estoque_alto(self):
         """Retorna produtos com estoque > 5, ordenados."""
@@ -89,9 +107,11 @@ class GuiController:
         except Exception as e:
             return False, f"Erro ao adicionar produto: {e}"
 
-    def add_sale(self, id_produto, id_cliente, quantidade, data_venda=""):
+    def add_sale(self, id_produto, id_cliente, quantidade, data_venda="", idempotency_key=None):
         """
         Registra uma nova venda. data_venda é opcional (string ISO); se vazio usa NOW().
+        idempotency_key (opcional) identifica a requisição: repetir a chamada com a mesma
+        chave (ex.: após um tempo limite) não registra a venda duas vezes.
         Retorna (bool, mensagem).
         """
         try:
@@ -101,7 +121,8 @@ class GuiController:
             cid = int(id_cliente)
             qtd = int(quantidade)
 
-            new_id, message = self.venda_model.register_sale(pid, cid, qtd, data_venda.strip() or None)
+            new_id, message = self.venda_model.register_sale(pid, cid, qtd, data_venda.strip() or None,
+                                                             idempotency_key=idempotency_key)
             if new_id is None:
                 return False, message
             return True, message
@@ -190,29 +211,40 @@ class GuiController:
 
     # --- Novos métodos para suportar buscas na GUI ---
     def get_product_by_id(self, product_id):
-        """Retorna lista com o produto (ou vazia) para popular a tree da GUI."""
+        """
+        Retorna lista com os produtos encontrados (ou vazia) para popular a tree da GUI.
+        Aceita vários IDs separados por vírgula ou espaço, buscados em uma única consulta.
+        """
         if not product_id:
             return []
         try:
-            prod = self.produto_model.get_by_id(int(product_id))
-            return [prod] if prod else []
-        except Exception:
+            ids = [int(i) for i in product_id.replace(",", " ").split()]
+        except ValueError:
             return []
+        produtos = self.produto_model.get_by_ids(ids)
+        return [produtos[i] for i in dict.fromkeys(ids) if i in produtos]
+
+    def search_products(self, termos, cursor=None, page_size=None):
+        """
+        Busca por palavras no nome e na categoria, dos produtos mais relevantes para os
+        menos. Retorna (linhas, cursor da próxima página ou None), como list_products_page.
+        """
+        return self.produto_model.search_text(termos, page_size, cursor)
 
     def get_products_by_category(self, categoria):
-        """Retorna lista de produtos filtrados por categoria (pode ser substring)."""
+        """
+        Retorna lista de produtos filtrados por categoria (pode ser substring). A busca
+        usa o índice de trigramas de produtos.categoria, sem varrer a tabela.
+        """
         if not categoria:
             return self.list_products()
-        try:
-            return self.produto_model.get_by_category(categoria)
-        except Exception:
-            return []
+        return self.produto_model.get_by_category(categoria)
 
     def get_sales_by_period(self, inicio, fim):
-        """Retorna lista de vendas dentro do período informado (strings 'YYYY-MM-DD' ou datetimes)."""
+        """Retorna as vendas do período informado (strings 'YYYY-MM-DD' ou datetimes) como gerador."""
         if not inicio or not fim:
             return self.list_sales()
         try:
-            return self.venda_model.get_by_period(inicio, fim)
-        except Exception:
+            return self.venda_model.iter_by_period(inicio, fim)
+        except ValueError:
             return []
\ No newline at end of file
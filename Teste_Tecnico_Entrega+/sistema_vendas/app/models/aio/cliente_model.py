@@ -0,0 +1,35 @@
+from .database import get_async_connection, as_tuples
+from ..paginacao import page_size_of, decode_cursor, split_page
+
+class AsyncClienteModel:
+    """Versão assíncrona de ClienteModel; devolve as mesmas tuplas."""
+    async def get_all(self):
+        async with get_async_connection(query_class="report") as conn:
+            return as_tuples(await conn.fetch("SELECT id, nome, email, telefone FROM clientes ORDER BY id"))
+
+    async def get_page(self, page_size=None, cursor=None):
+        """Uma página de get_all(); mesmo contrato de ClienteModel.get_page."""
+        page_size = page_size_of(page_size)
+        ultimo_id = decode_cursor("clientes", cursor, 1)[0] if cursor else 0
+        async with get_async_connection(query_class="point_read") as conn:
+            rows = as_tuples(await conn.fetch(
+                "SELECT id, nome, email, telefone FROM clientes WHERE id > $1 ORDER BY id LIMIT $2",
+                ultimo_id, page_size + 1
+            ))
+            return split_page(rows, page_size, "clientes", lambda row: (row[0],))
+
+    async def get_by_ids(self, ids):
+        """Vários clientes em uma única consulta; mesmo contrato de ClienteModel.get_by_ids."""
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return {}
+        async with get_async_connection(query_class="point_read") as conn:
+            rows = await conn.fetch("SELECT id, nome, email, telefone FROM clientes WHERE id = ANY($1::int[])", ids)
+            return {row[0]: row for row in as_tuples(rows)}
+
+    async def create(self, nome, email, telefone):
+        async with get_async_connection(query_class="oltp_write") as conn:
+            return await conn.fetchval(
+                "INSERT INTO clientes (nome, email, telefone) VALUES ($1, $2, $3) RETURNING id",
+                nome, email, telefone
+            )
@@ -0,0 +1,81 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+from dotenv import load_dotenv
+
+from ..query_classes import QUERY_TIMEOUTS, check_query_class, timeout_message
+
+load_dotenv() # Carrega as variáveis do arquivo .env
+
+_pool_future = None
+
+
+async def get_async_pool():
+    """
+    Retorna o pool assíncrono (asyncpg) da aplicação, criando-o no primeiro uso.
+    Usa as mesmas variáveis do .env que o pool síncrono de app/models/database.py.
+    """
+    global _pool_future
+    if _pool_future is None:
+        # Corrotinas que chegarem durante a criação aguardam o mesmo future
+        _pool_future = asyncio.ensure_future(asyncpg.create_pool(
+            database=os.getenv('DB_NAME'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            host=os.getenv('DB_HOST'),
+            port=os.getenv('DB_PORT'),
+            min_size=int(os.getenv('DB_POOL_MIN', '1')),
+            max_size=int(os.getenv('DB_POOL_MAX', '10')),
+        ))
+    try:
+        return await _pool_future
+    except Exception:
+        _pool_future = None
+        raise
+
+
+async def close_async_pool():
+    """Fecha o pool assíncrono (usado ao encerrar o programa)."""
+    global _pool_future
+    if _pool_future is not None:
+        future, _pool_future = _pool_future, None
+        pool = await future
+        await pool.close()
+
+
+class AsyncQueryTimeoutError(Exception):
+    """A consulta excedeu o statement_timeout ou o lock_timeout da sua classe (como QueryTimeoutError)."""
+    def __init__(self, query_class, cause):
+        self.query_class = query_class
+        super().__init__(timeout_message(query_class, isinstance(cause, asyncpg.exceptions.LockNotAvailableError)))
+
+
+@asynccontextmanager
+async def get_async_connection(query_class=None):
+    """
+    Empresta uma conexão do pool assíncrono para uso em um bloco `async with`.
+    `query_class` tem o mesmo papel que em get_connection: define o statement_timeout e o
+    lock_timeout (QUERY_TIMEOUTS), e estouros viram AsyncQueryTimeoutError. Não há réplica
+    de leitura na camada assíncrona: todas as consultas vão ao primário.
+    """
+    check_query_class(query_class)
+    pool = await get_async_pool()
+    async with pool.acquire(timeout=float(os.getenv('DB_POOL_TIMEOUT', '30'))) as conn:
+        if query_class is not None:
+            statement_timeout, lock_timeout = QUERY_TIMEOUTS[query_class]
+            # Na sessão, e não por transação: leituras aqui rodam fora de transação explícita.
+            # O pool do asyncpg faz RESET ALL ao receber a conexão de volta.
+            await conn.execute("SELECT set_config('statement_timeout', $1, false), "
+                               "set_config('lock_timeout', $2, false)",
+                               str(statement_timeout), str(lock_timeout))
+        try:
+            yield conn
+        except (asyncpg.exceptions.QueryCanceledError, asyncpg.exceptions.LockNotAvailableError) as e:
+            raise AsyncQueryTimeoutError(query_class, e) from e
+
+
+def as_tuples(records):
+    """Converte asyncpg.Record em tuplas, no mesmo formato devolvido pelos models síncronos."""
+    return [tuple(r) for r in records]
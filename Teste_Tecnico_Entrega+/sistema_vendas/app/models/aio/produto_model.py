@@ -0,0 +1,140 @@
+from .database import get_async_connection, as_tuples
+from ..paginacao import page_size_of, decode_cursor, split_page, PAGE_SIZE
+
+def _escape_like(termo):
+    """Escapa os curingas do LIKE (%, _ e \\), como em ProdutoModel."""
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class AsyncProdutoModel:
+    """Versão assíncrona de ProdutoModel; devolve as mesmas tuplas."""
+    async def get_all(self):
+        async with get_async_connection(query_class="report") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                ORDER BY p.id
+            """
+            return as_tuples(await conn.fetch(query))
+
+    async def get_page(self, page_size=None, cursor=None):
+        """Uma página de get_all(); mesmo contrato de ProdutoModel.get_page."""
+        page_size = page_size_of(page_size)
+        ultimo_id = decode_cursor("produtos", cursor, 1)[0] if cursor else 0
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE p.id > $1
+                ORDER BY p.id
+                LIMIT $2
+            """
+            rows = as_tuples(await conn.fetch(query, ultimo_id, page_size + 1))
+            return split_page(rows, page_size, "produtos", lambda row: (row[0],))
+
+    async def get_by_id(self, produto_id):
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE p.id = $1
+            """
+            row = await conn.fetchrow(query, int(produto_id))
+            return tuple(row) if row else None
+
+    async def get_by_ids(self, ids):
+        """Vários produtos em uma única consulta; mesmo contrato de ProdutoModel.get_by_ids."""
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return {}
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE p.id = ANY($1::int[])
+            """
+            return {row[0]: row for row in as_tuples(await conn.fetch(query, ids))}
+
+    async def get_by_category(self, categoria):
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE p.categoria ILIKE $1
+                ORDER BY p.id
+            """
+            return as_tuples(await conn.fetch(query, f"%{_escape_like(categoria)}%"))
+
+    async def search(self, termo, limit=50):
+        """Busca por trecho do nome; mesmo contrato de ProdutoModel.search."""
+        termo = (termo or "").strip()
+        if not termo:
+            return []
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+                FROM produtos_estoque p
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE p.nome ILIKE $1
+                ORDER BY p.nome ILIKE $2 DESC, length(p.nome), p.id
+                LIMIT $3
+            """
+            padrao = _escape_like(termo)
+            return as_tuples(await conn.fetch(query, f"%{padrao}%", f"{padrao}%", limit))
+
+    async def search_text(self, consulta, limit=None, cursor=None):
+        """Busca por palavras com ranking; mesmo contrato de ProdutoModel.search_text."""
+        consulta = (consulta or "").strip()
+        if not consulta:
+            return [], None
+        limit = page_size_of(limit or PAGE_SIZE)
+        listagem = f"busca:{consulta}"
+        rank, ultimo_id = decode_cursor(listagem, cursor, 2) if cursor else (None, None)
+        async with get_async_connection(query_class="point_read") as conn:
+            query = """
+                WITH r AS (
+                    SELECT pr.id, ts_rank(pr.busca, q)::FLOAT8 AS rank
+                    FROM produtos pr, websearch_to_tsquery('portuguese', sem_acento($1)) q
+                    WHERE pr.busca @@ q
+                )
+                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa, r.rank
+                FROM r
+                JOIN produtos_estoque p ON p.id = r.id
+                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+                WHERE $2::FLOAT8 IS NULL OR r.rank < $2 OR (r.rank = $2 AND r.id > $3)
+                ORDER BY r.rank DESC, r.id
+                LIMIT $4
+            """
+            rows = as_tuples(await conn.fetch(query, consulta, rank, ultimo_id, limit + 1))
+            rows, next_cursor = split_page(rows, limit, listagem, lambda row: (row[6], row[0]))
+            return [row[:6] for row in rows], next_cursor
+
+    async def create(self, nome, preco, categoria, estoque, fornecedor_id):
+        async with get_async_connection(query_class="oltp_write") as conn:
+            return await conn.fetchval(
+                "INSERT INTO produtos (nome, preco, categoria, estoque, fornecedor_id) VALUES ($1, $2, $3, $4, $5) RETURNING id",
+                nome, preco, categoria, estoque, fornecedor_id
+            )
+
+    async def update_stock(self, produto_id, nova_quantidade):
+        """Define o estoque total; em produtos fatiados a quantidade é dividida entre as fatias."""
+        async with get_async_connection(query_class="oltp_write") as conn:
+            async with conn.transaction():
+                num_shards = await conn.fetchval(
+                    "UPDATE produtos SET estoque = CASE WHEN num_shards > 0 THEN 0 ELSE $1 END "
+                    "WHERE id = $2 RETURNING num_shards",
+                    int(nova_quantidade), int(produto_id)
+                )
+                if num_shards is None:
+                    return False
+                if num_shards > 0:
+                    await conn.execute(
+                        "UPDATE estoque_shards SET estoque = $1 / $2 + CASE WHEN shard < $1 % $2 THEN 1 ELSE 0 END "
+                        "WHERE produto_id = $3",
+                        int(nova_quantidade), num_shards, int(produto_id)
+                    )
+                return True
@@ -0,0 +1,89 @@
+import asyncio
+
+from .database import get_async_connection, as_tuples
+
+class AsyncRelatorioModel:
+    """
+    Versão assíncrona de RelatorioModel. Cada relatório usa sua própria conexão do
+    pool, então vários podem ser aguardados ao mesmo tempo (ver get_all_reports).
+    """
+    async def _fetch(self, query, *args):
+        async with get_async_connection(query_class="report") as conn:
+            return as_tuples(await conn.fetch(query, *args))
+
+    async def get_produtos_estoque_critico(self, limite=3):
+        """Produtos com estoque abaixo de `limite`: lista de (id, nome, estoque)."""
+        return await self._fetch(
+            "SELECT id, nome, estoque FROM produtos_estoque WHERE estoque < $1 ORDER BY estoque ASC", limite
+        )
+
+    async def get_top_5_produtos_vendidos(self):
+        """TOP 5 produtos por quantidade vendida: lista de (nome_produto, total_vendido)."""
+        return await self._fetch("""
+            SELECT p.nome, SUM(v.quantidade) AS total_vendido
+            FROM vendas v
+            JOIN produtos p ON v.produto_id = p.id
+            GROUP BY p.nome
+            ORDER BY total_vendido DESC
+            LIMIT 5;
+        """)
+
+    async def get_total_vendas_por_categoria(self):
+        """Vendas e receita por categoria: lista de (categoria, numero_de_vendas, receita_total)."""
+        return await self._fetch("""
+            SELECT
+                p.categoria,
+                COUNT(v.id) AS numero_de_vendas,
+                SUM(v.valor_total) AS receita_total
+            FROM vendas v
+            JOIN produtos p ON v.produto_id = p.id
+            GROUP BY p.categoria
+            ORDER BY receita_total DESC;
+        """)
+
+    async def get_produtos_nunca_vendidos(self):
+        """Produtos sem nenhuma venda: lista de (id, nome, estoque)."""
+        return await self._fetch("""
+            SELECT p.id, p.nome, p.estoque
+            FROM produtos_estoque p
+            LEFT JOIN vendas v ON p.id = v.produto_id
+            WHERE v.id IS NULL;
+        """)
+
+    async def get_produtos_status_critico(self):
+        """Produtos nunca vendidos ou com estoque < 3: lista de (id, nome, estoque, status)."""
+        return await self._fetch("""
+            SELECT
+                id, nome, estoque,
+                CASE
+                    WHEN id NOT IN (SELECT DISTINCT produto_id FROM vendas) THEN 'Nunca Vendido'
+                    ELSE 'Estoque Crítico'
+                END AS status
+            FROM produtos_estoque
+            WHERE id NOT IN (SELECT DISTINCT produto_id FROM vendas) OR estoque < 3;
+        """)
+
+    async def get_produtos_estoque_alto(self, limite=5):
+        """Produtos com estoque acima de `limite`: lista de (id, nome, categoria, preco, estoque)."""
+        return await self._fetch("""
+            SELECT id, nome, categoria, preco, estoque FROM produtos_estoque
+            WHERE estoque > $1 ORDER BY categoria, preco;
+        """, limite)
+
+    async def get_all_reports(self):
+        """
+        Executa todos os relatórios em paralelo.
+
+        Returns:
+            dict[str, list[tuple]]: Resultado de cada relatório, indexado pelo nome do método.
+        """
+        names = [
+            "get_produtos_estoque_critico",
+            "get_top_5_produtos_vendidos",
+            "get_total_vendas_por_categoria",
+            "get_produtos_nunca_vendidos",
+            "get_produtos_status_critico",
+            "get_produtos_estoque_alto",
+        ]
+        results = await asyncio.gather(*(getattr(self, name)() for name in names))
+        return dict(zip(names, results))
@@ -0,0 +1,215 @@
+import os
+import random
+import asyncio
+
+import asyncpg
+
+from .database import get_async_connection, as_tuples, AsyncQueryTimeoutError
+from ..paginacao import page_size_of, decode_cursor, split_page
+from datetime import date, datetime, timedelta
+
+# Novas tentativas de register_sale, com as mesmas variáveis de sale_retry (venda_model.py)
+# e os SQLSTATEs de TRANSIENT_PGCODES (resilience.py): serialization_failure e deadlock_detected
+_SALE_RETRIES = max(1, int(os.getenv('DB_SALE_RETRIES', '3')))
+_RETRY_BASE_DELAY = float(os.getenv('DB_RETRY_BASE_DELAY', '0.1'))
+_RETRY_MAX_DELAY = float(os.getenv('DB_RETRY_MAX_DELAY', '2'))
+_TRANSIENT_SQLSTATES = frozenset({"40001", "40P01"})
+
+# valor_total calculado em NUMERIC no servidor ($4 = preço lido com a linha bloqueada)
+_VENDA_INSERT = """
+    INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda)
+    VALUES ($1, $2, $3::INT, $4::NUMERIC * $3::INT, COALESCE($5::timestamp, NOW()))
+    RETURNING id
+"""
+# Produtos com estoque fatiado, como VENDA_PRODUTO_FATIADO, VENDA_BAIXA_SHARD,
+# VENDA_LOCK_SHARDS e VENDA_BAIXA_SHARDS em venda_model.py
+_PRODUTO_FATIADO = "SELECT preco FROM produtos WHERE id = $1 AND num_shards > 0"
+_BAIXA_SHARD = """
+    UPDATE estoque_shards s SET estoque = s.estoque - $2
+    FROM (
+        SELECT shard FROM estoque_shards
+        WHERE produto_id = $1 AND estoque >= $2
+        ORDER BY random()
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ) alvo
+    WHERE s.produto_id = $1 AND s.shard = alvo.shard
+"""
+_LOCK_SHARDS = "SELECT shard, estoque FROM estoque_shards WHERE produto_id = $1 ORDER BY shard FOR UPDATE"
+_BAIXA_SHARDS = """
+    UPDATE estoque_shards s SET estoque = s.estoque - b.quantidade
+    FROM unnest($2::int[], $3::int[]) AS b(shard, quantidade)
+    WHERE s.produto_id = $1 AND s.shard = b.shard
+"""
+# Chaves de idempotência, como IDEMPOTENCIA_* em venda_model.py
+_IDEMPOTENCIA_RESERVA = "INSERT INTO vendas_idempotencia (chave) VALUES ($1) ON CONFLICT (chave) DO NOTHING"
+_IDEMPOTENCIA_ORIGINAL = """
+    SELECT k.venda_id, v.produto_id, v.cliente_id, v.quantidade
+    FROM vendas_idempotencia k LEFT JOIN vendas v ON v.id = k.venda_id
+    WHERE k.chave = $1
+"""
+_IDEMPOTENCIA_CONFIRMA = "UPDATE vendas_idempotencia SET venda_id = $2 WHERE chave = $1"
+
+_VENDAS_SELECT = """
+    SELECT
+        v.id,
+        p.nome AS produto,
+        p.categoria,
+        c.nome AS cliente,
+        v.quantidade,
+        v.valor_total,
+        v.data_venda
+    FROM vendas v
+    JOIN produtos p ON v.produto_id = p.id
+    JOIN clientes c ON v.cliente_id = c.id
+"""
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def _period_bounds(inicio, fim):
+    """Intervalo semiaberto [inicio, fim_exclusivo), como _normalize_period do modelo síncrono."""
+    inicio_dt, fim_dt = _to_datetime(inicio), _to_datetime(fim)
+    so_data = len(fim.strip()) == 10 if isinstance(fim, str) else not isinstance(fim, datetime)
+    if isinstance(inicio_dt, date) and not isinstance(inicio_dt, datetime):
+        inicio_dt = datetime.combine(inicio_dt, datetime.min.time())
+    if isinstance(fim_dt, date) and not isinstance(fim_dt, datetime):
+        fim_dt = datetime.combine(fim_dt, datetime.min.time())
+    return inicio_dt, fim_dt + (timedelta(days=1) if so_data else timedelta(microseconds=1))
+
+class AsyncVendaModel:
+    """
+    Versão assíncrona de parte de VendaModel (listagens, get_by_period e register_sale),
+    com as mesmas tuplas e mensagens. Não tem register_sale_atomic, pedidos, lotes,
+    write-behind nem streaming, e as leituras não vão à réplica (DB_REPLICA_DSN).
+    """
+    async def get_all(self):
+        async with get_async_connection(query_class="report") as conn:
+            return as_tuples(await conn.fetch(_VENDAS_SELECT + " ORDER BY v.data_venda DESC"))
+
+    async def get_page(self, page_size=None, cursor=None):
+        """Uma página de get_all(), por (data_venda, id) decrescente; mesmo contrato de VendaModel.get_page."""
+        page_size = page_size_of(page_size)
+        async with get_async_connection(query_class="point_read") as conn:
+            if cursor:
+                data_venda, venda_id = decode_cursor("vendas", cursor, 2)
+                query = (_VENDAS_SELECT + " WHERE v.data_venda <= $1 AND (v.data_venda, v.id) < ($1, $2)"
+                         " ORDER BY v.data_venda DESC, v.id DESC LIMIT $3")
+                rows = as_tuples(await conn.fetch(query, data_venda, venda_id, page_size + 1))
+            else:
+                query = _VENDAS_SELECT + " ORDER BY v.data_venda DESC, v.id DESC LIMIT $1"
+                rows = as_tuples(await conn.fetch(query, page_size + 1))
+            return split_page(rows, page_size, "vendas", lambda row: (row[6], row[0]))
+
+    async def get_by_period(self, inicio, fim):
+        """Busca vendas entre duas datas (inclusive); aceita strings ISO ou date/datetime."""
+        inicio_dt, fim_dt = _period_bounds(inicio, fim)
+        async with get_async_connection(query_class="report") as conn:
+            query = _VENDAS_SELECT + " WHERE v.data_venda >= $1 AND v.data_venda < $2 ORDER BY v.data_venda DESC"
+            return as_tuples(await conn.fetch(query, inicio_dt, fim_dt))
+
+    async def register_sale(self, produto_id, cliente_id, quantidade, data_venda=None, idempotency_key=None):
+        """
+        Registra uma venda com as regras de VendaModel.register_sale: produto bloqueado,
+        valor_total em NUMERIC no servidor, tempos limite da classe oltp_write, novas
+        tentativas em conflitos de serialização/deadlock e `idempotency_key` opcional.
+        Retorna (new_id, message).
+        """
+        dv = None
+        if data_venda:
+            try:
+                dv = _to_datetime(data_venda)
+            except Exception as e:
+                return None, f"Erro: formato de data inválido ({e}). Use ISO: YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS"
+
+        tentativa = 1
+        while True:
+            try:
+                return await self._register_sale_once(int(produto_id), int(cliente_id), int(quantidade),
+                                                      idempotency_key, dv)
+            except AsyncQueryTimeoutError as e:
+                return None, f"Erro: {e}"
+            except asyncpg.PostgresError as e:
+                if e.sqlstate not in _TRANSIENT_SQLSTATES or tentativa >= _SALE_RETRIES:
+                    return None, f"Erro ao registrar venda: {e}"
+                await asyncio.sleep(random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (tentativa - 1))))
+                tentativa += 1
+            except Exception as e:
+                return None, f"Erro ao registrar venda: {e}"
+
+    async def _register_sale_once(self, produto_id, cliente_id, quantidade, idempotency_key, dv):
+        """Uma tentativa de register_sale; só confirma a transação se a venda foi gravada."""
+        async with get_async_connection(query_class="oltp_write") as conn:
+            transacao = conn.transaction()
+            await transacao.start()
+            try:
+                resultado, gravou = await self._sell(conn, produto_id, cliente_id, quantidade, idempotency_key, dv)
+            except BaseException:
+                await transacao.rollback()
+                raise
+            if gravou:
+                await transacao.commit()
+            else:
+                # Venda recusada ou repetida: desfaz também a reserva da chave
+                await transacao.rollback()
+            return resultado
+
+    async def _sell(self, conn, produto_id, cliente_id, quantidade, idempotency_key, dv):
+        """Passos da venda na transação de `conn`. Retorna ((new_id, message), gravou)."""
+        if idempotency_key is not None:
+            original = await self._claim_idempotency_key(conn, idempotency_key, produto_id, cliente_id, quantidade)
+            if original is not None:
+                return original, False
+        prod = await conn.fetchrow("SELECT preco, estoque FROM produtos WHERE id = $1 AND num_shards = 0 FOR UPDATE",
+                                   produto_id)
+        if not prod:
+            # Sem linha bloqueada: o produto não existe ou tem o estoque fatiado
+            preco = await conn.fetchval(_PRODUTO_FATIADO, produto_id)
+            if preco is None:
+                return (None, "Erro: produto não encontrado."), False
+            erro = await self._take_from_shards(conn, produto_id, quantidade)
+            if erro is not None:
+                return (None, erro), False
+            new_id = await conn.fetchval(_VENDA_INSERT, produto_id, cliente_id, quantidade, preco, dv)
+            if idempotency_key is not None:
+                await conn.execute(_IDEMPOTENCIA_CONFIRMA, idempotency_key, new_id)
+            return (new_id, "Venda registrada com sucesso."), True
+        preco, estoque_atual = prod
+        if estoque_atual < quantidade:
+            return (None, f"Erro: estoque insuficiente (disponível: {estoque_atual})."), False
+        new_id = await conn.fetchval(_VENDA_INSERT, produto_id, cliente_id, quantidade, preco, dv)
+        await conn.execute("UPDATE produtos SET estoque = estoque - $1 WHERE id = $2", quantidade, produto_id)
+        if idempotency_key is not None:
+            await conn.execute(_IDEMPOTENCIA_CONFIRMA, idempotency_key, new_id)
+        return (new_id, "Venda registrada com sucesso."), True
+
+    async def _take_from_shards(self, conn, produto_id, quantidade):
+        """Como take_from_shards (venda_model.py): None se baixou, senão a mensagem de erro."""
+        if await conn.execute(_BAIXA_SHARD, produto_id, quantidade) != "UPDATE 0":
+            return None
+        fatias = await conn.fetch(_LOCK_SHARDS, produto_id)
+        disponivel = sum(estoque for _, estoque in fatias)
+        if disponivel < quantidade:
+            return f"Erro: estoque insuficiente (disponível: {disponivel})."
+        shards, baixas = [], []
+        restante = quantidade
+        for shard, estoque in fatias:
+            if restante == 0:
+                break
+            baixa = min(estoque, restante)
+            if baixa:
+                shards.append(shard)
+                baixas.append(baixa)
+                restante -= baixa
+        await conn.execute(_BAIXA_SHARDS, produto_id, shards, baixas)
+        return None
+
+    async def _claim_idempotency_key(self, conn, key, produto_id, cliente_id, quantidade):
+        """Como VendaModel._claim_idempotency_key: None se a chave é nova, senão o resultado original."""
+        if await conn.execute(_IDEMPOTENCIA_RESERVA, key) == "INSERT 0 1":
+            return None
+        venda_id, produto_original, cliente_original, quantidade_original = await conn.fetchrow(
+            _IDEMPOTENCIA_ORIGINAL, key)
+        if (produto_original, cliente_original, quantidade_original) != (produto_id, cliente_id, quantidade):
+            return None, "Erro: chave de idempotência já usada em outra venda."
+        return venda_id, "Venda registrada com sucesso."
@@ -0,0 +1,304 @@
+import os
+import bisect
+import select
+import socket
+import logging
+import threading
+
+import psycopg2
+
+from .database import _connection_params
+
+logger = logging.getLogger(__name__)
+
+# Liga o catálogo de produtos em memória nos pontos de entrada (main.py e main_gui.py)
+CATALOG_CACHE = os.getenv('DB_CATALOG_CACHE', '1') == '1'
+# Espera máxima (s) para uma edição de produto deste processo aparecer no catálogo (refresh)
+CATALOG_SYNC_TIMEOUT = float(os.getenv('DB_CATALOG_SYNC_TIMEOUT', '1'))
+
+# Canais avisados pelos gatilhos da migração 0002_notifica_catalogo.sql
+CANAL_PRODUTOS = "catalogo_produtos"
+CANAL_FORNECEDORES = "catalogo_fornecedores"
+GATILHOS = ("produtos_notifica_catalogo", "estoque_shards_notifica_catalogo", "fornecedores_notifica_catalogo")
+
+# Linhas no formato das listagens de ProdutoModel, mais o fornecedor_id para o mapa por fornecedor
+CATALOGO_SELECT = """
+    SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa, p.fornecedor_id
+    FROM produtos_estoque p
+    LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+"""
+
+# Sem aviso por este tempo (s), a conexão de escuta é testada com um SELECT 1
+_KEEPALIVE = 5.0
+
+
+class CatalogCache:
+    """
+    Cópia em memória de todos os produtos, por id, com mapas por categoria e por fornecedor.
+
+    Uma thread de fundo mantém uma conexão própria com LISTEN nos canais dos gatilhos de
+    produtos, estoque_shards e fornecedores: a cada aviso recarrega só os produtos citados,
+    então vendas e cadastros feitos em outros terminais aparecem em milissegundos.
+    O LISTEN é feito antes da carga completa, para nenhuma mudança se perder entre as duas.
+    Se a conexão cair, `ready` fica falso (as leituras voltam ao banco) até reconectar
+    e recarregar tudo.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}            # id -> (id, nome, preco, categoria, estoque, nome_empresa)
+        self._ids = []             # ids em ordem crescente, para as páginas
+        self._fornecedor_de = {}   # id -> fornecedor_id
+        self._por_categoria = {}   # categoria -> {ids}
+        self._por_fornecedor = {}  # fornecedor_id -> {ids}
+
+        # Recargas pedidas por escritas deste processo (refresh), feitas pela própria thread
+        # de escuta para as recargas serem aplicadas na ordem em que foram lidas do banco
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._requested = 0
+        self._applied = 0
+
+        self.notifications = 0
+        self.reloads = 0
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._thread = threading.Thread(target=self._run, name="catalogo-cache", daemon=True)
+
+    @property
+    def ready(self):
+        """True quando o catálogo está carregado e recebendo os avisos do banco."""
+        return self._ready.is_set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake()
+        self._thread.join(timeout)
+        self._wake_r.close()
+        self._wake_w.close()
+
+    # Leituras (mesmas linhas e ordem das consultas de ProdutoModel)
+
+    def all_products(self):
+        with self._lock:
+            return [self._rows[pid] for pid in self._ids]
+
+    def page(self, ultimo_id, limite):
+        """Até `limite` produtos com id > ultimo_id, em ordem de id."""
+        with self._lock:
+            inicio = bisect.bisect_right(self._ids, ultimo_id)
+            return [self._rows[pid] for pid in self._ids[inicio:inicio + limite]]
+
+    def get(self, produto_id):
+        with self._lock:
+            return self._rows.get(produto_id)
+
+    def get_many(self, ids):
+        with self._lock:
+            return {pid: self._rows[pid] for pid in ids if pid in self._rows}
+
+    def by_category(self, termo):
+        """Produtos cuja categoria contém `termo` (sem diferenciar maiúsculas), em ordem de id."""
+        termo = termo.lower()
+        with self._lock:
+            ids = set()
+            for categoria, da_categoria in self._por_categoria.items():
+                if categoria is not None and termo in categoria.lower():
+                    ids |= da_categoria
+            return [self._rows[pid] for pid in sorted(ids)]
+
+    def by_supplier(self, fornecedor_id):
+        with self._lock:
+            return [self._rows[pid] for pid in sorted(self._por_fornecedor.get(fornecedor_id, ()))]
+
+    def search(self, termo, limite):
+        """Como ProdutoModel.search: nomes que começam com o termo primeiro, depois os mais curtos."""
+        termo = termo.lower()
+        with self._lock:
+            achados = [row for row in self._rows.values() if termo in row[1].lower()]
+        achados.sort(key=lambda row: (not row[1].lower().startswith(termo), len(row[1]), row[0]))
+        return achados[:limite]
+
+    # Coerência
+
+    def refresh(self, ids, wait=True, timeout=CATALOG_SYNC_TIMEOUT):
+        """
+        Recarrega `ids` logo após uma escrita deste processo, sem esperar o aviso do banco.
+        Com `wait`, espera até `timeout` segundos, para a tela que gravou já ler o valor
+        novo; sem ele só enfileira os ids e acorda a thread (caminho de venda).
+        """
+        if not self.ready:
+            return
+        with self._cond:
+            self._pending.update(ids)
+            self._requested += 1
+            pedido = self._requested
+        self._wake()
+        if not wait:
+            return
+        with self._cond:
+            self._cond.wait_for(lambda: self._applied >= pedido or not self.ready, timeout)
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def _run(self):
+        espera = 0.5
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    if not self._triggers_installed(cur):
+                        logger.warning("Gatilhos do catálogo ausentes (rode migrar.py); "
+                                       "produtos serão lidos do banco")
+                        return
+                    cur.execute(f"LISTEN {CANAL_PRODUTOS}")
+                    cur.execute(f"LISTEN {CANAL_FORNECEDORES}")
+                    self._load_all(cur)
+                self._ready.set()
+                espera = 0.5
+                self._listen(conn)
+            except (psycopg2.Error, OSError):
+                logger.warning("Catálogo em memória sem conexão; produtos serão lidos do banco", exc_info=True)
+            finally:
+                self._ready.clear()
+                with self._cond:
+                    self._pending.clear()
+                    self._applied = self._requested
+                    self._cond.notify_all()
+                if conn is not None:
+                    conn.close()
+            self._stop.wait(espera)
+            espera = min(espera * 2, 30.0)
+
+    def _triggers_installed(self, cur):
+        cur.execute("SELECT count(*) FROM pg_trigger WHERE tgname = ANY(%s)", (list(GATILHOS),))
+        return cur.fetchone()[0] == len(GATILHOS)
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            prontos, _, _ = select.select([conn, self._wake_r], [], [], _KEEPALIVE)
+            if not prontos:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            if self._wake_r in prontos:
+                self._wake_r.recv(4096)
+            conn.poll()
+            ids, fornecedores = set(), set()
+            while conn.notifies:
+                aviso = conn.notifies.pop(0)
+                self.notifications += 1
+                (ids if aviso.channel == CANAL_PRODUTOS else fornecedores).add(int(aviso.payload))
+            with self._cond:
+                ids |= self._pending
+                self._pending.clear()
+                pedido = self._requested
+            if ids or fornecedores:
+                self._reload(conn, ids, fornecedores)
+            with self._cond:
+                self._applied = pedido
+                self._cond.notify_all()
+
+    def _load_all(self, cur):
+        cur.execute(CATALOGO_SELECT + " ORDER BY p.id")
+        rows = cur.fetchall()
+        with self._lock:
+            self._rows, self._ids, self._fornecedor_de = {}, [], {}
+            self._por_categoria, self._por_fornecedor = {}, {}
+            for row in rows:
+                self._put(row)
+
+    def _reload(self, conn, ids, fornecedores):
+        with conn.cursor() as cur:
+            cur.execute(CATALOGO_SELECT + " WHERE p.id = ANY(%s) OR p.fornecedor_id = ANY(%s)",
+                        (sorted(ids), sorted(fornecedores)))
+            rows = cur.fetchall()
+        self.reloads += 1
+        with self._lock:
+            for produto_id in ids - {row[0] for row in rows}:
+                self._remove(produto_id)
+            for row in rows:
+                self._put(row)
+
+    def _put(self, row):
+        produto_id, categoria, fornecedor_id = row[0], row[3], row[6]
+        if produto_id in self._rows:
+            self._unindex(produto_id)
+        else:
+            bisect.insort(self._ids, produto_id)
+        self._rows[produto_id] = row[:6]
+        self._fornecedor_de[produto_id] = fornecedor_id
+        self._por_categoria.setdefault(categoria, set()).add(produto_id)
+        self._por_fornecedor.setdefault(fornecedor_id, set()).add(produto_id)
+
+    def _remove(self, produto_id):
+        if produto_id not in self._rows:
+            return
+        self._unindex(produto_id)
+        del self._rows[produto_id]
+        del self._fornecedor_de[produto_id]
+        del self._ids[bisect.bisect_left(self._ids, produto_id)]
+
+    def _unindex(self, produto_id):
+        for mapa, chave in ((self._por_categoria, self._rows[produto_id][3]),
+                            (self._por_fornecedor, self._fornecedor_de[produto_id])):
+            ids = mapa[chave]
+            ids.discard(produto_id)
+            if not ids:
+                del mapa[chave]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def start_catalog_cache(wait=None):
+    """
+    Inicia (uma única vez) o catálogo de produtos em memória. Com `wait`, espera até
+    esse número de segundos pela carga inicial. Retorna o CatalogCache.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CatalogCache().start()
+        cache = _cache
+    if wait:
+        cache.wait_ready(wait)
+    return cache
+
+
+def stop_catalog_cache(timeout=None):
+    """Encerra o catálogo iniciado por start_catalog_cache."""
+    global _cache
+    with _cache_lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.stop(timeout)
+
+
+def get_catalog_cache():
+    """O catálogo em memória, se iniciado e sincronizado; senão None (ler do banco)."""
+    cache = _cache
+    return cache if cache is not None and cache.ready else None
+
+
+def catalog_touched(ids, wait=True):
+    """
+    Avisa o catálogo (se ativo) de que este processo gravou os produtos `ids`; com `wait`,
+    espera a recarga (ver CatalogCache.refresh).
+    """
+    cache = _cache
+    if cache is not None:
+        cache.refresh(ids, wait=wait)
@@ -1,20 +1,602 @@
 import os
+import time
+import logging
+import threading
+import traceback
+import weakref
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2.pool import PoolError
 from dotenv import load_dotenv
 
+from .query_stats import InstrumentedCursor
+from .query_classes import QUERY_TIMEOUTS, READ_QUERY_CLASSES, check_query_class, timeout_message
+from .resilience import CircuitBreaker, RetryPolicy, is_connection_error
+
 load_dotenv() # Carrega as variáveis do arquivo .env
 
-def get_db_connection():
-    """Cria e retorna uma nova conexão com o banco de dados."""
-    try:
-        conn = psycopg2.connect(
-            dbname=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            host=os.getenv('DB_HOST'),
-            port=os.getenv('DB_PORT')
-        )
+logger = logging.getLogger(__name__)
+
+
+def _connection_params():
+    """Lê do ambiente (.env) os parâmetros de conexão com o banco de dados."""
+    return dict(
+        dbname=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        host=os.getenv('DB_HOST'),
+        port=os.getenv('DB_PORT'),
+        connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+    )
+
+
+def _rollback_quietly(conn):
+    """Desfaz a transação em aberto ignorando erros (ex.: conexão já perdida)."""
+    if not conn.closed:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+
+
+class PoolTimeoutError(PoolError):
+    """Nenhuma conexão foi liberada no pool dentro do tempo de espera configurado."""
+
+
+class DataAccessError(Exception):
+    """Base dos erros de acesso a dados que os controllers exibem diretamente ao usuário."""
+
+
+class DatabaseUnavailableError(DataAccessError):
+    """O banco de dados não pôde ser alcançado (falha de conexão ou disjuntor aberto)."""
+
+
+class QueryTimeoutError(DataAccessError):
+    """A consulta excedeu o statement_timeout ou o lock_timeout da sua classe."""
+    def __init__(self, query_class, cause):
+        self.query_class = query_class
+        super().__init__(timeout_message(query_class, isinstance(cause, psycopg2.errors.LockNotAvailable)))
+
+
+def apply_query_timeouts(cur, query_class):
+    """
+    Aplica o statement_timeout e o lock_timeout de `query_class` à transação corrente
+    (SET LOCAL). Quem faz vários COMMITs na mesma conexão deve chamá-la a cada transação.
+    """
+    statement_timeout, lock_timeout = QUERY_TIMEOUTS[query_class]
+    cur.execute("SELECT set_config('statement_timeout', %s, true), set_config('lock_timeout', %s, true)",
+                (str(statement_timeout), str(lock_timeout)))
+
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe com o PostgreSQL.
+
+    Mantém entre `minconn` e `maxconn` conexões abertas e as empresta através do
+    context manager `connection()`. Quem pede uma conexão com o pool cheio espera
+    até `timeout` segundos por uma devolução. Conexões emprestadas por mais de
+    `leak_timeout` segundos são registradas no log como possível vazamento, junto
+    com a pilha de chamadas de quem as pegou.
+    """
+    def __init__(self, minconn=1, maxconn=10, timeout=30.0, leak_timeout=60.0, **conn_params):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Tamanho de pool inválido: exige 0 <= minconn <= maxconn e maxconn >= 1.")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.leak_timeout = leak_timeout
+        self._conn_params = conn_params
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}  # id(conn) -> dict com a conexão e dados do empréstimo
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "leaks_detected": 0,
+        }
+
+        # Abre as conexões mínimas; se o banco estiver fora do ar elas serão abertas sob demanda
+        try:
+            for _ in range(minconn):
+                conn = self._open()
+                with self._cond:
+                    self._size += 1
+                    self._idle.append(conn)
+        except psycopg2.OperationalError as e:
+            logger.warning("Não foi possível abrir as conexões iniciais do pool (serão abertas sob demanda): %s", e)
+
+    # --- Ciclo de vida das conexões ---
+
+    def _open(self):
+        conn = psycopg2.connect(**self._conn_params)
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Fecha uma conexão e libera sua vaga no pool. Deve ser chamado com o lock."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._size -= 1
+        self._stats["connections_discarded"] += 1
+        self._cond.notify()
+
+    def getconn(self):
+        """Retira uma conexão do pool. Prefira o context manager `connection()`."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("O pool de conexões foi fechado.")
+                if self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed:
+                        self._discard(conn)
+                        continue
+                    break
+                if self._size < self.maxconn:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"Nenhuma conexão disponível após {self.timeout:.1f}s "
+                        f"({len(self._in_use)} em uso de {self.maxconn})."
+                    )
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._in_use[id(conn)] = {
+                "conn": conn,
+                "since": time.monotonic(),
+                "thread": threading.current_thread().name,
+                "stack": "".join(traceback.format_stack(limit=8)[:-3]),
+                "reported": False,
+            }
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        self.check_leaks()
         return conn
-    except psycopg2.OperationalError as e:
-        print(f"Erro ao conectar ao banco de dados: {e}")
-        return None
\ No newline at end of file
+
+    def putconn(self, conn):
+        """Devolve ao pool uma conexão obtida com `getconn()`."""
+        with self._cond:
+            info = self._in_use.pop(id(conn), None)
+        if info is not None:
+            held = time.monotonic() - info["since"]
+            if held > self.leak_timeout and not info["reported"]:
+                with self._cond:
+                    self._stats["leaks_detected"] += 1
+                logger.warning("Conexão devolvida após %.1fs (limite %.1fs). Emprestada em:\n%s",
+                               held, self.leak_timeout, info["stack"])
+
+        # Descarta transações que o chamador deixou abertas (ex.: SELECT sem commit)
+        healthy = not conn.closed
+        if healthy and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+            else:
+                self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Empresta uma conexão do pool e a devolve ao sair do bloco `with`.
+        Se o bloco lançar uma exceção a transação em aberto é desfeita.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            _rollback_quietly(conn)
+            raise
+        finally:
+            self.putconn(conn)
+
+    def clear_idle(self):
+        """Fecha as conexões ociosas (ex.: depois de uma queda do servidor, quando já estão mortas)."""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def close(self):
+        """Fecha todas as conexões ociosas e impede novos empréstimos."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            self._cond.notify_all()
+
+    # --- Diagnóstico ---
+
+    def check_leaks(self):
+        """
+        Registra no log as conexões emprestadas há mais de `leak_timeout` segundos.
+        Cada empréstimo é reportado uma única vez.
+
+        Returns:
+            list[dict]: Os empréstimos suspeitos (thread, tempo retido e pilha).
+        """
+        now = time.monotonic()
+        leaks = []
+        with self._cond:
+            for info in self._in_use.values():
+                held = now - info["since"]
+                if held <= self.leak_timeout:
+                    continue
+                leaks.append({"thread": info["thread"], "held": held, "stack": info["stack"]})
+                if not info["reported"]:
+                    info["reported"] = True
+                    self._stats["leaks_detected"] += 1
+                    logger.warning("Possível vazamento: conexão retida há %.1fs pela thread %s. Emprestada em:\n%s",
+                                   held, info["thread"], info["stack"])
+        return leaks
+
+    def stats(self):
+        """Retorna um dicionário com o estado atual e os contadores acumulados do pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=len(self._in_use),
+                minconn=self.minconn,
+                maxconn=self.maxconn,
+            )
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+
+class ReplicaRouter:
+    """
+    Decide se uma leitura pode ir para a réplica de relatórios.
+
+    A leitura vai para o primário quando a réplica está atrasada mais que `max_lag`
+    segundos (ou inacessível) e quando a própria thread escreveu no primário há
+    menos de `sticky_window` segundos, para que ela enxergue o que acabou de gravar.
+    O atraso é medido no máximo a cada `check_interval` segundos.
+    """
+    LAG_SQL = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self, replica_pool, max_lag=5.0, check_interval=2.0, sticky_window=5.0):
+        self.replica_pool = replica_pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_window = sticky_window
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._lag = None
+        self._checked_at = None
+        self._stats = {"replica_reads": 0, "sticky_reads": 0, "lag_fallbacks": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def mark_write(self):
+        """Registra que a thread atual acabou de usar o primário para escrita."""
+        self._local.last_write = time.monotonic()
+
+    def replica_lag(self):
+        """Atraso de replicação em segundos, ou None se a réplica não respondeu."""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self._lag
+            # Marca antes de consultar para que só uma thread meça o atraso por intervalo
+            self._checked_at = now
+        lag = None
+        try:
+            with self.replica_pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(self.LAG_SQL)
+                    lag = float(cur.fetchone()[0])
+        except (psycopg2.Error, PoolError) as e:
+            logger.warning("Réplica indisponível, leituras seguem para o primário: %s", e)
+        with self._lock:
+            self._lag = lag
+        return lag
+
+    def use_replica(self):
+        """True se a próxima leitura da thread atual pode ser servida pela réplica."""
+        last_write = getattr(self._local, "last_write", None)
+        if last_write is not None and time.monotonic() - last_write < self.sticky_window:
+            self._count("sticky_reads")
+            return False
+        lag = self.replica_lag()
+        if lag is None or lag > self.max_lag:
+            self._count("lag_fallbacks")
+            return False
+        self._count("replica_reads")
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, replica_lag=self._lag)
+        stats["primary_reads"] = stats["sticky_reads"] + stats["lag_fallbacks"]
+        return stats
+
+
+_pool = None
+_router = None
+_breaker = None
+_pool_lock = threading.Lock()
+
+# Novas tentativas ao abrir conexões com o primário
+connect_retry = RetryPolicy(
+    max_attempts=int(os.getenv('DB_CONNECT_RETRIES', '3')),
+    base_delay=float(os.getenv('DB_RETRY_BASE_DELAY', '0.1')),
+    max_delay=float(os.getenv('DB_RETRY_MAX_DELAY', '2')),
+    retry_on=is_connection_error,
+)
+
+
+def get_pool():
+    """Retorna o pool de conexões da aplicação, criando-o no primeiro uso a partir do .env."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                    maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                    leak_timeout=float(os.getenv('DB_POOL_LEAK_TIMEOUT', '60')),
+                    cursor_factory=InstrumentedCursor,
+                    **_connection_params()
+                )
+    return _pool
+
+
+def _clear_idle_connections():
+    if _pool is not None:
+        _pool.clear_idle()
+
+
+def get_breaker():
+    """Retorna o disjuntor que protege o primário contra tentativas repetidas durante uma queda."""
+    global _breaker
+    if _breaker is None:
+        with _pool_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=int(os.getenv('DB_BREAKER_FAILURES', '5')),
+                    reset_timeout=float(os.getenv('DB_BREAKER_RESET_TIMEOUT', '10')),
+                    on_open=_clear_idle_connections,
+                )
+    return _breaker
+
+
+def get_router():
+    """
+    Retorna o roteador de leituras para a réplica configurada em DB_REPLICA_DSN,
+    ou None quando não há réplica (todas as consultas vão para o primário).
+    """
+    global _router
+    dsn = os.getenv('DB_REPLICA_DSN')
+    if not dsn:
+        return None
+    if _router is None:
+        with _pool_lock:
+            if _router is None:
+                replica_pool = ConnectionPool(
+                    minconn=0,
+                    maxconn=int(os.getenv('DB_REPLICA_POOL_MAX', os.getenv('DB_POOL_MAX', '10'))),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                    leak_timeout=float(os.getenv('DB_POOL_LEAK_TIMEOUT', '60')),
+                    cursor_factory=InstrumentedCursor,
+                    dsn=dsn
+                )
+                _router = ReplicaRouter(
+                    replica_pool,
+                    max_lag=float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+                    check_interval=float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '2')),
+                    sticky_window=float(os.getenv('DB_READ_YOUR_WRITES_WINDOW', '5')),
+                )
+    return _router
+
+
+def close_pool():
+    """Fecha os pools da aplicação (usado ao encerrar o programa)."""
+    global _pool, _router
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _router is not None:
+            _router.replica_pool.close()
+            _router = None
+
+
+def _checkout_primary():
+    """
+    Empresta uma conexão do primário passando pelo disjuntor e pela política de novas
+    tentativas. Lança DatabaseUnavailableError se o banco não puder ser alcançado.
+    """
+    pool = get_pool()
+    breaker = get_breaker()
+    attempt = 1
+    while True:
+        mode = breaker.allow()
+        if mode is None:
+            raise DatabaseUnavailableError(
+                f"Banco de dados indisponível; nova tentativa em {breaker.retry_after():.0f}s."
+            )
+        conn = None
+        try:
+            conn = pool.getconn()
+            if mode == "probe":
+                # O teste do disjuntor precisa provar que o servidor responde
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+        except psycopg2.Error as e:
+            if conn is not None:
+                pool.putconn(conn)
+            if not is_connection_error(e):
+                if mode == "probe":
+                    breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= connect_retry.max_attempts:
+                raise DatabaseUnavailableError(f"Erro ao conectar ao banco de dados: {e}") from e
+            time.sleep(connect_retry.backoff(attempt))
+            attempt += 1
+            continue
+        except BaseException:
+            if conn is not None:
+                pool.putconn(conn)
+            if mode == "probe":
+                breaker.record_failure()
+            raise
+        breaker.record_success()
+        return pool, conn
+
+
+@contextmanager
+def get_connection(readonly=None, query_class=None):
+    """
+    Empresta uma conexão para uso em um bloco `with`.
+
+    Args:
+        readonly (bool, optional): Se True a conexão pode vir da réplica de relatórios
+            (ver ReplicaRouter). Por padrão é deduzido de `query_class`.
+        query_class (str, optional): 'oltp_write', 'point_read', 'report', 'export' ou 'bulk_load'.
+            Define o statement_timeout e o lock_timeout da transação (QUERY_TIMEOUTS);
+            estouros viram QueryTimeoutError.
+
+    Se o banco estiver fora do ar lança DatabaseUnavailableError (depois das novas
+    tentativas, ou de imediato enquanto o disjuntor estiver aberto) para que a
+    interface mostre o erro real.
+    """
+    check_query_class(query_class)
+    if readonly is None:
+        readonly = query_class in READ_QUERY_CLASSES
+    router = get_router()
+    pool = None
+    conn = None
+    if readonly and router is not None and router.use_replica():
+        try:
+            pool = router.replica_pool
+            conn = pool.getconn()
+        except (psycopg2.OperationalError, PoolError) as e:
+            logger.warning("Falha ao conectar na réplica, usando o primário: %s", e)
+            conn = None
+    if conn is None:
+        pool, conn = _checkout_primary()
+    try:
+        if query_class is not None:
+            with conn.cursor() as cur:
+                apply_query_timeouts(cur, query_class)
+        yield conn
+    except (psycopg2.errors.QueryCanceled, psycopg2.errors.LockNotAvailable) as e:
+        _rollback_quietly(conn)
+        raise QueryTimeoutError(query_class, e) from e
+    except Exception as e:
+        _rollback_quietly(conn)
+        if pool is _pool and is_connection_error(e):
+            get_breaker().record_failure()
+        raise
+    finally:
+        pool.putconn(conn)
+        if not readonly and router is not None:
+            router.mark_write()
+
+
+class PreparedStatementRegistry:
+    """
+    Registro de comandos preparados no servidor (PREPARE/EXECUTE).
+
+    Os models registram seus comandos mais frequentes uma única vez; cada conexão do
+    pool executa o PREPARE na primeira vez que usa o comando e, dali em diante, envia
+    apenas o EXECUTE, poupando o parse e o planejamento a cada chamada. Com
+    DB_PREPARED_STATEMENTS=0 (ex.: atrás de um pgbouncer em modo transação) os
+    comandos são enviados como SQL comum.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._statements = {}  # nome -> (sql com $1..$n, tipos dos parâmetros)
+        self._prepared = weakref.WeakKeyDictionary()  # conexão -> nomes já preparados
+        self._lock = threading.Lock()
+
+    def register(self, name, sql, param_types=()):
+        """Registra `sql` (com parâmetros $1..$n) sob `name`. Retorna o próprio nome."""
+        self._statements[name] = (sql, tuple(param_types))
+        return name
+
+    def _is_prepared(self, conn, name):
+        with self._lock:
+            return name in self._prepared.get(conn, ())
+
+    def _mark_prepared(self, conn, name):
+        with self._lock:
+            self._prepared.setdefault(conn, set()).add(name)
+
+    def execute(self, cur, name, params=()):
+        """Executa o comando `name` no cursor `cur`, preparando-o na conexão se necessário."""
+        sql, param_types = self._statements[name]
+        params = tuple(params)
+        if not self.enabled:
+            plain = sql
+            for i in range(len(params), 0, -1):
+                plain = plain.replace(f"${i}", f"%s::{param_types[i - 1]}" if param_types else "%s")
+            cur.execute(plain, params)
+            return
+        if not self._is_prepared(cur.connection, name):
+            types = f" ({', '.join(param_types)})" if param_types else ""
+            cur.execute(f"PREPARE {name}{types} AS {sql}")
+            self._mark_prepared(cur.connection, name)
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def prepared_on(self, conn):
+        """Nomes dos comandos já preparados em `conn` (útil para diagnóstico)."""
+        with self._lock:
+            return set(self._prepared.get(conn, ()))
+
+
+prepared_statements = PreparedStatementRegistry(
+    enabled=os.getenv('DB_PREPARED_STATEMENTS', '1') not in ('0', 'false', 'False', '')
+)
@@ -1,21 +1,55 @@
-from .database import get_db_connection
+from .database import get_connection
+from .paginacao import page_size_of, decode_cursor, split_page
+from .read_cache import read_through, invalidate_cached
 
 class FornecedorModel:
     def get_all(self):
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, nome_empresa, contato, telefone FROM fornecedores ORDER BY id")
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, nome_empresa, contato, telefone FROM fornecedores ORDER BY id")
+                return cur.fetchall()
+
+    def get_page(self, page_size=None, cursor=None):
+        """
+        Uma página de get_all() a partir de `cursor` (None para a primeira), por
+        busca de chave (id > último id) em vez de OFFSET.
+        Retorna (linhas, cursor da próxima página ou None se não há mais).
+        """
+        page_size = page_size_of(page_size)
+        ultimo_id = decode_cursor("fornecedores", cursor, 1)[0] if cursor else 0
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, nome_empresa, contato, telefone FROM fornecedores WHERE id > %s ORDER BY id LIMIT %s",
+                            (ultimo_id, page_size + 1))
+                return split_page(cur.fetchall(), page_size, "fornecedores", lambda row: (row[0],))
+
+    @read_through("fornecedores", key=int)
+    def get_by_id(self, fornecedor_id):
+        """Um fornecedor no formato de get_all(), ou None; passa pelo cache de leitura "fornecedores"."""
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, nome_empresa, contato, telefone FROM fornecedores WHERE id = %s", (fornecedor_id,))
+                return cur.fetchone()
+
+    def get_by_ids(self, ids):
+        """Busca vários fornecedores em uma única consulta. Retorna dict {id: linha} (ids inexistentes ficam de fora)."""
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return {}
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, nome_empresa, contato, telefone FROM fornecedores WHERE id = ANY(%s)", (ids,))
+                return {row[0]: row for row in cur.fetchall()}
 
     def create(self, nome_empresa, contato, telefone):
-        conn = get_db_connection()
-        if not conn: return None
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO fornecedores (nome_empresa, contato, telefone) VALUES (%s, %s, %s) RETURNING id",
-                (nome_empresa, contato, telefone)
-            )
-            new_id = cur.fetchone()[0]
-            conn.commit()
-            return new_id
\ No newline at end of file
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO fornecedores (nome_empresa, contato, telefone) VALUES (%s, %s, %s) RETURNING id",
+                    (nome_empresa, contato, telefone)
+                )
+                new_id = cur.fetchone()[0]
+                conn.commit()
+        # Descarta um "não existe" guardado para o id novo
+        invalidate_cached("fornecedores", new_id)
+        return new_id
\ No newline at end of file
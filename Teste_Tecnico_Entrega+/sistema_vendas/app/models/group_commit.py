@@ -0,0 +1,106 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Fila de escrita com commit em grupo (write-behind).
+
+    Os chamadores enfileiram itens com `submit` e recebem um Future. Uma thread de fundo
+    junta os itens em lotes de até `max_batch` itens, esperando no máximo `max_wait_ms`
+    depois do primeiro item do lote, e grava cada lote com uma única chamada a
+    `flush(itens)`, que deve devolver um resultado por item (na mesma ordem). Assim um
+    único COMMIT (e um único fsync) atende vários chamadores.
+
+    A fila é limitada a `max_queue` itens: com ela cheia, `submit` espera por espaço
+    (ou lança queue.Full depois de `timeout` segundos), segurando quem produz mais
+    rápido do que o banco consegue gravar.
+    """
+    def __init__(self, flush, max_batch=100, max_wait_ms=5.0, max_queue=10000, name="group-commit-writer"):
+        self.flush = flush
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._closed = False
+        # Guarda _closed junto com o put na fila: nenhum item entra depois do _STOP.
+        # Separado de _lock porque submit pode esperar por espaço na fila segurando-o,
+        # e a thread de fundo usa _lock a cada lote.
+        self._submit_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout=None):
+        """Enfileira `item` e retorna um Future com o resultado de flush para ele."""
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("A fila de escrita já foi encerrada.")
+            self._queue.put((item, future), timeout=timeout)
+        return future
+
+    def close(self, timeout=None):
+        """Para de aceitar itens, grava os que já estão na fila e encerra a thread de fundo."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Lotes gravados, itens gravados, tamanho médio do lote e itens aguardando na fila."""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch": self._items / self._batches if self._batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Com o prazo vencido ainda aproveita o que já estiver na fila
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+
+    def _write(self, batch):
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.flush([item for item, _ in batch])
+        except Exception as e:
+            logger.exception("Falha ao gravar um lote de %d itens", len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
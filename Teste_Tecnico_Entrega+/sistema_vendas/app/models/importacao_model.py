@@ -0,0 +1,301 @@
+import io
+import os
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+
+from .database import get_connection, apply_query_timeouts
+from .venda_model import BAIXA_FATIAS
+from .produto_model import produtos_alterados
+from .particao_model import ParticaoModel
+
+# Linhas movidas da tabela de preparação para vendas a cada transação
+IMPORT_CHUNK_SIZE = int(os.getenv('DB_IMPORT_CHUNK_SIZE', '10000'))
+
+# Quantas linhas rejeitadas na leitura do arquivo são guardadas para o relatório
+MAX_ERROS_DETALHADOS = 20
+
+STAGING_DDL = """
+    CREATE TEMP TABLE vendas_importacao (
+        linha BIGINT NOT NULL,
+        produto_id INT NOT NULL,
+        cliente_id INT NOT NULL,
+        quantidade INT NOT NULL,
+        valor_total NUMERIC(10,2),
+        data_venda TIMESTAMP,
+        motivo TEXT
+    )
+"""
+
+# Validação em conjunto: uma junção por regra em vez de uma consulta por linha
+VALIDACOES = (
+    ("quantidade inválida", "s.quantidade <= 0"),
+    ("produto inexistente", "NOT EXISTS (SELECT 1 FROM produtos p WHERE p.id = s.produto_id)"),
+    ("cliente inexistente", "NOT EXISTS (SELECT 1 FROM clientes c WHERE c.id = s.cliente_id)"),
+)
+
+# Período das datas do arquivo: as partições mensais que faltam são criadas antes da carga
+# (ParticaoModel.create_range), para vendas históricas não irem parar na partição padrão
+PERIODO_DO_ARQUIVO = """
+    SELECT MIN(data_venda)::DATE, (MAX(data_venda) + INTERVAL '1 day')::DATE
+    FROM vendas_importacao
+    WHERE motivo IS NULL
+"""
+
+# Bloqueia (em ordem de id) os produtos de um bloco antes de baixar o estoque
+LOCK_PRODUTOS_BLOCO = """
+    SELECT id FROM produtos
+    WHERE id IN (SELECT produto_id FROM vendas_importacao
+                 WHERE linha > %s AND linha <= %s AND motivo IS NULL)
+    ORDER BY id
+    FOR UPDATE
+"""
+# ... e, depois deles, as fatias dos produtos com estoque fatiado
+LOCK_FATIAS_BLOCO = """
+    SELECT produto_id, shard FROM estoque_shards
+    WHERE produto_id IN (SELECT produto_id FROM vendas_importacao
+                         WHERE linha > %s AND linha <= %s AND motivo IS NULL)
+    ORDER BY produto_id, shard
+    FOR UPDATE
+"""
+
+# Produtos do bloco cujo total pedido passa do estoque atual (somando as fatias): só as
+# linhas deles precisam ser conferidas uma a uma
+PRODUTOS_SEM_ESTOQUE = """
+    SELECT i.produto_id, p.estoque
+    FROM vendas_importacao i
+    JOIN produtos_estoque p ON p.id = i.produto_id
+    WHERE i.linha > %s AND i.linha <= %s AND i.motivo IS NULL
+    GROUP BY i.produto_id, p.estoque
+    HAVING SUM(i.quantidade) > p.estoque
+"""
+LINHAS_DOS_PRODUTOS = """
+    SELECT linha, produto_id, quantidade FROM vendas_importacao
+    WHERE linha > %s AND linha <= %s AND motivo IS NULL AND produto_id = ANY(%s)
+    ORDER BY linha
+"""
+RECUSA_SEM_ESTOQUE = "UPDATE vendas_importacao SET motivo = 'estoque insuficiente' WHERE linha = ANY(%s)"
+
+MOVE_BLOCO = """
+    WITH novas AS (
+        INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda)
+        SELECT s.produto_id, s.cliente_id, s.quantidade,
+               COALESCE(s.valor_total, p.preco * s.quantidade), COALESCE(s.data_venda, NOW())
+        FROM vendas_importacao s
+        JOIN produtos p ON p.id = s.produto_id
+        WHERE s.linha > %s AND s.linha <= %s AND s.motivo IS NULL
+        ORDER BY s.linha
+        RETURNING produto_id, quantidade
+    ){baixa}
+    SELECT COUNT(*), array_agg(DISTINCT produto_id) FROM novas
+"""
+
+BAIXA_ESTOQUE_BLOCO = """, baixa AS (
+        UPDATE produtos p SET estoque = p.estoque - t.total
+        FROM (SELECT produto_id, SUM(quantidade) AS total FROM novas GROUP BY produto_id) t
+        WHERE p.id = t.produto_id AND p.num_shards = 0
+    ), baixa_fatias AS (""" + BAIXA_FATIAS.format(
+        totais="SELECT produto_id, SUM(quantidade) AS total FROM novas GROUP BY produto_id") + """
+    )"""
+
+
+class _CopyStream:
+    """Adapta um gerador de linhas de texto ao read() usado por copy_expert, sem carregar o arquivo."""
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._lines).encode("utf-8")
+            except StopIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _detect_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _read_records(path, formato):
+    """Gera (número da linha, dict) a partir de um CSV com cabeçalho ou de um JSONL."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if formato == "csv":
+            for numero, registro in enumerate(csv.DictReader(f), start=2):
+                yield numero, registro
+        else:
+            for numero, texto in enumerate(f, start=1):
+                if not texto.strip():
+                    continue
+                try:
+                    yield numero, json.loads(texto)
+                except ValueError as e:
+                    yield numero, e
+
+
+def _parse_record(registro):
+    """Converte um registro do arquivo na linha da tabela de preparação; lança ValueError se inválido."""
+    if isinstance(registro, Exception):
+        raise ValueError(f"JSON inválido ({registro})")
+    if not isinstance(registro, dict):
+        raise ValueError("registro não é um objeto")
+    try:
+        produto_id = int(registro["produto_id"])
+        cliente_id = int(registro["cliente_id"])
+        quantidade = int(registro["quantidade"])
+    except KeyError as e:
+        raise ValueError(f"campo obrigatório ausente: {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("produto_id, cliente_id e quantidade devem ser inteiros")
+    valor_total = registro.get("valor_total")
+    if valor_total not in (None, ""):
+        try:
+            valor_total = Decimal(str(valor_total))
+        except InvalidOperation:
+            raise ValueError(f"valor_total inválido: {valor_total!r}")
+    else:
+        valor_total = None
+    data_venda = registro.get("data_venda")
+    if data_venda not in (None, ""):
+        try:
+            data_venda = datetime.fromisoformat(str(data_venda))
+        except ValueError:
+            raise ValueError(f"data_venda inválida: {data_venda!r}")
+    else:
+        data_venda = None
+    return produto_id, cliente_id, quantidade, valor_total, data_venda
+
+
+class ImportacaoModel:
+    """
+    Importação em massa de vendas históricas a partir de arquivos CSV ou JSONL.
+
+    O arquivo é lido em streaming e enviado com COPY para uma tabela temporária de
+    preparação; produto_id/cliente_id são validados com junções em conjunto e as linhas
+    válidas são movidas para vendas em blocos de `chunk_size`, um COMMIT por bloco.
+    O uso de memória não depende do tamanho do arquivo.
+    """
+    def import_file(self, path, formato=None, baixar_estoque=True, chunk_size=None, progress=None):
+        """
+        Importa o arquivo `path` para a tabela vendas.
+
+        Args:
+            path (str): Caminho do arquivo. CSV com cabeçalho ou JSONL (um objeto por linha)
+                com os campos produto_id, cliente_id, quantidade e, opcionalmente,
+                valor_total (padrão: preço atual * quantidade) e data_venda (padrão: NOW()).
+            formato (str, optional): 'csv' ou 'jsonl'; por padrão deduzido da extensão.
+            baixar_estoque (bool): Se False as vendas são gravadas sem mexer no estoque
+                (dados históricos). Se True, o estoque é reservado na ordem do arquivo, como
+                em VendaModel.register_sales_batch: uma linha que não cabe no estoque
+                restante é recusada sem impedir as seguintes.
+            chunk_size (int, optional): Linhas por transação ao mover para vendas.
+            progress (callable, optional): Chamado como progress(processadas, total, importadas)
+                após cada bloco.
+
+        Returns:
+            dict: 'lidas', 'importadas', 'rejeitadas' ({motivo: quantidade}) e
+            'erros' (até MAX_ERROS_DETALHADOS pares (linha, motivo) da leitura do arquivo).
+        """
+        formato = formato or _detect_format(path)
+        if formato not in ("csv", "jsonl"):
+            raise ValueError(f"Formato não suportado: {formato}")
+        chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+        resumo = {"lidas": 0, "importadas": 0, "rejeitadas": {}, "erros": []}
+
+        def copy_lines():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for numero, registro in _read_records(path, formato):
+                resumo["lidas"] += 1
+                try:
+                    linha = _parse_record(registro)
+                except ValueError as e:
+                    resumo["rejeitadas"]["formato inválido"] = resumo["rejeitadas"].get("formato inválido", 0) + 1
+                    if len(resumo["erros"]) < MAX_ERROS_DETALHADOS:
+                        resumo["erros"].append((numero, str(e)))
+                    continue
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow((numero,) + tuple("" if v is None else v for v in linha))
+                yield buffer.getvalue()
+
+        with get_connection(query_class="bulk_load") as conn:
+            with conn.cursor() as cur:
+                cur.execute("DROP TABLE IF EXISTS pg_temp.vendas_importacao")
+                cur.execute(STAGING_DDL)
+                cur.copy_expert(
+                    "COPY vendas_importacao (linha, produto_id, cliente_id, quantidade, valor_total, data_venda) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    _CopyStream(copy_lines()),
+                )
+                cur.execute("CREATE INDEX ON vendas_importacao (linha)")
+                cur.execute("ANALYZE vendas_importacao")
+
+                for motivo, condicao in VALIDACOES:
+                    cur.execute(f"UPDATE vendas_importacao s SET motivo = %s WHERE s.motivo IS NULL AND {condicao}",
+                                (motivo,))
+                    if cur.rowcount:
+                        resumo["rejeitadas"][motivo] = cur.rowcount
+                cur.execute(PERIODO_DO_ARQUIVO)
+                periodo = cur.fetchone()
+                conn.commit()
+                if periodo[0] is not None:
+                    ParticaoModel().create_range(*periodo)
+
+                cur.execute("SELECT COALESCE(MIN(linha), 0), COALESCE(MAX(linha), 0), COUNT(*) FROM vendas_importacao")
+                primeira, ultima, total = cur.fetchone()
+                processadas = 0
+                inicio = primeira - 1
+                move = MOVE_BLOCO.format(baixa=BAIXA_ESTOQUE_BLOCO if baixar_estoque else "")
+                while inicio < ultima:
+                    fim = inicio + chunk_size
+                    apply_query_timeouts(cur, "bulk_load")
+                    if baixar_estoque:
+                        cur.execute(LOCK_PRODUTOS_BLOCO, (inicio, fim))
+                        cur.execute(LOCK_FATIAS_BLOCO, (inicio, fim))
+                        recusadas = self._refuse_out_of_stock(cur, inicio, fim)
+                        if recusadas:
+                            resumo["rejeitadas"]["estoque insuficiente"] = \
+                                resumo["rejeitadas"].get("estoque insuficiente", 0) + recusadas
+                    cur.execute(move, (inicio, fim))
+                    importadas, produtos = cur.fetchone()
+                    resumo["importadas"] += importadas
+                    cur.execute("SELECT COUNT(*) FROM vendas_importacao WHERE linha > %s AND linha <= %s",
+                                (inicio, fim))
+                    processadas += cur.fetchone()[0]
+                    conn.commit()
+                    if baixar_estoque and produtos:
+                        produtos_alterados(produtos, wait=False)
+                    if progress is not None:
+                        progress(processadas, total, resumo["importadas"])
+                    inicio = fim
+
+                cur.execute("DROP TABLE vendas_importacao")
+                conn.commit()
+        return resumo
+
+    def _refuse_out_of_stock(self, cur, inicio, fim):
+        """
+        Marca como 'estoque insuficiente' as linhas do bloco que não cabem no estoque
+        restante, na ordem do arquivo; linhas recusadas não contam para as seguintes.
+        Só lê as linhas dos produtos cujo total passa do estoque. Retorna quantas recusou.
+        """
+        cur.execute(PRODUTOS_SEM_ESTOQUE, (inicio, fim))
+        restante = dict(cur.fetchall())
+        if not restante:
+            return 0
+        cur.execute(LINHAS_DOS_PRODUTOS, (inicio, fim, list(restante)))
+        recusadas = []
+        for linha, produto_id, quantidade in cur.fetchall():
+            if quantidade > restante[produto_id]:
+                recusadas.append(linha)
+            else:
+                restante[produto_id] -= quantidade
+        cur.execute(RECUSA_SEM_ESTOQUE, (recusadas,))
+        return len(recusadas)
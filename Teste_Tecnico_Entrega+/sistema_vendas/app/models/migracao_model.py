@@ -0,0 +1,214 @@
+import os
+import re
+import glob
+import time
+
+import psycopg2.errors
+
+from .database import get_connection
+from .resilience import RetryPolicy
+
+MIGRATIONS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "database", "migrations"))
+
+# Espera máxima (ms) pelos bloqueios curtos de DDL; estourado, o comando é refeito depois
+MIGRATION_LOCK_TIMEOUT = int(os.getenv('DB_MIGRATION_LOCK_TIMEOUT', '2000'))
+
+# Chave do pg_try_advisory_lock que impede duas execuções de migrações ao mesmo tempo
+_ADVISORY_LOCK_KEY = 48151623
+
+# Refaz os comandos que não conseguiram o bloqueio dentro de DB_MIGRATION_LOCK_TIMEOUT:
+# desistir logo e tentar de novo evita formar fila na frente das vendas
+lock_retry = RetryPolicy(
+    max_attempts=int(os.getenv('DB_MIGRATION_LOCK_RETRIES', '10')),
+    base_delay=0.5,
+    max_delay=5.0,
+    retry_on=lambda e: isinstance(e, psycopg2.errors.LockNotAvailable),
+)
+
+CREATE_CONTROLE = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao VARCHAR(20) PRIMARY KEY,
+        descricao TEXT NOT NULL,
+        aplicada_em TIMESTAMP NOT NULL DEFAULT NOW(),
+        duracao_ms INT
+    )
+"""
+
+INDICE_CONCORRENTE = re.compile(
+    r"^CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)\s+(.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+PARTICOES = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s)
+    ORDER BY c.relname
+"""
+
+# Índice da partição já anexado ao índice da tabela particionada (ex.: criado junto com a partição)
+INDICE_ANEXADO = """
+    SELECT 1
+    FROM pg_inherits i
+    JOIN pg_index x ON x.indexrelid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s) AND x.indrelid = to_regclass(%s)
+"""
+
+
+class MigrationLockedError(RuntimeError):
+    """Outra execução de migrações está em andamento."""
+
+
+def _statements(texto):
+    """Divide um arquivo .sql em comandos (terminados por ';' no fim da linha), sem os comentários."""
+    linhas = [l for l in texto.splitlines() if not l.strip().startswith("--")]
+    return [c.strip() for c in re.split(r";[ \t]*(?:\n|$)", "\n".join(linhas)) if c.strip()]
+
+
+def _discover():
+    """(versao, descricao, caminho) de cada database/migrations/NNNN_descricao.sql, em ordem."""
+    for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+        versao, _, descricao = os.path.basename(path)[:-4].partition("_")
+        yield versao, descricao.replace("_", " "), path
+
+
+def _child_index_name(indice, tabela, particao):
+    sufixo = particao[len(tabela) + 1:] if particao.startswith(tabela + "_") else particao
+    return f"{indice}_{sufixo}"[:63]
+
+
+class MigracaoModel:
+    """
+    Migrações versionadas do banco: arquivos database/migrations/NNNN_descricao.sql
+    aplicados em ordem, uma única vez cada, com as versões registradas em schema_migracoes.
+
+    Um arquivo sem CREATE INDEX CONCURRENTLY roda inteiro em uma transação. Um arquivo com
+    CONCURRENTLY roda comando a comando (separados por ';' no fim da linha) fora de
+    transação, para os índices serem criados sem bloquear escritas (register_sale
+    continua gravando). Nas tabelas particionadas, onde o PostgreSQL não aceita
+    CONCURRENTLY, o índice é criado ON ONLY na tabela mãe, concorrentemente em cada
+    partição e anexado a seguir. Os comandos concorrentes devem usar IF NOT EXISTS:
+    uma execução interrompida pode ser repetida, e índices inválidos
+    deixados por ela são recriados.
+    """
+    def list_migrations(self):
+        """Retorna lista de (versao, descricao, aplicada_em); aplicada_em é None se pendente."""
+        with get_connection(query_class="point_read", readonly=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('schema_migracoes') IS NOT NULL")
+                aplicadas = {}
+                if cur.fetchone()[0]:
+                    cur.execute("SELECT versao, aplicada_em FROM schema_migracoes")
+                    aplicadas = dict(cur.fetchall())
+        return [(versao, descricao, aplicadas.get(versao)) for versao, descricao, _ in _discover()]
+
+    def apply_pending(self, progress=None):
+        """
+        Aplica as migrações pendentes, em ordem. `progress(mensagem)` é chamado a cada
+        passo. Retorna as versões aplicadas. Lança MigrationLockedError se outra execução
+        estiver em andamento.
+        """
+        progress = progress or (lambda mensagem: None)
+        aplicadas_agora = []
+        with get_connection(query_class="bulk_load") as conn:
+            conn.rollback()
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SET statement_timeout = 0")
+                    cur.execute("SELECT pg_try_advisory_lock(%s)", (_ADVISORY_LOCK_KEY,))
+                    if not cur.fetchone()[0]:
+                        raise MigrationLockedError("Outra execução de migrações está em andamento.")
+                    try:
+                        cur.execute(CREATE_CONTROLE)
+                        cur.execute("SELECT versao FROM schema_migracoes")
+                        aplicadas = {row[0] for row in cur.fetchall()}
+                        for versao, descricao, path in _discover():
+                            if versao in aplicadas:
+                                continue
+                            progress(f"Aplicando {versao} ({descricao})")
+                            self._apply(cur, versao, descricao, path, progress)
+                            aplicadas_agora.append(versao)
+                    finally:
+                        cur.execute("SELECT pg_advisory_unlock(%s)", (_ADVISORY_LOCK_KEY,))
+            finally:
+                with conn.cursor() as cur:
+                    cur.execute("RESET statement_timeout")
+                    cur.execute("RESET lock_timeout")
+                conn.autocommit = False
+        return aplicadas_agora
+
+    def _apply(self, cur, versao, descricao, path, progress):
+        with open(path, encoding="utf-8") as f:
+            texto = f.read()
+        comandos = _statements(texto)
+        inicio = time.perf_counter()
+        if any(INDICE_CONCORRENTE.match(c) for c in comandos):
+            for comando in comandos:
+                self._run_online(cur, comando, progress)
+            duracao = int((time.perf_counter() - inicio) * 1000)
+            cur.execute("INSERT INTO schema_migracoes (versao, descricao, duracao_ms) VALUES (%s, %s, %s)",
+                        (versao, descricao, duracao))
+            return
+        self._set_lock_timeout(cur, MIGRATION_LOCK_TIMEOUT)
+        cur.execute("BEGIN")
+        try:
+            # O arquivo vai inteiro (funções plpgsql têm ';' no corpo)
+            cur.execute(texto)
+            duracao = int((time.perf_counter() - inicio) * 1000)
+            cur.execute("INSERT INTO schema_migracoes (versao, descricao, duracao_ms) VALUES (%s, %s, %s)",
+                        (versao, descricao, duracao))
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    def _set_lock_timeout(self, cur, ms):
+        cur.execute("SELECT set_config('lock_timeout', %s, false)", (str(ms),))
+
+    def _run_online(self, cur, comando, progress):
+        m = INDICE_CONCORRENTE.match(comando)
+        if m is None:
+            self._set_lock_timeout(cur, MIGRATION_LOCK_TIMEOUT)
+            lock_retry.call(cur.execute, comando)
+            return
+        unique, indice, tabela, definicao = m.group(1) or "", m.group(2), m.group(3), m.group(4)
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (tabela,))
+        row = cur.fetchone()
+        if row is None or row[0] != "p":
+            progress(f"  {indice} em {tabela}")
+            lock_retry.call(self._create_index_concurrently, cur, unique, indice, tabela, definicao)
+            return
+        if self._index_valid(cur, indice):
+            return
+        # O índice ON ONLY na mãe não lê dados, mas precisa de um bloqueio curto da tabela
+        self._set_lock_timeout(cur, MIGRATION_LOCK_TIMEOUT)
+        lock_retry.call(cur.execute, f"CREATE {unique}INDEX IF NOT EXISTS {indice} ON ONLY {tabela} {definicao}")
+        cur.execute(PARTICOES, (tabela,))
+        for (particao,) in cur.fetchall():
+            cur.execute(INDICE_ANEXADO, (indice, particao))
+            if cur.fetchone():
+                continue
+            filho = _child_index_name(indice, tabela, particao)
+            progress(f"  {indice} em {particao}")
+            lock_retry.call(self._create_index_concurrently, cur, unique, filho, particao, definicao)
+            self._set_lock_timeout(cur, MIGRATION_LOCK_TIMEOUT)
+            lock_retry.call(cur.execute, f"ALTER INDEX {indice} ATTACH PARTITION {filho}")
+
+    def _index_valid(self, cur, indice):
+        """True se o índice existe e é válido, False se existe inválido, None se não existe."""
+        cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (indice,))
+        row = cur.fetchone()
+        return None if row is None else row[0]
+
+    def _create_index_concurrently(self, cur, unique, indice, tabela, definicao):
+        estado = self._index_valid(cur, indice)
+        if estado:
+            return
+        # CONCURRENTLY não bloqueia escritas, então pode esperar o quanto for preciso
+        # pelas transações antigas da tabela
+        self._set_lock_timeout(cur, 0)
+        if estado is False:
+            cur.execute(f"DROP INDEX CONCURRENTLY {indice}")
+        cur.execute(f"CREATE {unique}INDEX CONCURRENTLY {indice} ON {tabela} {definicao}")
@@ -0,0 +1,54 @@
+import os
+import json
+import base64
+from datetime import datetime
+
+# Tamanho padrão e máximo de uma página nas listagens paginadas (get_page)
+PAGE_SIZE = int(os.getenv('DB_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.getenv('DB_MAX_PAGE_SIZE', '1000'))
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação corrompido ou de outra listagem."""
+    def __init__(self):
+        super().__init__("Cursor de paginação inválido.")
+
+
+def page_size_of(page_size):
+    """Tamanho de página efetivo: o padrão DB_PAGE_SIZE, limitado a 1..DB_MAX_PAGE_SIZE."""
+    return max(1, min(int(page_size or PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def encode_cursor(listagem, chave):
+    """
+    Cursor opaco com a chave (tupla de valores) da última linha de uma página.
+    Guarda o nome da listagem para um cursor de produtos não ser aceito em vendas.
+    """
+    valores = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in chave]
+    texto = json.dumps([listagem, valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(listagem, cursor, tamanho):
+    """Devolve a tupla de `tamanho` valores guardada no cursor ou lança InvalidCursorError."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        nome, valores = json.loads(texto)
+        valores = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in valores]
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidCursorError()
+    if nome != listagem or len(valores) != tamanho:
+        raise InvalidCursorError()
+    return tuple(valores)
+
+
+def split_page(rows, page_size, listagem, chave):
+    """
+    Recebe até page_size + 1 linhas (a extra só indica que há mais) e retorna
+    (linhas da página, cursor da próxima página ou None se esta é a última).
+    `chave(linha)` extrai a tupla de ordenação da linha.
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(listagem, chave(rows[-1]))
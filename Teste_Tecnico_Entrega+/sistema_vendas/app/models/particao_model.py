@@ -0,0 +1,143 @@
+import os
+import re
+from datetime import date
+
+from .database import get_connection
+from .migracao_model import lock_retry
+
+# Quantos meses à frente do atual ensure_partitions() deixa com partição criada
+PARTICOES_MESES_FRENTE = int(os.getenv('DB_PARTICOES_MESES_FRENTE', '3'))
+# Espera máxima (ms) pelo bloqueio de vendas ao criar/desanexar partições; abaixo da espera
+# das vendas (DB_LOCK_TIMEOUT_OLTP_WRITE), para a fila atrás do DDL não fazer vendas falharem.
+# Estourada, o passo é refeito depois (DB_MIGRATION_LOCK_RETRIES vezes, como em migrar.py)
+PARTICOES_LOCK_TIMEOUT = int(os.getenv('DB_PARTICOES_LOCK_TIMEOUT', '500'))
+
+NOME_PARTICAO = re.compile(r"^vendas_(\d{4})_(\d{2})$")
+
+LISTA_PARTICOES = """
+    SELECT c.relname, c.reltuples::BIGINT, pg_total_relation_size(c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'vendas'::regclass
+    ORDER BY c.relname
+"""
+
+# Vendas de um mês que caíram em vendas_default (mês ainda sem partição): saem da padrão
+# antes de criar a partição do mês, senão o CREATE TABLE ... PARTITION OF é recusado, e
+# voltam para vendas depois, já na partição nova
+REALOCACAO_DDL = "CREATE TEMP TABLE vendas_realocadas (LIKE vendas) ON COMMIT DROP"
+RETIRA_DA_PADRAO = """
+    WITH movidas AS (
+        DELETE FROM vendas_default WHERE data_venda >= %s AND data_venda < %s RETURNING *
+    )
+    INSERT INTO vendas_realocadas SELECT * FROM movidas
+"""
+DEVOLVE_REALOCADAS = "INSERT INTO vendas SELECT * FROM vendas_realocadas"
+
+
+def _add_months(mes, meses):
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _month_of(nome):
+    """Primeiro dia do mês de uma partição vendas_AAAA_MM, ou None (ex.: vendas_default)."""
+    m = NOME_PARTICAO.match(nome)
+    return date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+
+class ParticaoModel:
+    """
+    Manutenção das partições mensais da tabela vendas.
+
+    As partições dos próximos meses precisam existir antes de chegarem vendas para eles
+    (o que não cai em nenhuma vai para vendas_default); ensure_partitions() deve rodar
+    periodicamente, ex.: uma vez por mês via particoes_vendas.py criar. Meses antigos
+    saem com detach_before(): DETACH PARTITION só mexe no catálogo, sem apagar linha
+    por linha, e a partição vira uma tabela comum que pode ser arquivada ou removida.
+
+    Criar e desanexar partições bloqueiam vendas por completo (ACCESS EXCLUSIVE; com a
+    partição padrão existente, DETACH ... CONCURRENTLY não é permitido). Cada passo espera
+    no máximo DB_PARTICOES_LOCK_TIMEOUT pelo bloqueio e é refeito depois se não conseguir,
+    em vez de segurar a fila de vendas.
+    """
+    def list_partitions(self):
+        """Retorna lista de (nome, mes, linhas_estimadas, tamanho_bytes); mes é None na partição padrão."""
+        with get_connection(query_class="point_read", readonly=False) as conn:
+            with conn.cursor() as cur:
+                cur.execute(LISTA_PARTICOES)
+                return [(nome, _month_of(nome), max(linhas, 0), tamanho)
+                        for nome, linhas, tamanho in cur.fetchall()]
+
+    def ensure_partitions(self, meses_a_frente=None, desde=None):
+        """
+        Cria as partições que faltam do mês de `desde` (padrão: o mês atual) até
+        `meses_a_frente` meses depois do atual (padrão DB_PARTICOES_MESES_FRENTE).
+        Retorna quantas partições foram criadas.
+        """
+        meses_a_frente = PARTICOES_MESES_FRENTE if meses_a_frente is None else meses_a_frente
+        atual = date.today().replace(day=1)
+        inicio = (desde or atual).replace(day=1)
+        return self.create_range(inicio, _add_months(atual, meses_a_frente + 1))
+
+    def create_range(self, inicio, fim):
+        """
+        Cria as partições mensais que faltam entre `inicio` e `fim` (exclusivo), uma
+        transação por mês. Vendas desses meses que estavam em vendas_default passam para
+        a partição nova. Retorna quantas criou.
+        """
+        existentes = {mes for _, mes, _, _ in self.list_partitions()}
+        mes, criadas = inicio.replace(day=1), 0
+        while mes < fim:
+            if mes not in existentes:
+                seguinte = _add_months(mes, 1)
+                with get_connection(query_class="bulk_load") as conn:
+                    with conn.cursor() as cur:
+                        criadas += lock_retry.call(self._locked_ddl, conn, cur, [
+                            (REALOCACAO_DDL, None),
+                            (RETIRA_DA_PADRAO, (mes, seguinte)),
+                            ("SELECT criar_particoes_vendas(%s, %s)", (mes, seguinte)),
+                            (DEVOLVE_REALOCADAS, None),
+                        ])[2]
+            mes = _add_months(mes, 1)
+        return criadas
+
+    def detach_before(self, mes, remover=False):
+        """
+        Desanexa de vendas as partições mensais anteriores ao mês de `mes` (date), uma
+        transação por partição. Com remover=True a tabela desanexada é apagada em
+        seguida; senão fica como tabela comum, com o mesmo nome, para arquivamento.
+        Retorna os nomes das partições desanexadas.
+        """
+        limite = mes.replace(day=1)
+        antigas = [nome for nome, inicio, _, _ in self.list_partitions()
+                   if inicio is not None and inicio < limite]
+        desanexadas = []
+        for nome in antigas:
+            comandos = [(f'ALTER TABLE vendas DETACH PARTITION "{nome}"', None)]
+            if remover:
+                comandos.append((f'DROP TABLE "{nome}"', None))
+            with get_connection(query_class="bulk_load") as conn:
+                with conn.cursor() as cur:
+                    lock_retry.call(self._locked_ddl, conn, cur, comandos)
+            desanexadas.append(nome)
+        return desanexadas
+
+    def _locked_ddl(self, conn, cur, comandos):
+        """
+        Executa `comandos` (pares (sql, parâmetros)) em uma transação com lock_timeout de
+        DB_PARTICOES_LOCK_TIMEOUT e confirma. Desfaz e relança se algum falhar, para
+        lock_retry poder refazer tudo na mesma conexão. Retorna o resultado de cada comando
+        (primeira coluna da primeira linha, ou None).
+        """
+        try:
+            cur.execute("SELECT set_config('lock_timeout', %s, true)", (str(PARTICOES_LOCK_TIMEOUT),))
+            resultados = []
+            for sql, params in comandos:
+                cur.execute(sql, params)
+                resultados.append(cur.fetchone()[0] if cur.description else None)
+            conn.commit()
+            return resultados
+        except Exception:
+            conn.rollback()
+            raise
@@ -1,66 +1,290 @@
-from .database import get_db_connection
+from .database import get_connection, prepared_statements
+from .paginacao import page_size_of, decode_cursor, split_page, PAGE_SIZE
+from .catalogo_cache import get_catalog_cache, catalog_touched
+from .read_cache import read_through, invalidate_cached
+
+# Comandos preparados no servidor: cada conexão do pool faz o PREPARE uma única vez
+PRODUTO_POR_ID = prepared_statements.register("produto_por_id", """
+    SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+    FROM produtos_estoque p
+    LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+    WHERE p.id = $1
+""", ("int",))
+PRODUTOS_POR_IDS = prepared_statements.register("produtos_por_ids", """
+    SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+    FROM produtos_estoque p
+    LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+    WHERE p.id = ANY($1)
+""", ("int[]",))
+
+# Redistribui `total` unidades igualmente entre as fatias 0..n-1 do produto
+REDISTRIBUI_SHARDS = """
+    UPDATE estoque_shards
+    SET estoque = %(total)s / %(n)s + CASE WHEN shard < %(total)s %% %(n)s THEN 1 ELSE 0 END
+    WHERE produto_id = %(id)s
+"""
+
+# Colunas devolvidas pelas listagens de produtos (get_all e get_page)
+PRODUTOS_SELECT = """
+    SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
+    FROM produtos_estoque p
+    LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+"""
+
+# Quantos produtos search() devolve por padrão
+SEARCH_LIMIT = 50
+
+# Busca por palavras: produtos cujo tsvector `busca` casa com a consulta, do mais para o
+# menos relevante (empate por id). O rank vai como float8 para voltar idêntico no cursor.
+BUSCA_TEXTO = """
+    WITH r AS (
+        SELECT pr.id, ts_rank(pr.busca, q)::FLOAT8 AS rank
+        FROM produtos pr, websearch_to_tsquery('portuguese', sem_acento(%(consulta)s)) q
+        WHERE pr.busca @@ q
+    )
+    SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa, r.rank
+    FROM r
+    JOIN produtos_estoque p ON p.id = r.id
+    LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
+    {continuacao}
+    ORDER BY r.rank DESC, r.id
+    LIMIT %(limite)s
+"""
+CONTINUACAO_BUSCA = "WHERE r.rank < %(rank)s OR (r.rank = %(rank)s AND r.id > %(id)s)"
+
+
+def produtos_alterados(ids, wait=True):
+    """
+    Chamar depois de gravar produtos (cadastro, estoque, vendas): descarta as entradas
+    do cache de get_by_id e atualiza os produtos no catálogo em memória. Vendas, reservas
+    e importações passam wait=False para não esperar a recarga do catálogo.
+    """
+    invalidate_cached("produtos", *ids)
+    catalog_touched(ids, wait=wait)
+
+
+def _escape_like(termo):
+    """Escapa os curingas do LIKE (%, _ e \\) para o termo ser buscado literalmente."""
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class ProdutoModel:
+    """
+    Com o catálogo em memória ativo (start_catalog_cache, ver catalogo_cache.py), get_all,
+    get_page, get_by_id(s), get_by_category, get_by_supplier e search são atendidas sem ir
+    ao banco; sem ele, ou enquanto ele reconecta, as mesmas consultas vão ao banco.
+    """
     def get_all(self):
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
-                FROM produtos p
-                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
-                ORDER BY p.id
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.all_products()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                cur.execute(PRODUTOS_SELECT + " ORDER BY p.id")
+                return cur.fetchall()
+
+    def get_page(self, page_size=None, cursor=None):
+        """
+        Uma página de get_all(), em ordem de id. `cursor` é o valor devolvido pela
+        página anterior (None para a primeira). A página continua de onde a anterior
+        parou (WHERE id > último id) em vez de pular linhas com OFFSET, então qualquer
+        página custa o mesmo que a primeira.
+        Retorna (linhas, cursor da próxima página ou None se não há mais).
+        """
+        page_size = page_size_of(page_size)
+        ultimo_id = decode_cursor("produtos", cursor, 1)[0] if cursor else 0
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return split_page(catalogo.page(ultimo_id, page_size + 1), page_size, "produtos", lambda row: (row[0],))
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute(PRODUTOS_SELECT + " WHERE p.id > %s ORDER BY p.id LIMIT %s",
+                            (ultimo_id, page_size + 1))
+                return split_page(cur.fetchall(), page_size, "produtos", lambda row: (row[0],))
 
     def get_by_id(self, produto_id):
-        conn = get_db_connection()
-        if not conn: return None
-        with conn.cursor() as cur:
-            query = """
-                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
-                FROM produtos p
-                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
-                WHERE p.id = %s
-            """
-            cur.execute(query, (produto_id,))
-            return cur.fetchone()
+        """
+        Um produto no formato de get_all(), ou None. Sem o catálogo em memória, a leitura
+        passa pelo cache "produtos" (DB_READ_CACHE_*): as gravações deste processo o
+        invalidam na hora; as de outros terminais aparecem quando a entrada vence.
+        """
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.get(int(produto_id))
+        return self._fetch_by_id(produto_id)
+
+    @read_through("produtos", key=int)
+    def _fetch_by_id(self, produto_id):
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, PRODUTO_POR_ID, (produto_id,))
+                return cur.fetchone()
+
+    def get_by_ids(self, ids):
+        """
+        Busca vários produtos em uma única consulta (em vez de um get_by_id por id).
+        Retorna dict {id: linha no formato de get_by_id}; ids inexistentes ficam de fora.
+        """
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            return {}
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.get_many(ids)
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, PRODUTOS_POR_IDS, (ids,))
+                return {row[0]: row for row in cur.fetchall()}
 
     def get_by_category(self, categoria):
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            # Usamos LEFT JOIN para mostrar o fornecedor e ILIKE para busca não sensível a maiúsculas
-            query = """
-                SELECT p.id, p.nome, p.preco, p.categoria, p.estoque, f.nome_empresa
-                FROM produtos p
-                LEFT JOIN fornecedores f ON p.fornecedor_id = f.id
-                WHERE p.categoria ILIKE %s
-                ORDER BY p.id
-            """
-            cur.execute(query, (f'%{categoria}%',))
-            return cur.fetchall()
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.by_category(categoria)
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                # Usamos LEFT JOIN para mostrar o fornecedor e ILIKE para busca não sensível a maiúsculas;
+                # o índice de trigramas idx_produtos_categoria_trgm atende o curinga inicial
+                cur.execute(PRODUTOS_SELECT + " WHERE p.categoria ILIKE %s ORDER BY p.id",
+                            (f"%{_escape_like(categoria)}%",))
+                return cur.fetchall()
+
+    def get_by_supplier(self, fornecedor_id):
+        """Produtos do fornecedor, em ordem de id, no formato de get_all()."""
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.by_supplier(int(fornecedor_id))
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute(PRODUTOS_SELECT + " WHERE p.fornecedor_id = %s ORDER BY p.id", (fornecedor_id,))
+                return cur.fetchall()
+
+    def search(self, termo, limit=SEARCH_LIMIT):
+        """
+        Busca produtos cujo nome contém `termo` (sem diferenciar maiúsculas), usando o
+        índice de trigramas idx_produtos_nome_trgm. Nomes que começam com o termo vêm
+        primeiro, depois os mais curtos. Retorna até `limit` linhas no formato de get_all().
+        """
+        termo = (termo or "").strip()
+        if not termo:
+            return []
+        catalogo = get_catalog_cache()
+        if catalogo is not None:
+            return catalogo.search(termo, limit)
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    PRODUTOS_SELECT + " WHERE p.nome ILIKE %s"
+                    " ORDER BY p.nome ILIKE %s DESC, length(p.nome), p.id LIMIT %s",
+                    (f"%{_escape_like(termo)}%", f"{_escape_like(termo)}%", limit)
+                )
+                return cur.fetchall()
+
+    def search_text(self, consulta, limit=None, cursor=None):
+        """
+        Busca por palavras no nome e na categoria (ex.: "notebook gamer", "livro arquitetura"),
+        sem diferenciar acentos, com radicais do português e a sintaxe de busca web ("frase exata", -excluir, or).
+        Usa o índice GIN idx_produtos_busca e ordena por relevância. `cursor` continua
+        de onde a página anterior parou (por rank e id), como em get_page.
+        Retorna (linhas no formato de get_all(), cursor da próxima página ou None).
+        """
+        consulta = (consulta or "").strip()
+        if not consulta:
+            return [], None
+        limit = page_size_of(limit or PAGE_SIZE)
+        listagem = f"busca:{consulta}"
+        params = {"consulta": consulta, "limite": limit + 1}
+        continuacao = ""
+        if cursor:
+            params["rank"], params["id"] = decode_cursor(listagem, cursor, 2)
+            continuacao = CONTINUACAO_BUSCA
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                cur.execute(BUSCA_TEXTO.format(continuacao=continuacao), params)
+                rows, next_cursor = split_page(cur.fetchall(), limit, listagem, lambda row: (row[6], row[0]))
+                return [row[:6] for row in rows], next_cursor
 
     def create(self, nome, preco, categoria, estoque, fornecedor_id):
-        conn = get_db_connection()
-        if not conn: return None
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO produtos (nome, preco, categoria, estoque, fornecedor_id) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-                (nome, preco, categoria, estoque, fornecedor_id)
-            )
-            new_id = cur.fetchone()[0]
-            conn.commit()
-            return new_id
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO produtos (nome, preco, categoria, estoque, fornecedor_id) VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                    (nome, preco, categoria, estoque, fornecedor_id)
+                )
+                new_id = cur.fetchone()[0]
+                conn.commit()
+        produtos_alterados([new_id])
+        return new_id
 
     def update_stock(self, produto_id, nova_quantidade):
-        conn = get_db_connection()
-        if not conn: return False
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE produtos SET estoque = %s WHERE id = %s",
-                (nova_quantidade, produto_id)
-            )
-            conn.commit()
-            return cur.rowcount > 0
\ No newline at end of file
+        """Define o estoque total do produto; em produtos fatiados a quantidade é dividida entre as fatias."""
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE produtos SET estoque = CASE WHEN num_shards > 0 THEN 0 ELSE %s END "
+                    "WHERE id = %s RETURNING num_shards",
+                    (nova_quantidade, produto_id)
+                )
+                row = cur.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return False
+                if row[0] > 0:
+                    cur.execute(REDISTRIBUI_SHARDS, {"total": nova_quantidade, "n": row[0], "id": produto_id})
+                conn.commit()
+        produtos_alterados([produto_id])
+        return True
+
+    def enable_stock_sharding(self, produto_id, shards=8):
+        """
+        Divide o estoque do produto em `shards` fatias (tabela estoque_shards). Indicado para
+        produtos muito vendidos: cada venda baixa uma fatia escolhida ao acaso em vez de
+        disputar o bloqueio da linha do produto. Chamar de novo muda o número de fatias.
+
+        Enquanto o produto estiver fatiado, produtos.estoque fica zerado e todos os caminhos
+        de escrita leem e baixam o estoque das fatias: register_sale, register_sale_atomic,
+        pedidos (register_order), lotes (register_sales_batch e submit_sale), reservas, a
+        importação com baixa de estoque e AsyncVendaModel.register_sale.
+        Retorna True se o produto existe.
+        """
+        if int(shards) < 1:
+            raise ValueError("O número de fatias deve ser pelo menos 1.")
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                total = self._lock_total_stock(cur, produto_id)
+                if total is None:
+                    conn.rollback()
+                    return False
+                cur.execute("DELETE FROM estoque_shards WHERE produto_id = %s", (produto_id,))
+                cur.execute(
+                    "INSERT INTO estoque_shards (produto_id, shard) SELECT %s, generate_series(0, %s - 1)",
+                    (produto_id, shards)
+                )
+                cur.execute(REDISTRIBUI_SHARDS, {"total": total, "n": shards, "id": produto_id})
+                cur.execute("UPDATE produtos SET estoque = 0, num_shards = %s WHERE id = %s", (shards, produto_id))
+                conn.commit()
+        produtos_alterados([produto_id])
+        return True
+
+    def disable_stock_sharding(self, produto_id):
+        """Junta as fatias de volta em produtos.estoque. Retorna True se o produto existe."""
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                total = self._lock_total_stock(cur, produto_id)
+                if total is None:
+                    conn.rollback()
+                    return False
+                cur.execute("DELETE FROM estoque_shards WHERE produto_id = %s", (produto_id,))
+                cur.execute("UPDATE produtos SET estoque = %s, num_shards = 0 WHERE id = %s", (total, produto_id))
+                conn.commit()
+        produtos_alterados([produto_id])
+        return True
+
+    def _lock_total_stock(self, cur, produto_id):
+        """Bloqueia o produto e suas fatias (nessa ordem) e retorna o estoque total, ou None."""
+        cur.execute("SELECT estoque FROM produtos WHERE id = %s FOR UPDATE", (produto_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute("SELECT estoque FROM estoque_shards WHERE produto_id = %s ORDER BY shard FOR UPDATE",
+                    (produto_id,))
+        return row[0] + sum(estoque for (estoque,) in cur.fetchall())
\ No newline at end of file
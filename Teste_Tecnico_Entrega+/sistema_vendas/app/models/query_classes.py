@@ -0,0 +1,46 @@
+import os
+
+# Classes de consulta e seus limites padrão (ms): (statement_timeout, lock_timeout). 0 = sem limite.
+# Podem ser ajustados no .env, ex.: DB_STATEMENT_TIMEOUT_REPORT=60000, DB_LOCK_TIMEOUT_OLTP_WRITE=500
+# Sem dependência do driver, para valer tanto no pool psycopg2 quanto no asyncpg (app/models/aio).
+_DEFAULT_QUERY_TIMEOUTS = {
+    "oltp_write": (2000, 1000),
+    "point_read": (1000, 1000),
+    "report": (30000, 2000),
+    "export": (0, 2000),
+    "bulk_load": (0, 5000),
+}
+QUERY_CLASS_LABELS = {
+    "oltp_write": "escrita",
+    "point_read": "consulta",
+    "report": "relatório",
+    "export": "exportação",
+    "bulk_load": "importação",
+}
+# Classes somente leitura, elegíveis para a réplica
+READ_QUERY_CLASSES = frozenset({"point_read", "report", "export"})
+
+
+def _load_query_timeouts():
+    return {
+        name: (
+            int(os.getenv(f'DB_STATEMENT_TIMEOUT_{name.upper()}', statement)),
+            int(os.getenv(f'DB_LOCK_TIMEOUT_{name.upper()}', lock)),
+        )
+        for name, (statement, lock) in _DEFAULT_QUERY_TIMEOUTS.items()
+    }
+
+
+QUERY_TIMEOUTS = _load_query_timeouts()
+
+
+def check_query_class(query_class):
+    if query_class is not None and query_class not in QUERY_TIMEOUTS:
+        raise ValueError(f"Classe de consulta desconhecida: {query_class}")
+
+
+def timeout_message(query_class, lock_wait):
+    """Mensagem para o usuário quando uma consulta de `query_class` estoura o tempo limite."""
+    detail = "aguardando um bloqueio" if lock_wait else "em execução"
+    label = QUERY_CLASS_LABELS.get(query_class, "consulta")
+    return f"A operação ({label}) excedeu o tempo limite {detail}. Tente novamente em instantes."
@@ -0,0 +1,178 @@
+import os
+import re
+import time
+import bisect
+import logging
+import threading
+
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+slow_query_logger = logging.getLogger("app.models.slow_queries")
+
+# Limites superiores (em ms) das faixas do histograma de latência
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normaliza um comando SQL para agrupar execuções da mesma consulta:
+    remove comentários, troca literais e parâmetros por '?' e compacta espaços.
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    sql = _COMMENT_RE.sub(" ", str(sql))
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?, ...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+class LatencyHistogram:
+    """Histograma de latências com faixas fixas (LATENCY_BUCKETS_MS)."""
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.min_ms = elapsed_ms if self.min_ms is None else min(self.min_ms, elapsed_ms)
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, p):
+        """Estimativa do percentil `p` (0-100): o limite superior da faixa que o contém."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100.0
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "min_ms": self.min_ms or 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {("+inf" if b == float("inf") else f"<={b}ms"): n
+                        for b, n in zip(LATENCY_BUCKETS_MS, self.counts) if n},
+        }
+
+
+class QueryStats:
+    """
+    Registro thread-safe de métricas por consulta, agrupadas pelo fingerprint:
+    histograma de latência, número de execuções, linhas retornadas/afetadas e erros.
+    Execuções acima de `slow_threshold_ms` são gravadas no log de consultas lentas.
+    """
+    def __init__(self, slow_threshold_ms=500.0):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, sql, elapsed_ms, rows=0, error=None):
+        fp = fingerprint(sql)
+        with self._lock:
+            entry = self._entries.get(fp)
+            if entry is None:
+                entry = self._entries[fp] = {"latency": LatencyHistogram(), "rows": 0, "errors": 0}
+            entry["latency"].add(elapsed_ms)
+            if rows and rows > 0:
+                entry["rows"] += rows
+            if error is not None:
+                entry["errors"] += 1
+        if elapsed_ms >= self.slow_threshold_ms:
+            slow_query_logger.warning("Consulta lenta (%.1f ms, %s linhas%s): %s",
+                                      elapsed_ms, rows if rows is not None and rows >= 0 else "?",
+                                      f", erro: {type(error).__name__}" if error is not None else "", fp)
+
+    def snapshot(self):
+        """Retorna {fingerprint: métricas} com uma cópia dos valores atuais."""
+        with self._lock:
+            return {fp: dict(e["latency"].as_dict(), rows=e["rows"], errors=e["errors"])
+                    for fp, e in self._entries.items()}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def report(self, top=10, order_by="total"):
+        """
+        Monta um resumo textual das consultas mais caras.
+
+        Args:
+            top (int): Quantas consultas listar.
+            order_by (str): 'total' (tempo acumulado), 'p95', 'count' ou 'errors'.
+        """
+        keys = {
+            "total": lambda item: item[1]["avg_ms"] * item[1]["count"],
+            "p95": lambda item: item[1]["p95_ms"],
+            "count": lambda item: item[1]["count"],
+            "errors": lambda item: item[1]["errors"],
+        }
+        items = sorted(self.snapshot().items(), key=keys[order_by], reverse=True)[:top]
+        lines = []
+        for fp, m in items:
+            lines.append(
+                f"{m['count']:>7} exec | méd {m['avg_ms']:8.2f} ms | p95 {m['p95_ms']:8.2f} ms | "
+                f"máx {m['max_ms']:8.2f} ms | {m['rows']:>8} linhas | {m['errors']:>4} erros | {fp[:120]}"
+            )
+        return "\n".join(lines)
+
+
+def _configure_slow_query_log():
+    path = os.getenv('DB_SLOW_QUERY_LOG')
+    if path and not slow_query_logger.handlers:
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_query_logger.addHandler(handler)
+
+
+_configure_slow_query_log()
+
+# Registro global usado por todas as conexões do pool
+query_stats = QueryStats(slow_threshold_ms=float(os.getenv('DB_SLOW_QUERY_MS', '500')))
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor que mede cada execute/executemany e registra o resultado em `query_stats`."""
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception as e:
+            query_stats.record(query, (time.perf_counter() - start) * 1000.0, error=e)
+            raise
+        query_stats.record(query, (time.perf_counter() - start) * 1000.0, rows=self.rowcount)
+        return result
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except Exception as e:
+            query_stats.record(query, (time.perf_counter() - start) * 1000.0, error=e)
+            raise
+        query_stats.record(query, (time.perf_counter() - start) * 1000.0, rows=self.rowcount)
+        return result
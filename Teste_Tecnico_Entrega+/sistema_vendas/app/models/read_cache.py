@@ -0,0 +1,134 @@
+import os
+import time
+import functools
+import threading
+from collections import OrderedDict
+
+# Padrões dos caches de leitura: entradas por cache, validade (s) de um valor encontrado
+# e de um "não existe" (cache negativo); TTL 0 desliga o cache
+READ_CACHE_SIZE = int(os.getenv('DB_READ_CACHE_SIZE', '1000'))
+READ_CACHE_TTL = float(os.getenv('DB_READ_CACHE_TTL', '5'))
+READ_CACHE_NEGATIVE_TTL = float(os.getenv('DB_READ_CACHE_NEGATIVE_TTL', '1'))
+
+
+class ReadThroughCache:
+    """
+    Cache thread-safe de leituras por chave, com no máximo `maxsize` entradas (sai a
+    usada há mais tempo) e validade por entrada: `ttl` segundos para valores encontrados
+    e `negative_ttl` para None (registro inexistente), para ids inválidos repetidos
+    também não irem ao banco a cada chamada.
+
+    Uma leitura que começou antes de um invalidate() não grava o resultado, para um valor
+    lido antes de uma escrita não voltar ao cache depois dela.
+    """
+    def __init__(self, name, maxsize=READ_CACHE_SIZE, ttl=READ_CACHE_TTL, negative_ttl=READ_CACHE_NEGATIVE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (expira_em, valor), da menos para a mais usada
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """Valor de `key` no cache ou, se ausente ou vencido, loader() (guardado para as próximas)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            invalidations = self._invalidations
+        value = loader()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return value
+        with self._lock:
+            if invalidations == self._invalidations:
+                self._entries[key] = (time.monotonic() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *keys):
+        """Descarta as entradas de `keys` (chamar depois de gravar esses registros)."""
+        with self._lock:
+            self._invalidations += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Retorna {'hits', 'misses', 'hit_ratio', 'size', 'evictions'}."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_read_cache(name, **options):
+    """Cache de leitura compartilhado chamado `name` (criado no primeiro uso com `options`)."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ReadThroughCache(name, **options)
+        return cache
+
+
+def read_through(name, key=None, **options):
+    """
+    Decorator de método de model: guarda o retorno no cache `name` (ver ReadThroughCache),
+    pela chave key(*args) ou pela tupla dos argumentos. Todas as instâncias do model
+    compartilham o cache, acessível em `metodo.cache`.
+
+        @read_through("clientes", key=int)
+        def get_by_id(self, cliente_id): ...
+
+    Quem grava os registros chama invalidate_cached("clientes", cliente_id).
+    """
+    cache = get_read_cache(name, **options)
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            return cache.get(key(*args) if key else args, lambda: method(self, *args))
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def invalidate_cached(name, *keys):
+    """Descarta `keys` do cache de leitura `name`, se ele existir."""
+    cache = _caches.get(name)
+    if cache is not None:
+        cache.invalidate(*keys)
+
+
+def read_cache_stats():
+    """Retorna {nome do cache: stats()} de todos os caches de leitura."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
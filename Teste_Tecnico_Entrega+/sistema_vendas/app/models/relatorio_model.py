@@ -1,4 +1,4 @@
-from .database import get_db_connection
+from .database import get_connection
 
 class RelatorioModel:
     """
@@ -16,11 +16,10 @@ class RelatorioModel:
             list[tuple]: Uma lista de tuplas, onde cada tupla representa um produto
                          (id, nome, estoque).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, nome, estoque FROM produtos WHERE estoque < %s ORDER BY estoque ASC", (limite,))
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, nome, estoque FROM produtos_estoque WHERE estoque < %s ORDER BY estoque ASC", (limite,))
+                return cur.fetchall()
 
     def get_top_5_produtos_vendidos(self):
         """
@@ -29,19 +28,18 @@ class RelatorioModel:
         Returns:
             list[tuple]: Uma lista de tuplas (nome_produto, total_vendido).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT p.nome, SUM(v.quantidade) AS total_vendido
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                GROUP BY p.nome
-                ORDER BY total_vendido DESC
-                LIMIT 5;
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT p.nome, SUM(v.quantidade) AS total_vendido
+                    FROM vendas v
+                    JOIN produtos p ON v.produto_id = p.id
+                    GROUP BY p.nome
+                    ORDER BY total_vendido DESC
+                    LIMIT 5;
+                """
+                cur.execute(query)
+                return cur.fetchall()
 
     def get_total_vendas_por_categoria(self):
         """
@@ -50,21 +48,20 @@ class RelatorioModel:
         Returns:
             list[tuple]: Uma lista de tuplas (categoria, numero_de_vendas, receita_total).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT
-                    p.categoria,
-                    COUNT(v.id) AS numero_de_vendas,
-                    SUM(v.valor_total) AS receita_total
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                GROUP BY p.categoria
-                ORDER BY receita_total DESC;
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT
+                        p.categoria,
+                        COUNT(v.id) AS numero_de_vendas,
+                        SUM(v.valor_total) AS receita_total
+                    FROM vendas v
+                    JOIN produtos p ON v.produto_id = p.id
+                    GROUP BY p.categoria
+                    ORDER BY receita_total DESC;
+                """
+                cur.execute(query)
+                return cur.fetchall()
 
     def get_produtos_nunca_vendidos(self):
         """
@@ -73,17 +70,16 @@ class RelatorioModel:
         Returns:
             list[tuple]: Uma lista de tuplas, onde cada tupla representa um produto (id, nome, estoque).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT p.id, p.nome, p.estoque
-                FROM produtos p
-                LEFT JOIN vendas v ON p.id = v.produto_id
-                WHERE v.id IS NULL;
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT p.id, p.nome, p.estoque
+                    FROM produtos_estoque p
+                    LEFT JOIN vendas v ON p.id = v.produto_id
+                    WHERE v.id IS NULL;
+                """
+                cur.execute(query)
+                return cur.fetchall()
 
     def get_produtos_status_critico(self):
         """
@@ -92,21 +88,20 @@ class RelatorioModel:
         Returns:
             list[tuple]: Uma lista de tuplas (id, nome, estoque, status).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT
-                    id, nome, estoque,
-                    CASE
-                        WHEN id NOT IN (SELECT DISTINCT produto_id FROM vendas) THEN 'Nunca Vendido'
-                        ELSE 'Estoque Crítico'
-                    END AS status
-                FROM produtos
-                WHERE id NOT IN (SELECT DISTINCT produto_id FROM vendas) OR estoque < 3;
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT
+                        id, nome, estoque,
+                        CASE
+                            WHEN id NOT IN (SELECT DISTINCT produto_id FROM vendas) THEN 'Nunca Vendido'
+                            ELSE 'Estoque Crítico'
+                        END AS status
+                    FROM produtos_estoque
+                    WHERE id NOT IN (SELECT DISTINCT produto_id FROM vendas) OR estoque < 3;
+                """
+                cur.execute(query)
+                return cur.fetchall()
 
     def get_produtos_estoque_alto(self, limite=5):
         """
@@ -118,12 +113,11 @@ class RelatorioModel:
         Returns:
             list[tuple]: Lista de produtos (id, nome, categoria, preco, estoque).
         """
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT id, nome, categoria, preco, estoque FROM produtos
-                WHERE estoque > %s ORDER BY categoria, preco;
-            """
-            cur.execute(query, (limite,))
-            return cur.fetchall()
\ No newline at end of file
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT id, nome, categoria, preco, estoque FROM produtos_estoque
+                    WHERE estoque > %s ORDER BY categoria, preco;
+                """
+                cur.execute(query, (limite,))
+                return cur.fetchall()
\ No newline at end of file
@@ -0,0 +1,289 @@
+import os
+import logging
+import threading
+from datetime import datetime
+
+from .database import get_connection, prepared_statements, DataAccessError
+from .venda_model import sale_retry, take_from_shards
+from .produto_model import produtos_alterados
+
+logger = logging.getLogger(__name__)
+
+# Validade padrão de uma reserva (s) e parâmetros da varredura de expiração
+RESERVA_TTL = float(os.getenv('DB_RESERVA_TTL', '900'))
+RESERVA_SWEEP_INTERVAL = float(os.getenv('DB_RESERVA_SWEEP_INTERVAL', '5'))
+RESERVA_SWEEP_BATCH = int(os.getenv('DB_RESERVA_SWEEP_BATCH', '500'))
+
+# Reserva em um único comando para produtos sem fatias: baixa condicional e inserção
+RESERVA_ATOMICA = prepared_statements.register("reserva_atomica", """
+    WITH baixa AS (
+        UPDATE produtos SET estoque = estoque - $2
+        WHERE id = $1 AND estoque >= $2 AND num_shards = 0
+        RETURNING id
+    ), nova AS (
+        INSERT INTO reservas (produto_id, cliente_id, quantidade, expira_em)
+        SELECT id, $3, $2, NOW() + make_interval(secs => $4) FROM baixa
+        RETURNING id
+    )
+    SELECT (SELECT id FROM nova), p.estoque, p.num_shards
+    FROM produtos p
+    WHERE p.id = $1
+""", ("int", "int", "int", "float8"))
+RESERVA_INSERT = prepared_statements.register(
+    "reserva_insert",
+    "INSERT INTO reservas (produto_id, cliente_id, quantidade, expira_em) "
+    "VALUES ($1, $3, $2, NOW() + make_interval(secs => $4)) RETURNING id",
+    ("int", "int", "int", "float8"),
+)
+
+# Confirma a reserva ativa e dentro da validade, inserindo a venda com o id já reservado
+RESERVA_CONFIRMA = prepared_statements.register("reserva_confirma", """
+    WITH r AS (
+        UPDATE reservas
+        SET status = 'confirmada',
+            cliente_id = COALESCE($2, cliente_id),
+            venda_id = nextval(pg_get_serial_sequence('vendas', 'id'))
+        WHERE id = $1 AND status = 'ativa' AND expira_em >= NOW()
+          AND COALESCE($2, cliente_id) IS NOT NULL
+        RETURNING produto_id, cliente_id, quantidade, venda_id
+    ), nova AS (
+        INSERT INTO vendas (id, produto_id, cliente_id, quantidade, valor_total, data_venda)
+        SELECT r.venda_id, r.produto_id, r.cliente_id, r.quantidade, p.preco * r.quantidade, COALESCE($3, NOW())
+        FROM r JOIN produtos p ON p.id = r.produto_id
+    )
+    SELECT venda_id, produto_id FROM r
+""", ("int", "int", "timestamp"))
+RESERVA_SITUACAO = prepared_statements.register(
+    "reserva_situacao",
+    "SELECT status, expira_em < NOW(), cliente_id, venda_id FROM reservas WHERE id = $1",
+    ("int",),
+)
+
+# Devolve ao estoque as quantidades do conjunto `devolvidas` (id, produto_id, quantidade):
+# em produtos.estoque ou, se o produto é fatiado, em uma das fatias. Retorna quantas
+# reservas foram devolvidas e os produtos afetados
+_DEVOLVE_ESTOQUE = """
+    , devolucao AS (
+        SELECT d.produto_id, p.num_shards, SUM(d.quantidade) AS quantidade, MIN(d.id) AS ref
+        FROM devolvidas d
+        JOIN produtos p ON p.id = d.produto_id
+        GROUP BY d.produto_id, p.num_shards
+    ), principal AS (
+        UPDATE produtos p SET estoque = p.estoque + d.quantidade
+        FROM devolucao d
+        WHERE p.id = d.produto_id AND d.num_shards = 0
+    ), fatias AS (
+        UPDATE estoque_shards s SET estoque = s.estoque + d.quantidade
+        FROM devolucao d
+        WHERE s.produto_id = d.produto_id AND d.num_shards > 0 AND s.shard = d.ref % d.num_shards
+    )
+    SELECT COUNT(*), COALESCE(array_agg(DISTINCT produto_id), '{}') FROM devolvidas
+"""
+RESERVA_LIBERA = prepared_statements.register("reserva_libera", """
+    WITH devolvidas AS (
+        UPDATE reservas SET status = 'liberada'
+        WHERE id = $1 AND status = 'ativa'
+        RETURNING id, produto_id, quantidade
+    )
+""" + _DEVOLVE_ESTOQUE, ("int",))
+
+# Varredura: expira um lote de reservas vencidas. SKIP LOCKED nas reservas e nos produtos
+# faz a varredura pular o que vendas e confirmações em andamento estão usando, em vez de
+# esperar por elas (o que ficar para trás é pego na próxima rodada)
+RESERVA_EXPIRA_LOTE = prepared_statements.register("reserva_expira_lote", """
+    WITH vencidas AS (
+        SELECT r.id
+        FROM reservas r
+        JOIN produtos p ON p.id = r.produto_id
+        WHERE r.status = 'ativa' AND r.expira_em < NOW()
+        ORDER BY r.expira_em
+        LIMIT $1
+        FOR UPDATE OF r SKIP LOCKED
+        FOR NO KEY UPDATE OF p SKIP LOCKED
+    ), devolvidas AS (
+        UPDATE reservas r SET status = 'expirada'
+        FROM vencidas v
+        WHERE r.id = v.id
+        RETURNING r.id, r.produto_id, r.quantidade
+    )
+""" + _DEVOLVE_ESTOQUE, ("int",))
+
+
+class ReservaModel:
+    """
+    Reservas de estoque com validade, para segurar o estoque enquanto o cliente paga.
+
+    reserve() tira a quantidade do estoque disponível na hora (as listagens de produtos já
+    mostram o estoque sem o que está reservado), confirm() transforma a reserva em venda
+    e release() devolve o estoque. Reservas vencidas são expiradas por expire_stale(),
+    chamada periodicamente pela ReservationSweeper.
+    """
+    def reserve(self, produto_id, quantidade, ttl=None, cliente_id=None):
+        """
+        Reserva `quantidade` unidades do produto por `ttl` segundos (padrão DB_RESERVA_TTL).
+        Retorna (reserva_id, message); reserva_id é None se não há estoque ou em caso de erro.
+        """
+        try:
+            produto_id, quantidade = int(produto_id), int(quantidade)
+            cliente_id = None if cliente_id is None else int(cliente_id)
+            ttl = RESERVA_TTL if ttl is None else float(ttl)
+        except (TypeError, ValueError):
+            return None, "Erro: produto_id, quantidade e cliente_id devem ser inteiros e ttl um número."
+        if quantidade <= 0:
+            return None, "Erro: quantidade deve ser maior que zero."
+        return self._run(self._reserve_once, "reservar", produto_id, quantidade, cliente_id, ttl)
+
+    def confirm(self, reserva_id, cliente_id=None, data_venda=None):
+        """
+        Transforma uma reserva ativa em venda, sem mexer de novo no estoque. `cliente_id`
+        é obrigatório se não foi informado em reserve(). Confirmar de novo uma reserva já
+        confirmada devolve a mesma venda. Retorna (venda_id, message).
+        """
+        if isinstance(data_venda, str) and data_venda:
+            try:
+                data_venda = datetime.fromisoformat(data_venda)
+            except ValueError as e:
+                return None, f"Erro: formato de data inválido ({e}). Use ISO: YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS"
+        return self._run(self._confirm_once, "confirmar a reserva", reserva_id, cliente_id, data_venda or None)
+
+    def release(self, reserva_id):
+        """Cancela uma reserva ativa e devolve o estoque. Retorna (bool, message)."""
+        liberada, message = self._run(self._release_once, "liberar a reserva", reserva_id)
+        return bool(liberada), message
+
+    def expire_stale(self, batch_size=None):
+        """Expira até `batch_size` reservas vencidas, devolvendo o estoque. Retorna quantas expirou."""
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, RESERVA_EXPIRA_LOTE, (batch_size or RESERVA_SWEEP_BATCH,))
+                expiradas, produtos = cur.fetchone()
+                conn.commit()
+        if produtos:
+            produtos_alterados(produtos, wait=False)
+        return expiradas
+
+    def _run(self, attempt, acao, *args):
+        try:
+            return sale_retry.call(attempt, *args)
+        except DataAccessError as e:
+            return None, f"Erro: {e}"
+        except Exception as e:
+            return None, f"Erro ao {acao}: {e}"
+
+    def _reserve_once(self, produto_id, quantidade, cliente_id, ttl):
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, RESERVA_ATOMICA, (produto_id, quantidade, cliente_id, ttl))
+                row = cur.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None, "Erro: produto não encontrado."
+                reserva_id, estoque_atual, num_shards = row
+                if reserva_id is None and num_shards > 0:
+                    erro = take_from_shards(cur, produto_id, quantidade)
+                    if erro is not None:
+                        conn.rollback()
+                        return None, erro
+                    prepared_statements.execute(cur, RESERVA_INSERT, (produto_id, quantidade, cliente_id, ttl))
+                    reserva_id = cur.fetchone()[0]
+                elif reserva_id is None:
+                    conn.rollback()
+                    return None, f"Erro: estoque insuficiente (disponível: {estoque_atual})."
+                conn.commit()
+        produtos_alterados([produto_id], wait=False)
+        return reserva_id, "Reserva registrada com sucesso."
+
+    def _confirm_once(self, reserva_id, cliente_id, dv):
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, RESERVA_CONFIRMA, (reserva_id, cliente_id, dv))
+                row = cur.fetchone()
+                if row is None:
+                    prepared_statements.execute(cur, RESERVA_SITUACAO, (reserva_id,))
+                    situacao = cur.fetchone()
+                    conn.rollback()
+                else:
+                    conn.commit()
+        if row is not None:
+            venda_id, produto_id = row
+            produtos_alterados([produto_id], wait=False)
+            return venda_id, "Venda registrada com sucesso."
+        if situacao is None:
+            return None, "Erro: reserva não encontrada."
+        status, vencida, cliente_reserva, venda_id = situacao
+        if status == "confirmada":
+            return venda_id, "Venda registrada com sucesso."
+        if status != "ativa":
+            return None, f"Erro: a reserva foi {status}."
+        if vencida:
+            return None, "Erro: a reserva venceu."
+        return None, "Erro: informe o cliente para confirmar a reserva."
+
+    def _release_once(self, reserva_id):
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                prepared_statements.execute(cur, RESERVA_LIBERA, (reserva_id,))
+                liberadas, produtos = cur.fetchone()
+                conn.commit()
+        if not liberadas:
+            return None, "Erro: reserva não encontrada ou não está mais ativa."
+        produtos_alterados(produtos, wait=False)
+        return True, "Reserva liberada."
+
+
+class ReservationSweeper:
+    """
+    Thread de fundo que expira reservas vencidas: a cada `interval` segundos chama
+    expire_stale(batch_size) até esvaziar o atraso, um lote (e um COMMIT) por vez.
+    """
+    def __init__(self, interval=RESERVA_SWEEP_INTERVAL, batch_size=RESERVA_SWEEP_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.model = ReservaModel()
+        self.expired = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="reservas-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                expiradas = self.model.expire_stale(self.batch_size)
+                self.expired += expiradas
+            except Exception:
+                logger.exception("Falha ao expirar reservas")
+                expiradas = 0
+            if expiradas < self.batch_size:
+                self._stop.wait(self.interval)
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_reservation_sweeper(interval=None, batch_size=None):
+    """Inicia (uma única vez) a varredura de reservas vencidas em segundo plano."""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = ReservationSweeper(
+                interval=RESERVA_SWEEP_INTERVAL if interval is None else interval,
+                batch_size=batch_size or RESERVA_SWEEP_BATCH,
+            ).start()
+        return _sweeper
+
+
+def stop_reservation_sweeper(timeout=None):
+    """Encerra a varredura iniciada por start_reservation_sweeper (chamar antes de close_pool)."""
+    global _sweeper
+    with _sweeper_lock:
+        sweeper, _sweeper = _sweeper, None
+    if sweeper is not None:
+        sweeper.stop(timeout)
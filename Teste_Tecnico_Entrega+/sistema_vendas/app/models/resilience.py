@@ -0,0 +1,126 @@
+import time
+import random
+import threading
+
+import psycopg2
+import psycopg2.errors
+
+# SQLSTATEs de falhas transitórias de transação: serialization_failure e deadlock_detected
+TRANSIENT_PGCODES = frozenset({"40001", "40P01"})
+
+
+def is_connection_error(exc):
+    """True para falhas de conexão (servidor fora do ar, conexão perdida, classe 08)."""
+    if not isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        return False
+    pgcode = getattr(exc, "pgcode", None)
+    return pgcode is None or pgcode.startswith("08")
+
+
+def is_transient_error(exc):
+    """True para conflitos de serialização e deadlocks, que podem ser refeitos com segurança."""
+    if isinstance(exc, (psycopg2.errors.SerializationFailure, psycopg2.errors.DeadlockDetected)):
+        return True
+    return getattr(exc, "pgcode", None) in TRANSIENT_PGCODES
+
+
+class RetryPolicy:
+    """
+    Política de novas tentativas com backoff exponencial e jitter completo:
+    antes da tentativa n+1 espera um tempo aleatório entre 0 e
+    min(max_delay, base_delay * 2 ** (n - 1)) segundos.
+    Só são refeitas as exceções para as quais `retry_on(exc)` devolve True.
+    """
+    def __init__(self, max_attempts=3, base_delay=0.1, max_delay=2.0, retry_on=is_transient_error):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def backoff(self, attempt):
+        """Espera (em segundos) depois da tentativa número `attempt` (a partir de 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def call(self, fn, *args, **kwargs):
+        """Chama fn(*args, **kwargs), refazendo-a conforme a política."""
+        attempt = 1
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.retry_on(e):
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
+
+class CircuitBreaker:
+    """
+    Disjuntor para o banco de dados.
+
+    Fechado: as chamadas passam normalmente. Após `failure_threshold` falhas seguidas
+    ele abre e passa a recusar chamadas imediatamente por `reset_timeout` segundos.
+    Depois disso fica meio-aberto: uma única chamada de teste é liberada; se ela
+    funcionar o disjuntor fecha, se falhar ele volta a abrir. `on_open` é chamado
+    sempre que o disjuntor abre (ex.: para descartar conexões ociosas já mortas).
+    """
+    CLOSED = "fechado"
+    OPEN = "aberto"
+    HALF_OPEN = "meio-aberto"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, on_open=None):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.on_open = on_open
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+        Indica se uma chamada pode prosseguir. Retorna None (recusada), "normal" ou
+        "probe" (a chamada é o teste do estado meio-aberto e deve confirmar a saúde do banco).
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return "normal"
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return "probe"
+            return None
+
+    def retry_after(self):
+        """Segundos até o próximo teste (0 se o disjuntor não está aberto)."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        opened = False
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                opened = self._state != self.OPEN
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+        if opened and self.on_open is not None:
+            self.on_open()
@@ -1,123 +1,685 @@
-from .database import get_db_connection
-from datetime import datetime
+import os
+import uuid
+import queue
+import threading
+from concurrent.futures import Future
+from .database import get_connection, prepared_statements, DataAccessError
+from .resilience import RetryPolicy, is_transient_error
+from .group_commit import GroupCommitWriter
+from .paginacao import page_size_of, decode_cursor, split_page
+from .produto_model import produtos_alterados
+from datetime import date, datetime, timedelta
+
+# Comandos do caminho de venda, preparados uma vez por conexão do pool
+VENDA_LOCK_PRODUTO = prepared_statements.register(
+    "venda_lock_produto",
+    "SELECT preco, estoque FROM produtos WHERE id = $1 AND num_shards = 0 FOR UPDATE",
+    ("int",),
+)
+VENDA_INSERT = prepared_statements.register(
+    "venda_insert",
+    "INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda) "
+    "VALUES ($1, $2, $3, $4, COALESCE($5, NOW())) RETURNING id",
+    ("int", "int", "int", "numeric", "timestamp"),
+)
+VENDA_BAIXA_ESTOQUE = prepared_statements.register(
+    "venda_baixa_estoque",
+    "UPDATE produtos SET estoque = estoque - $1 WHERE id = $2",
+    ("int", "int"),
+)
+
+# Produtos com estoque fatiado (ver ProdutoModel.enable_stock_sharding): a linha do produto
+# não é bloqueada; a venda baixa uma fatia sorteada entre as que têm estoque suficiente,
+# pulando as que outras vendas estão usando no momento
+VENDA_PRODUTO_FATIADO = prepared_statements.register(
+    "venda_produto_fatiado",
+    "SELECT preco FROM produtos WHERE id = $1 AND num_shards > 0",
+    ("int",),
+)
+VENDA_BAIXA_SHARD = prepared_statements.register("venda_baixa_shard", """
+    UPDATE estoque_shards s SET estoque = s.estoque - $2
+    FROM (
+        SELECT shard FROM estoque_shards
+        WHERE produto_id = $1 AND estoque >= $2
+        ORDER BY random()
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ) alvo
+    WHERE s.produto_id = $1 AND s.shard = alvo.shard
+""", ("int", "int"))
+# Quando nenhuma fatia livre cobre a venda sozinha: bloqueia todas e baixa de várias
+VENDA_LOCK_SHARDS = prepared_statements.register(
+    "venda_lock_shards",
+    "SELECT shard, estoque FROM estoque_shards WHERE produto_id = $1 ORDER BY shard FOR UPDATE",
+    ("int",),
+)
+VENDA_BAIXA_SHARDS = prepared_statements.register("venda_baixa_shards", """
+    UPDATE estoque_shards s SET estoque = s.estoque - b.quantidade
+    FROM unnest($2::int[], $3::int[]) AS b(shard, quantidade)
+    WHERE s.produto_id = $1 AND s.shard = b.shard
+""", ("int", "int[]", "int[]"))
+
+# Comandos em conjunto (pedidos, lotes e importação): com as linhas dos produtos já
+# bloqueadas, bloqueia as fatias dos produtos fatiados (em ordem de produto e fatia) e
+# devolve o estoque de cada um, somando as fatias
+ESTOQUE_FATIAS_LOCK = prepared_statements.register("estoque_fatias_lock", """
+    SELECT produto_id, SUM(estoque)::INT
+    FROM (SELECT produto_id, estoque FROM estoque_shards
+          WHERE produto_id = ANY($1) ORDER BY produto_id, shard FOR UPDATE) f
+    GROUP BY produto_id
+""", ("int[]",))
+# Baixa o total de cada produto de `{totais}` (produto_id, total) das suas fatias, enchendo
+# as de menor número primeiro; uso em CTE, com as fatias já bloqueadas e o total conferido
+BAIXA_FATIAS = """
+        UPDATE estoque_shards s SET estoque = s.estoque - f.baixa
+        FROM (
+            SELECT e.produto_id, e.shard,
+                   LEAST(e.estoque, GREATEST(0, t.total - (SUM(e.estoque) OVER (
+                       PARTITION BY e.produto_id ORDER BY e.shard) - e.estoque))) AS baixa
+            FROM estoque_shards e
+            JOIN ({totais}) t ON t.produto_id = e.produto_id
+        ) f
+        WHERE s.produto_id = f.produto_id AND s.shard = f.shard AND f.baixa > 0"""
+
+# Caminho de venda em um único comando: baixa condicional do estoque, leitura do preço
+# e inserção da venda. O bloqueio da linha do produto só dura este comando e o COMMIT.
+VENDA_ATOMICA = prepared_statements.register("venda_atomica", """
+    WITH baixa AS (
+        UPDATE produtos SET estoque = estoque - $3
+        WHERE id = $1 AND estoque >= $3 AND num_shards = 0
+        RETURNING id, preco
+    ), nova AS (
+        INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda)
+        SELECT id, $2, $3, preco * $3, COALESCE($4, NOW()) FROM baixa
+        RETURNING id
+    )
+    SELECT (SELECT id FROM nova), p.estoque, p.num_shards, p.preco
+    FROM produtos p
+    WHERE p.id = $1
+""", ("int", "int", "int", "timestamp"))
+
+# Pedido com vários itens: bloqueia todos os produtos do pedido em ordem crescente de id
+# (a mesma ordem em todas as transações evita deadlocks entre pedidos concorrentes)
+PEDIDO_LOCK_PRODUTOS = prepared_statements.register(
+    "pedido_lock_produtos",
+    "SELECT id, estoque, num_shards FROM produtos WHERE id = ANY($1) ORDER BY id FOR UPDATE",
+    ("int[]",),
+)
+
+# Com as linhas já bloqueadas: grava o pedido, uma venda por item e baixa o estoque de
+# todos os itens (da linha do produto ou das fatias), cada passo em um único comando
+# baseado em conjuntos
+PEDIDO_INSERT = prepared_statements.register("pedido_insert", """
+    WITH itens AS (
+        SELECT i.produto_id, i.quantidade, p.preco
+        FROM unnest($3::int[], $4::int[]) AS i(produto_id, quantidade)
+        JOIN produtos p ON p.id = i.produto_id
+    ), pedido AS (
+        INSERT INTO pedidos (cliente_id, data_pedido, valor_total)
+        SELECT $1, COALESCE($2, NOW()), SUM(preco * quantidade) FROM itens
+        RETURNING id, data_pedido
+    ), linhas AS (
+        INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda, pedido_id)
+        SELECT i.produto_id, $1, i.quantidade, i.preco * i.quantidade, pedido.data_pedido, pedido.id
+        FROM itens i CROSS JOIN pedido
+    ), baixa AS (
+        UPDATE produtos p SET estoque = p.estoque - i.quantidade
+        FROM itens i
+        WHERE p.id = i.produto_id AND p.num_shards = 0
+    ), baixa_fatias AS (""" + BAIXA_FATIAS.format(totais="SELECT produto_id, quantidade AS total FROM itens") + """
+    )
+    SELECT id FROM pedido
+""", ("int", "timestamp", "int[]", "int[]"))
+
+# Lote de vendas: bloqueio dos produtos do lote (em ordem de id) e clientes existentes
+VENDA_LOTE_LOCK_PRODUTOS = prepared_statements.register(
+    "venda_lote_lock_produtos",
+    "SELECT id, estoque, num_shards FROM produtos WHERE id = ANY($1) ORDER BY id FOR UPDATE",
+    ("int[]",),
+)
+VENDA_LOTE_CLIENTES = prepared_statements.register(
+    "venda_lote_clientes",
+    "SELECT id FROM clientes WHERE id = ANY($1)",
+    ("int[]",),
+)
+
+# Insere todas as vendas aceitas do lote e baixa o estoque com um UPDATE ... FROM (mais
+# um nas fatias, para os produtos fatiados).
+# Os ids são reservados na sequência antes do INSERT para devolver o par (posição, id).
+VENDA_LOTE_INSERT = prepared_statements.register("venda_lote_insert", """
+    WITH lote AS (
+        SELECT l.ord, l.produto_id, l.cliente_id, l.quantidade, l.data_venda,
+               nextval(pg_get_serial_sequence('vendas', 'id')) AS id
+        FROM unnest($1::int[], $2::int[], $3::int[], $4::int[], $5::timestamp[])
+             AS l(ord, produto_id, cliente_id, quantidade, data_venda)
+    ), novas AS (
+        INSERT INTO vendas (id, produto_id, cliente_id, quantidade, valor_total, data_venda)
+        SELECT lote.id, lote.produto_id, lote.cliente_id, lote.quantidade,
+               p.preco * lote.quantidade, COALESCE(lote.data_venda, NOW())
+        FROM lote JOIN produtos p ON p.id = lote.produto_id
+    ), baixa AS (
+        UPDATE produtos p SET estoque = p.estoque - t.total
+        FROM (SELECT produto_id, SUM(quantidade) AS total FROM lote GROUP BY produto_id) t
+        WHERE p.id = t.produto_id AND p.num_shards = 0
+    ), baixa_fatias AS (""" + BAIXA_FATIAS.format(
+        totais="SELECT produto_id, SUM(quantidade) AS total FROM lote GROUP BY produto_id") + """
+    )
+    SELECT ord, id FROM lote
+""", ("int[]", "int[]", "int[]", "int[]", "timestamp[]"))
+
+# Chaves de idempotência: a primeira requisição reserva a chave (índice único) antes de
+# vender; uma repetição com a mesma chave espera a original terminar e devolve a mesma venda
+IDEMPOTENCIA_RESERVA = prepared_statements.register(
+    "idempotencia_reserva",
+    "INSERT INTO vendas_idempotencia (chave) VALUES ($1) ON CONFLICT (chave) DO NOTHING",
+    ("text",),
+)
+IDEMPOTENCIA_ORIGINAL = prepared_statements.register(
+    "idempotencia_original",
+    "SELECT k.venda_id, v.produto_id, v.cliente_id, v.quantidade "
+    "FROM vendas_idempotencia k LEFT JOIN vendas v ON v.id = k.venda_id WHERE k.chave = $1",
+    ("text",),
+)
+IDEMPOTENCIA_CONFIRMA = prepared_statements.register(
+    "idempotencia_confirma",
+    "UPDATE vendas_idempotencia SET venda_id = $2 WHERE chave = $1",
+    ("text", "int"),
+)
+
+# Novas tentativas de register_sale em conflitos de serialização/deadlock
+sale_retry = RetryPolicy(
+    max_attempts=int(os.getenv('DB_SALE_RETRIES', '3')),
+    base_delay=float(os.getenv('DB_RETRY_BASE_DELAY', '0.1')),
+    max_delay=float(os.getenv('DB_RETRY_MAX_DELAY', '2')),
+    retry_on=is_transient_error,
+)
+
+# Colunas devolvidas pelas listagens de vendas (get_all, get_by_period e variantes iter_*)
+VENDAS_SELECT = """
+    SELECT
+        v.id,
+        p.nome AS produto,
+        p.categoria,
+        c.nome AS cliente,
+        v.quantidade,
+        v.valor_total,
+        v.data_venda
+    FROM vendas v
+    JOIN produtos p ON v.produto_id = p.id
+    JOIN clientes c ON v.cliente_id = c.id
+"""
+
+# Linhas trazidas do servidor a cada ida ao banco pelos cursores de streaming
+STREAM_ITERSIZE = int(os.getenv('DB_STREAM_ITERSIZE', '2000'))
+
+
+# Modo write-behind (submit_sale): vendas gravadas em grupo por uma thread de fundo
+WRITE_BEHIND_BATCH = int(os.getenv('DB_WRITE_BEHIND_BATCH', '100'))
+WRITE_BEHIND_WAIT_MS = float(os.getenv('DB_WRITE_BEHIND_WAIT_MS', '5'))
+WRITE_BEHIND_QUEUE = int(os.getenv('DB_WRITE_BEHIND_QUEUE', '10000'))
+
+_sale_writer = None
+_sale_writer_lock = threading.Lock()
+
+
+def get_sale_writer():
+    """Retorna a fila de escrita em grupo das vendas, criando-a (e a thread de fundo) no primeiro uso."""
+    global _sale_writer
+    if _sale_writer is None:
+        with _sale_writer_lock:
+            if _sale_writer is None:
+                _sale_writer = GroupCommitWriter(
+                    VendaModel().register_sales_batch,
+                    max_batch=WRITE_BEHIND_BATCH,
+                    max_wait_ms=WRITE_BEHIND_WAIT_MS,
+                    max_queue=WRITE_BEHIND_QUEUE,
+                    name="vendas-write-behind",
+                )
+    return _sale_writer
+
+
+def close_sale_writer(timeout=None):
+    """Grava as vendas ainda na fila e encerra a thread de fundo (chamar antes de close_pool)."""
+    global _sale_writer
+    with _sale_writer_lock:
+        writer, _sale_writer = _sale_writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+
+def take_from_shards(cur, produto_id, quantidade):
+    """
+    Baixa `quantidade` do estoque fatiado de um produto, na transação corrente: uma fatia
+    sorteada ou, se nenhuma livre cobre a quantidade sozinha, várias (bloqueando todas).
+    Retorna None se baixou ou a mensagem de erro se não há estoque (o chamador desfaz).
+    """
+    prepared_statements.execute(cur, VENDA_BAIXA_SHARD, (produto_id, quantidade))
+    if cur.rowcount:
+        return None
+    prepared_statements.execute(cur, VENDA_LOCK_SHARDS, (produto_id,))
+    fatias = cur.fetchall()
+    disponivel = sum(estoque for _, estoque in fatias)
+    if disponivel < quantidade:
+        return f"Erro: estoque insuficiente (disponível: {disponivel})."
+    shards, baixas = [], []
+    restante = quantidade
+    for shard, estoque in fatias:
+        if restante == 0:
+            break
+        baixa = min(estoque, restante)
+        if baixa:
+            shards.append(shard)
+            baixas.append(baixa)
+            restante -= baixa
+    prepared_statements.execute(cur, VENDA_BAIXA_SHARDS, (produto_id, shards, baixas))
+    return None
+
+
+def lock_available_stock(cur, lock_statement, produto_ids):
+    """
+    Executa `lock_statement` (bloqueio de produtos que devolve id, estoque e num_shards) e,
+    se algum produto tem o estoque fatiado, bloqueia as fatias deles. Retorna
+    {produto_id: estoque disponível}, com as fatias somadas; produtos inexistentes ficam de fora.
+    """
+    prepared_statements.execute(cur, lock_statement, (produto_ids,))
+    linhas = cur.fetchall()
+    estoques = {produto_id: estoque for produto_id, estoque, _ in linhas}
+    fatiados = [produto_id for produto_id, _, num_shards in linhas if num_shards > 0]
+    if fatiados:
+        prepared_statements.execute(cur, ESTOQUE_FATIAS_LOCK, (fatiados,))
+        for produto_id, estoque in cur.fetchall():
+            estoques[produto_id] += estoque
+    return estoques
+
+
+def _normalize_period(inicio, fim):
+    """
+    Converte inicio/fim (strings ISO ou date/datetime) no intervalo semiaberto
+    [inicio, fim_exclusivo). Um `fim` só com a data inclui o dia inteiro; com hora,
+    inclui o próprio instante.
+    """
+    inicio_dt = datetime.fromisoformat(inicio) if isinstance(inicio, str) else inicio
+    if isinstance(fim, str):
+        fim_dt = datetime.fromisoformat(fim)
+        so_data = len(fim.strip()) == 10
+    else:
+        fim_dt = fim
+        so_data = not isinstance(fim, datetime)
+    if isinstance(inicio_dt, date) and not isinstance(inicio_dt, datetime):
+        inicio_dt = datetime.combine(inicio_dt, datetime.min.time())
+    if isinstance(fim_dt, date) and not isinstance(fim_dt, datetime):
+        fim_dt = datetime.combine(fim_dt, datetime.min.time())
+    fim_dt += timedelta(days=1) if so_data else timedelta(microseconds=1)
+    return inicio_dt, fim_dt
+
+
+# Filtro por período como intervalo semiaberto sobre a coluna de partição, para o
+# planejador descartar as partições mensais fora do intervalo (partition pruning)
+FILTRO_PERIODO = " WHERE v.data_venda >= %s AND v.data_venda < %s"
+
 
 class VendaModel:
     def get_all(self):
-        conn = get_db_connection()
-        if not conn: return []
-        with conn.cursor() as cur:
-            query = """
-                SELECT
-                    v.id,
-                    p.nome AS produto,
-                    p.categoria,
-                    c.nome AS cliente,
-                    v.quantidade,
-                    v.valor_total,
-                    v.data_venda
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                JOIN clientes c ON v.cliente_id = c.id
-                ORDER BY v.data_venda DESC
-            """
-            cur.execute(query)
-            return cur.fetchall()
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                cur.execute(VENDAS_SELECT + " ORDER BY v.data_venda DESC")
+                return cur.fetchall()
+
+    def get_page(self, page_size=None, cursor=None):
+        """
+        Uma página de get_all(), da venda mais recente para a mais antiga, ordenada por
+        (data_venda, id). A página seguinte começa logo depois da chave da última linha
+        (comparação de tupla, servida pelo índice idx_vendas_data_id) em vez de OFFSET;
+        o filtro extra em data_venda deixa o planejador descartar as partições mais novas.
+        Retorna (linhas, cursor da próxima página ou None se não há mais).
+        """
+        page_size = page_size_of(page_size)
+        with get_connection(query_class="point_read") as conn:
+            with conn.cursor() as cur:
+                if cursor:
+                    data_venda, venda_id = decode_cursor("vendas", cursor, 2)
+                    cur.execute(VENDAS_SELECT + " WHERE v.data_venda <= %s AND (v.data_venda, v.id) < (%s, %s)"
+                                " ORDER BY v.data_venda DESC, v.id DESC LIMIT %s",
+                                (data_venda, data_venda, venda_id, page_size + 1))
+                else:
+                    cur.execute(VENDAS_SELECT + " ORDER BY v.data_venda DESC, v.id DESC LIMIT %s", (page_size + 1,))
+                return split_page(cur.fetchall(), page_size, "vendas", lambda row: (row[6], row[0]))
 
     def get_by_period(self, inicio, fim):
         """
         Busca vendas entre duas datas (inclusive). inicio/fim podem ser strings YYYY-MM-DD
-        ou YYYY-MM-DD HH:MM:SS ou objetos date/datetime.
+        ou YYYY-MM-DD HH:MM:SS ou objetos date/datetime. Só as partições mensais do
+        período são lidas.
         Retorna lista de tuplas com as mesmas colunas que get_all().
         """
-        conn = get_db_connection()
-        if not conn: return []
-        # Normaliza entradas
-        try:
-            if isinstance(inicio, str):
-                inicio_dt = datetime.fromisoformat(inicio)
-            else:
-                inicio_dt = inicio
-            if isinstance(fim, str):
-                fim_dt = datetime.fromisoformat(fim)
-            else:
-                fim_dt = fim
-        except Exception:
-            raise
-
-        with conn.cursor() as cur:
-            query = """
-                SELECT
-                    v.id,
-                    p.nome AS produto,
-                    p.categoria,
-                    c.nome AS cliente,
-                    v.quantidade,
-                    v.valor_total,
-                    v.data_venda
-                FROM vendas v
-                JOIN produtos p ON v.produto_id = p.id
-                JOIN clientes c ON v.cliente_id = c.id
-                WHERE v.data_venda BETWEEN %s AND %s
-                ORDER BY v.data_venda DESC
-            """
-            cur.execute(query, (inicio_dt, fim_dt))
-            return cur.fetchall()
-
-    def register_sale(self, produto_id, cliente_id, quantidade, data_venda=None):
+        inicio_dt, fim_dt = _normalize_period(inicio, fim)
+        with get_connection(query_class="report") as conn:
+            with conn.cursor() as cur:
+                cur.execute(VENDAS_SELECT + FILTRO_PERIODO + " ORDER BY v.data_venda DESC",
+                            (inicio_dt, fim_dt))
+                return cur.fetchall()
+
+    def _stream(self, query, params, itersize):
+        """
+        Executa `query` num cursor nomeado (server-side) e produz as linhas aos poucos,
+        buscando `itersize` linhas por vez. A conexão fica emprestada até o gerador
+        ser consumido por completo ou fechado.
+        """
+        with get_connection(query_class="export") as conn:
+            with conn.cursor(name=f"vendas_stream_{uuid.uuid4().hex}") as cur:
+                cur.itersize = itersize or STREAM_ITERSIZE
+                cur.execute(query, params)
+                for row in cur:
+                    yield row
+
+    def iter_all(self, itersize=None):
+        """
+        Versão em streaming de get_all(): gerador com as mesmas tuplas, com uso de
+        memória constante independentemente do tamanho da tabela vendas.
+        """
+        return self._stream(VENDAS_SELECT + " ORDER BY v.data_venda DESC", None, itersize)
+
+    def iter_by_period(self, inicio, fim, itersize=None):
+        """Versão em streaming de get_by_period(); valida as datas antes de abrir o cursor."""
+        inicio_dt, fim_dt = _normalize_period(inicio, fim)
+        return self._stream(VENDAS_SELECT + FILTRO_PERIODO + " ORDER BY v.data_venda DESC",
+                            (inicio_dt, fim_dt), itersize)
+
+    def _parse_sale_date(self, data_venda):
+        """Converte data_venda (str ISO ou datetime) ou devolve None para usar NOW()."""
+        if not data_venda:
+            return None
+        if isinstance(data_venda, str):
+            return datetime.fromisoformat(data_venda)
+        return data_venda
+
+    def register_sale(self, produto_id, cliente_id, quantidade, data_venda=None, idempotency_key=None):
         """
         Registra uma venda: Checa estoque, calcula valor_total (preço * quantidade),
         insere em vendas e decrementa estoque do produto. Se data_venda for fornecida
         (str ISO ou datetime), usa-a; caso contrário usa NOW().
+        Conflitos de serialização e deadlocks são refeitos conforme `sale_retry`.
+
+        Com `idempotency_key` (str única por requisição, ex.: um UUID gerado pelo cliente),
+        repetir a chamada com a mesma chave — por exemplo depois de um tempo limite —
+        devolve a venda original sem inserir outra nem mexer no estoque de novo.
         Retorna (new_id, message).
         """
-        conn = get_db_connection()
-        if not conn:
-            return None, "Erro: conexão com o banco indisponível."
+        return self._run_sale(self._register_sale_once, data_venda, produto_id, cliente_id, quantidade,
+                              idempotency_key, produtos=[produto_id])
 
-        # Normaliza data_venda
-        dv = None
-        if data_venda:
+    def register_sale_atomic(self, produto_id, cliente_id, quantidade, data_venda=None, idempotency_key=None):
+        """
+        Mesmo contrato de register_sale, mas em um único comando (VENDA_ATOMICA):
+        o UPDATE condicional (estoque >= quantidade) bloqueia a linha, devolve o preço
+        e alimenta o INSERT em vendas, com valor_total calculado em NUMERIC no banco.
+        Troca três idas ao banco sob bloqueio por uma.
+        Retorna (new_id, message).
+        """
+        return self._run_sale(self._register_sale_atomic_once, data_venda, produto_id, cliente_id, quantidade,
+                              idempotency_key, produtos=[produto_id])
+
+    def register_order(self, cliente_id, items, data_pedido=None):
+        """
+        Registra um pedido com vários itens em uma única transação.
+
+        Args:
+            cliente_id (int): ID do cliente.
+            items (iterable): Pares (produto_id, quantidade). Itens repetidos do mesmo
+                produto são somados.
+            data_pedido (str | datetime, opcional): Data do pedido; se omitida usa NOW().
+
+        Todos os produtos (e as fatias dos que têm estoque fatiado) são bloqueados em ordem
+        crescente de id e o estoque de todos é conferido antes de qualquer gravação: ou o pedido inteiro é registrado, ou nada.
+        Cada item vira uma venda ligada ao pedido (visão itens_pedido).
+        Retorna (pedido_id, message).
+        """
+        quantidades = {}
+        try:
+            for produto_id, quantidade in items:
+                produto_id, quantidade = int(produto_id), int(quantidade)
+                if quantidade <= 0:
+                    return None, f"Erro: quantidade inválida para o produto {produto_id}."
+                quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+        except (TypeError, ValueError):
+            return None, "Erro: os itens devem ser pares (produto_id, quantidade) inteiros."
+        if not quantidades:
+            return None, "Erro: o pedido não tem itens."
+        return self._run_sale(self._register_order_once, data_pedido, cliente_id, sorted(quantidades.items()),
+                              produtos=sorted(quantidades))
+
+    def _register_order_once(self, cliente_id, itens, dv):
+        """Uma tentativa de register_order; `itens` vem ordenado por produto_id."""
+        produto_ids = [produto_id for produto_id, _ in itens]
+        quantidades = [quantidade for _, quantidade in itens]
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                estoques = lock_available_stock(cur, PEDIDO_LOCK_PRODUTOS, produto_ids)
+
+                faltando = [pid for pid in produto_ids if pid not in estoques]
+                if faltando:
+                    conn.rollback()
+                    return None, f"Erro: produto(s) não encontrado(s): {', '.join(map(str, faltando))}."
+                insuficientes = [f"{pid} (disponível: {estoques[pid]})"
+                                 for pid, quantidade in itens if estoques[pid] < quantidade]
+                if insuficientes:
+                    conn.rollback()
+                    return None, f"Erro: estoque insuficiente para o(s) produto(s) {', '.join(insuficientes)}."
+
+                prepared_statements.execute(cur, PEDIDO_INSERT, (cliente_id, dv, produto_ids, quantidades))
+                pedido_id = cur.fetchone()[0]
+                conn.commit()
+                return pedido_id, f"Pedido registrado com sucesso ({len(itens)} item(ns))."
+
+    def register_sales_batch(self, rows):
+        """
+        Registra um lote de vendas em uma única transação, com um número fixo de comandos
+        (bloqueio dos produtos, conferência dos clientes e um INSERT/UPDATE em conjunto)
+        em vez de três comandos e uma conexão por venda.
+
+        Args:
+            rows (iterable): Tuplas (produto_id, cliente_id, quantidade) ou
+                (produto_id, cliente_id, quantidade, data_venda).
+
+        O estoque é reservado na ordem do lote: uma linha que não cabe no estoque restante
+        é recusada sem impedir as seguintes. Linhas recusadas não impedem a gravação das demais.
+        Retorna uma lista de (new_id, message), uma por linha de entrada e na mesma ordem.
+        """
+        rows = list(rows)
+        resultados = [None] * len(rows)
+        validas = []  # (posição, produto_id, cliente_id, quantidade, data_venda)
+        for i, row in enumerate(rows):
             try:
-                if isinstance(data_venda, str):
-                    dv = datetime.fromisoformat(data_venda)
-                else:
-                    dv = data_venda
+                produto_id, cliente_id, quantidade = (int(x) for x in row[:3])
+            except (TypeError, ValueError):
+                resultados[i] = (None, "Erro: produto_id, cliente_id e quantidade devem ser inteiros.")
+                continue
+            if quantidade <= 0:
+                resultados[i] = (None, "Erro: quantidade deve ser maior que zero.")
+                continue
+            try:
+                dv = self._parse_sale_date(row[3] if len(row) > 3 else None)
+            except Exception as e:
+                resultados[i] = (None, f"Erro: formato de data inválido ({e}). Use ISO: YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS")
+                continue
+            validas.append((i, produto_id, cliente_id, quantidade, dv))
+
+        if validas:
+            try:
+                resultados_lote = sale_retry.call(self._register_sales_batch_once, validas)
+            except DataAccessError as e:
+                resultados_lote = {i: (None, f"Erro: {e}") for i, *_ in validas}
             except Exception as e:
-                return None, f"Erro: formato de data inválido ({e}). Use ISO: YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS"
+                resultados_lote = {i: (None, f"Erro ao registrar venda: {e}") for i, *_ in validas}
+            for i, resultado in resultados_lote.items():
+                resultados[i] = resultado
+            vendidos = {v[1] for v in validas if resultados[v[0]][0] is not None}
+            if vendidos:
+                produtos_alterados(sorted(vendidos), wait=False)
+        return resultados
 
+    def submit_sale(self, produto_id, cliente_id, quantidade, data_venda=None, timeout=None):
+        """
+        Modo write-behind de register_sale: enfileira a venda e retorna imediatamente um
+        concurrent.futures.Future que resolve com (new_id, message), o mesmo retorno de
+        register_sale (new_id é None em caso de estoque insuficiente ou outro erro).
+
+        Uma thread de fundo grava as vendas da fila em lotes (register_sales_batch) de até
+        DB_WRITE_BEHIND_BATCH vendas ou a cada DB_WRITE_BEHIND_WAIT_MS ms, com um único
+        COMMIT por lote. Com a fila cheia (DB_WRITE_BEHIND_QUEUE) espera por espaço até
+        `timeout` segundos (None = sem limite).
+        """
         try:
+            return get_sale_writer().submit((produto_id, cliente_id, quantidade, data_venda), timeout=timeout)
+        except queue.Full:
+            future = Future()
+            future.set_result((None, "Erro: fila de vendas cheia. Tente novamente em instantes."))
+            return future
+
+    def _register_sales_batch_once(self, validas):
+        """Uma tentativa de register_sales_batch; retorna {posição: (new_id, message)}."""
+        resultados = {}
+        with get_connection(query_class="oltp_write") as conn:
             with conn.cursor() as cur:
+                restante = lock_available_stock(cur, VENDA_LOTE_LOCK_PRODUTOS, sorted({v[1] for v in validas}))
+                prepared_statements.execute(cur, VENDA_LOTE_CLIENTES, (list({v[2] for v in validas}),))
+                clientes = {row[0] for row in cur.fetchall()}
+
+                aceitas = []
+                for i, produto_id, cliente_id, quantidade, dv in validas:
+                    if produto_id not in restante:
+                        resultados[i] = (None, "Erro: produto não encontrado.")
+                    elif cliente_id not in clientes:
+                        resultados[i] = (None, "Erro: cliente não encontrado.")
+                    elif restante[produto_id] < quantidade:
+                        resultados[i] = (None, f"Erro: estoque insuficiente (disponível: {restante[produto_id]}).")
+                    else:
+                        restante[produto_id] -= quantidade
+                        aceitas.append((i, produto_id, cliente_id, quantidade, dv))
+
+                if aceitas:
+                    colunas = [list(col) for col in zip(*aceitas)]
+                    prepared_statements.execute(cur, VENDA_LOTE_INSERT, colunas)
+                    for i, new_id in cur.fetchall():
+                        resultados[i] = (new_id, "Venda registrada com sucesso.")
+                conn.commit()
+        return resultados
+
+    def _run_sale(self, attempt, data_venda, *args, produtos=()):
+        """
+        Converte a data e executa attempt(*args, dv) com novas tentativas e mensagens de erro.
+        Depois de uma venda gravada, avisa os caches de produtos (produtos_alterados).
+        """
+        try:
+            dv = self._parse_sale_date(data_venda)
+        except Exception as e:
+            return None, f"Erro: formato de data inválido ({e}). Use ISO: YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS"
+
+        try:
+            resultado = sale_retry.call(attempt, *args, dv)
+            if resultado[0] is not None:
+                produtos_alterados(produtos, wait=False)
+            return resultado
+        except DataAccessError as e:
+            # Banco indisponível ou tempo limite: a mensagem já é própria para o usuário
+            return None, f"Erro: {e}"
+        except Exception as e:
+            return None, f"Erro ao registrar venda: {e}"
+
+    def _claim_idempotency_key(self, cur, key, produto_id, cliente_id, quantidade):
+        """
+        Reserva `key` na transação corrente. Retorna None se a chave é nova (a venda deve
+        prosseguir e depois chamar IDEMPOTENCIA_CONFIRMA) ou o resultado da venda original.
+        """
+        prepared_statements.execute(cur, IDEMPOTENCIA_RESERVA, (key,))
+        if cur.rowcount == 1:
+            return None
+        prepared_statements.execute(cur, IDEMPOTENCIA_ORIGINAL, (key,))
+        venda_id, produto_original, cliente_original, quantidade_original = cur.fetchone()
+        if (produto_original, cliente_original, quantidade_original) != (produto_id, cliente_id, quantidade):
+            return None, "Erro: chave de idempotência já usada em outra venda."
+        return venda_id, "Venda registrada com sucesso."
+
+    def _register_sale_atomic_once(self, produto_id, cliente_id, quantidade, idempotency_key, dv):
+        """Uma tentativa de register_sale_atomic."""
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                if idempotency_key is not None:
+                    original = self._claim_idempotency_key(cur, idempotency_key, produto_id, cliente_id, quantidade)
+                    if original is not None:
+                        conn.rollback()
+                        return original
+                prepared_statements.execute(cur, VENDA_ATOMICA, (produto_id, cliente_id, quantidade, dv))
+                row = cur.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None, "Erro: produto não encontrado."
+                new_id, estoque_atual, num_shards, preco = row
+                if new_id is None and num_shards > 0:
+                    new_id, message = self._sell_from_shards(cur, produto_id, cliente_id, quantidade, preco, dv)
+                    if new_id is None:
+                        conn.rollback()
+                        return None, message
+                elif new_id is None:
+                    # Venda recusada: desfaz também a reserva da chave
+                    conn.rollback()
+                    return None, f"Erro: estoque insuficiente (disponível: {estoque_atual})."
+                if idempotency_key is not None:
+                    prepared_statements.execute(cur, IDEMPOTENCIA_CONFIRMA, (idempotency_key, new_id))
+                conn.commit()
+        return new_id, "Venda registrada com sucesso."
+
+    def _sell_from_shards(self, cur, produto_id, cliente_id, quantidade, preco, dv):
+        """
+        Venda de um produto com estoque fatiado, na transação corrente (ver take_from_shards).
+        Retorna (new_id, message); new_id None quando não há estoque (o chamador desfaz).
+        """
+        erro = take_from_shards(cur, produto_id, quantidade)
+        if erro is not None:
+            return None, erro
+        valor_total = float(preco) * int(quantidade)
+        prepared_statements.execute(cur, VENDA_INSERT, (produto_id, cliente_id, quantidade, valor_total, dv))
+        return cur.fetchone()[0], "Venda registrada com sucesso."
+
+    def _register_sale_once(self, produto_id, cliente_id, quantidade, idempotency_key, dv):
+        """Uma tentativa de register_sale; exceções desfazem a transação e sobem ao chamador."""
+        with get_connection(query_class="oltp_write") as conn:
+            with conn.cursor() as cur:
+                if idempotency_key is not None:
+                    original = self._claim_idempotency_key(cur, idempotency_key, produto_id, cliente_id, quantidade)
+                    if original is not None:
+                        conn.rollback()
+                        return original
                 # Busca produto e estoque/preco com bloqueio para transação segura
-                cur.execute("SELECT preco, estoque FROM produtos WHERE id = %s FOR UPDATE", (produto_id,))
+                prepared_statements.execute(cur, VENDA_LOCK_PRODUTO, (produto_id,))
                 prod = cur.fetchone()
                 if not prod:
-                    conn.rollback()
-                    return None, "Erro: produto não encontrado."
+                    # Sem linha bloqueada: o produto não existe ou tem o estoque fatiado
+                    prepared_statements.execute(cur, VENDA_PRODUTO_FATIADO, (produto_id,))
+                    fatiado = cur.fetchone()
+                    if not fatiado:
+                        conn.rollback()
+                        return None, "Erro: produto não encontrado."
+                    new_id, message = self._sell_from_shards(cur, produto_id, cliente_id, quantidade, fatiado[0], dv)
+                    if new_id is None:
+                        conn.rollback()
+                        return None, message
+                    if idempotency_key is not None:
+                        prepared_statements.execute(cur, IDEMPOTENCIA_CONFIRMA, (idempotency_key, new_id))
+                    conn.commit()
+                    return new_id, message
                 preco, estoque_atual = prod
                 if estoque_atual < quantidade:
                     conn.rollback()
                     return None, f"Erro: estoque insuficiente (disponível: {estoque_atual})."
 
                 valor_total = float(preco) * int(quantidade)
-                # Insere venda — usa NOW() quando dv é None, senão envia o timestamp
-                if dv is None:
-                    cur.execute(
-                        "INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda) VALUES (%s, %s, %s, %s, NOW()) RETURNING id",
-                        (produto_id, cliente_id, quantidade, valor_total)
-                    )
-                else:
-                    cur.execute(
-                        "INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-                        (produto_id, cliente_id, quantidade, valor_total, dv)
-                    )
+                # Insere venda — usa NOW() quando dv é None, senão o timestamp informado
+                prepared_statements.execute(cur, VENDA_INSERT, (produto_id, cliente_id, quantidade, valor_total, dv))
                 new_id = cur.fetchone()[0]
                 # Atualiza estoque
-                cur.execute("UPDATE produtos SET estoque = estoque - %s WHERE id = %s", (quantidade, produto_id))
+                prepared_statements.execute(cur, VENDA_BAIXA_ESTOQUE, (quantidade, produto_id))
+                if idempotency_key is not None:
+                    prepared_statements.execute(cur, IDEMPOTENCIA_CONFIRMA, (idempotency_key, new_id))
                 conn.commit()
                 return new_id, "Venda registrada com sucesso."
-        except Exception as e:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-            return None, f"Erro ao registrar venda: {e}"
\ No newline at end of file
@@ -27,6 +27,7 @@ class CLIView:
         print("3 - Atualizar estoque")
         print("4 - Filtrar por categoria")
         print("5 - Buscar por ID")    # <- opção adicionada
+        print("6 - Buscar por palavras (nome/categoria)")
         print("9 - Voltar")
         return input("Escolha: ").strip()
 
@@ -54,6 +55,10 @@ class CLIView:
         return input("Escolha uma opção: ")
 
     # --- Funções de Exibição (SHOW) ---
+    def ask_next_page(self):
+        """Pergunta se o usuário quer ver a próxima página de uma listagem."""
+        return input("Enter para a próxima página, 0 para voltar: ").strip() != "0"
+
     def show_products(self, produtos):
         """Exibe uma lista de produtos de forma formatada."""
         if not produtos: self.show_message("Nenhum produto encontrado."); return
@@ -172,9 +177,17 @@ class CLIView:
         return nome_empresa, contato, telefone
     
     def get_product_id(self):
-        """Solicita ao usuário o ID do produto. Retorna string vazia se cancelado."""
+        """Solicita ao usuário o ID do produto (ou vários, separados por vírgula). Retorna string vazia se cancelado."""
+        try:
+            return input("Informe o ID do produto, ou vários separados por vírgula (Enter para cancelar): ").strip()
+        except (KeyboardInterrupt, EOFError):
+            print()
+            return ""
+
+    def get_search_terms(self):
+        """Solicita as palavras da busca de produtos. Retorna string vazia se cancelado."""
         try:
-            return input("Informe o ID do produto (ou Enter para cancelar): ").strip()
+            return input("Palavras da busca (ex.: notebook gamer; Enter para cancelar): ").strip()
         except (KeyboardInterrupt, EOFError):
             print()
             return ""
@@ -1,3 +1,4 @@
+import uuid
 import tkinter as tk
 from tkinter import ttk, messagebox
 
@@ -38,18 +39,22 @@ class GuiView(tk.Tk):
         self.notebook.add(tab, text="Produtos")
         self.setup_universal_tab(tab, "Produto", 
                                  ["ID", "Nome", "Preço", "Categoria", "Estoque", "Fornecedor"],
-                                 self.controller.list_products,
+                                 self.controller.list_products_page,
                                  self.show_add_product_dialog)
         # Busca por ID e filtro por categoria
         search_frame = ttk.Frame(tab)
         search_frame.pack(fill="x", pady=5)
 
-        ttk.Label(search_frame, text="Buscar por ID:").pack(side="left", padx=(0,4))
-        id_entry = ttk.Entry(search_frame, width=10)
+        ttk.Label(search_frame, text="Buscar por ID(s):").pack(side="left", padx=(0,4))
+        id_entry = ttk.Entry(search_frame, width=14)
         id_entry.pack(side="left")
         def on_search_id():
             pid = id_entry.get().strip()
-            data = self.controller.get_product_by_id(pid)
+            try:
+                data = self.controller.get_product_by_id(pid)
+            except Exception as e:
+                messagebox.showerror("Erro", f"Erro ao buscar produto: {e}")
+                return
             self._populate_tree(tab.tree, data)
         ttk.Button(search_frame, text="Buscar", command=on_search_id).pack(side="left", padx=6)
 
@@ -58,10 +63,34 @@ class GuiView(tk.Tk):
         cat_entry.pack(side="left")
         def on_filter_cat():
             cat = cat_entry.get().strip()
-            data = self.controller.get_products_by_category(cat)
+            if not cat:
+                # Filtro vazio volta à listagem paginada
+                self.refresh_tree(tab.tree)
+                return
+            try:
+                data = self.controller.get_products_by_category(cat)
+            except Exception as e:
+                messagebox.showerror("Erro", f"Erro ao filtrar produtos: {e}")
+                return
             self._populate_tree(tab.tree, data)
         ttk.Button(search_frame, text="Filtrar", command=on_filter_cat).pack(side="left", padx=6)
 
+        # Busca por palavras (nome e categoria), com os mais relevantes primeiro
+        text_frame = ttk.Frame(tab)
+        text_frame.pack(fill="x", pady=5)
+        ttk.Label(text_frame, text="Buscar por palavras:").pack(side="left", padx=(0,4))
+        text_entry = ttk.Entry(text_frame, width=40)
+        text_entry.pack(side="left")
+        def on_search_text():
+            termos = text_entry.get().strip()
+            if not termos:
+                self.refresh_tree(tab.tree, self.controller.list_products_page)
+                return
+            # Paginada como a listagem: "Carregar Mais" traz os próximos resultados
+            self.refresh_tree(tab.tree, lambda cursor: self.controller.search_products(termos, cursor))
+        text_entry.bind("<Return>", lambda event: on_search_text())
+        ttk.Button(text_frame, text="Buscar", command=on_search_text).pack(side="left", padx=6)
+
         # Botão adicional para atualizar estoque
         ttk.Button(tab, text="Atualizar Estoque", command=self.show_update_stock_dialog).pack(pady=5)
 
@@ -71,7 +100,7 @@ class GuiView(tk.Tk):
         self.notebook.add(tab, text="Vendas")
         self.setup_universal_tab(tab, "Venda",
                                  ["ID", "Produto", "Cliente", "Qtd", "Total", "Data"],
-                                 self.controller.list_sales,
+                                 self.controller.list_sales_page,
                                  self.show_add_sale_dialog)
         # Filtro por período
         period_frame = ttk.Frame(tab)
@@ -88,19 +117,19 @@ class GuiView(tk.Tk):
             fim = end_entry.get().strip()
             try:
                 data = self.controller.get_sales_by_period(inicio, fim)
-                # adapta linhas caso o model retorne categoria extra
-                rows = []
-                for r in data:
-                    if not r: continue
-                    rlist = list(r)
-                    # modelo pode ser (id, produto, categoria, cliente, qtd, total, data)
-                    # mapear para (ID, Produto, Cliente, Qtd, Total, Data)
-                    if len(rlist) == 7:
-                        mapped = (rlist[0], rlist[1], rlist[3], rlist[4], rlist[5], rlist[6])
-                    else:
-                        mapped = tuple(rlist)
-                    rows.append(mapped)
-                self._populate_tree(tab.tree, rows)
+                # adapta linhas caso o model retorne categoria extra; o gerador é consumido
+                # à medida que a tree é populada, sem montar uma lista intermediária
+                def mapped_rows():
+                    for r in data:
+                        if not r: continue
+                        rlist = list(r)
+                        # modelo pode ser (id, produto, categoria, cliente, qtd, total, data)
+                        # mapear para (ID, Produto, Cliente, Qtd, Total, Data)
+                        if len(rlist) == 7:
+                            yield (rlist[0], rlist[1], rlist[3], rlist[4], rlist[5], rlist[6])
+                        else:
+                            yield tuple(rlist)
+                self._populate_tree(tab.tree, mapped_rows())
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao buscar vendas: {e}")
         ttk.Button(period_frame, text="Buscar por Período", command=on_search_period).pack(side="left", padx=8)
@@ -111,7 +140,7 @@ class GuiView(tk.Tk):
         self.notebook.add(tab, text="Clientes")
         self.setup_universal_tab(tab, "Cliente",
                                  ["ID", "Nome", "Email", "Telefone"],
-                                 self.controller.list_customers,
+                                 self.controller.list_customers_page,
                                  self.show_add_customer_dialog)
 
     def create_suppliers_tab(self):
@@ -120,7 +149,7 @@ class GuiView(tk.Tk):
         self.notebook.add(tab, text="Fornecedores")
         self.setup_universal_tab(tab, "Fornecedor",
                                  ["ID", "Empresa", "Contato", "Telefone"],
-                                 self.controller.list_suppliers,
+                                 self.controller.list_suppliers_page,
                                  self.show_add_supplier_dialog)
 
     def create_reports_tab(self):
@@ -173,12 +202,10 @@ class GuiView(tk.Tk):
             self.report_tree.heading(col, text=col)
             self.report_tree.column(col, width=120, anchor="w")
 
-        # Busca e insere os novos dados
-        data = fetch_data_callback()
-        if not data:
-            messagebox.showinfo("Relatório", "Nenhum registro encontrado.")
-        else:
-            for row in data:
+        # Busca e insere os novos dados (o callback pode devolver uma lista ou um gerador)
+        inserted = 0
+        try:
+            for row in fetch_data_callback() or []:
                 vals = list(row) if row else []
                 # Ajusta tamanho para colunas
                 if len(vals) > len(columns):
@@ -186,6 +213,12 @@ class GuiView(tk.Tk):
                 else:
                     vals += [""] * (len(columns) - len(vals))
                 self.report_tree.insert("", "end", values=vals)
+                inserted += 1
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao gerar relatório: {e}")
+            return
+        if not inserted:
+            messagebox.showinfo("Relatório", "Nenhum registro encontrado.")
 
     def display_estoque_critico_report(self):
         """Chama a função genérica para exibir o relatório de estoque crítico."""
@@ -224,16 +257,18 @@ class GuiView(tk.Tk):
 
     # --- Widgets reutilizáveis ---
     
-    def setup_universal_tab(self, parent_tab, entity_name, columns, list_callback, add_callback):
+    def setup_universal_tab(self, parent_tab, entity_name, columns, page_callback, add_callback):
         """
         Cria uma estrutura de aba padronizada com botões e uma tabela (Treeview).
         Esta função é reutilizada para criar as abas de Produtos, Vendas, Clientes e Fornecedores.
+        A tabela mostra uma página por vez; "Carregar Mais" acrescenta a página seguinte.
 
         Args:
             parent_tab (ttk.Frame): O widget da aba onde os elementos serão inseridos.
             entity_name (str): O nome da entidade (ex: "Produto") para usar nos textos dos botões.
             columns (list[str]): A lista de nomes de colunas para a tabela.
-            list_callback (function): A função do controller para listar os itens.
+            page_callback (function): A função do controller que busca uma página de itens
+                (recebe o cursor e retorna (linhas, próximo cursor)).
             add_callback (function): A função que abre o diálogo para adicionar um novo item.
         """
         frame = ttk.Frame(parent_tab, padding="10")
@@ -244,7 +279,9 @@ class GuiView(tk.Tk):
         btn_frame.pack(fill="x", pady=5)
         
         ttk.Button(btn_frame, text=f"Adicionar Novo {entity_name}", command=add_callback).pack(side="left")
-        ttk.Button(btn_frame, text=f"Atualizar Lista", command=lambda: self.refresh_tree(tree, list_callback)).pack(side="left", padx=10)
+        ttk.Button(btn_frame, text=f"Atualizar Lista", command=lambda: self.refresh_tree(tree, page_callback)).pack(side="left", padx=10)
+        more_button = ttk.Button(btn_frame, text="Carregar Mais", command=lambda: self.load_next_page(tree))
+        more_button.pack(side="left")
 
         # Treeview para exibir a lista
         tree = ttk.Treeview(frame, columns=columns, show="headings")
@@ -252,26 +289,46 @@ class GuiView(tk.Tk):
             tree.heading(col, text=col)
             tree.column(col, width=120, anchor="w")
         tree.pack(fill="both", expand=True)
+        tree.page_callback = page_callback
+        tree.next_cursor = None
+        tree.more_button = more_button
 
         # Adiciona a treeview como um atributo do frame para poder acessá-la depois
         parent_tab.tree = tree
         
-        # Carrega os dados iniciais
-        self.refresh_tree(tree, list_callback)
+        # Carrega a primeira página
+        self.refresh_tree(tree)
 
-    def refresh_tree(self, tree, list_callback):
+    def refresh_tree(self, tree, page_callback=None):
         """
-        Limpa e recarrega os dados de uma tabela (Treeview).
+        Limpa a tabela (Treeview) e carrega de novo a primeira página.
 
         Args:
             tree (ttk.Treeview): O widget da tabela a ser atualizado.
-            list_callback (function): A função do controller que busca os dados atualizados.
+            page_callback (function, optional): Passa a paginar com esta função (ex.: uma
+                busca); por padrão continua com a da última carga.
         """
+        if page_callback is not None:
+            tree.page_callback = page_callback
         # Limpa a árvore
         for item in tree.get_children():
             tree.delete(item)
-        # Busca os novos dados e insere na árvore
-        for row in list_callback():
+        tree.next_cursor = None
+        self._append_page(tree, None)
+
+    def load_next_page(self, tree):
+        """Acrescenta à tabela a página seguinte à última carregada."""
+        if tree.next_cursor:
+            self._append_page(tree, tree.next_cursor)
+
+    def _append_page(self, tree, cursor):
+        try:
+            rows, tree.next_cursor = tree.page_callback(cursor)
+        except Exception as e:
+            # Mostra o erro real (ex.: banco fora do ar) em vez de deixar a tabela vazia
+            messagebox.showerror("Erro", f"Erro ao carregar dados: {e}")
+            return
+        for row in rows:
             vals = list(row) if row else []
             cols = tree["columns"]
             if len(vals) > len(cols):
@@ -279,11 +336,15 @@ class GuiView(tk.Tk):
             else:
                 vals += [""] * (len(cols) - len(vals))
             tree.insert("", "end", values=vals)
+        tree.more_button.state(["!disabled"] if tree.next_cursor else ["disabled"])
 
     def _populate_tree(self, tree, data_rows):
         """Popula diretamente uma tree com uma lista de tuplas/lists (útil para buscas)."""
         for item in tree.get_children():
             tree.delete(item)
+        # Resultado de busca vem completo: não há página seguinte
+        tree.next_cursor = None
+        tree.more_button.state(["disabled"])
         for row in data_rows or []:
             vals = list(row) if row else []
             cols = tree["columns"]
@@ -308,7 +369,15 @@ class GuiView(tk.Tk):
             "Quantidade": "quantidade",
             "Data da Venda (opcional, ISO YYYY-MM-DD ou YYYY-MM-DDTHH:MM:SS)": "data_venda"
         }
-        self.create_dialog("Registrar Venda", fields, self.controller.add_sale)
+        # Uma chave de idempotência por diálogo e por conjunto de valores: confirmar de novo
+        # depois de um erro (ex.: tempo limite) não registra a mesma venda duas vezes
+        keys = {}
+
+        def add_sale(*values):
+            key = keys.setdefault(values, uuid.uuid4().hex)
+            return self.controller.add_sale(*values, idempotency_key=key)
+
+        self.create_dialog("Registrar Venda", fields, add_sale)
 
     def show_add_customer_dialog(self):
         """Abre um diálogo para adicionar um novo cliente."""
@@ -391,17 +460,8 @@ class GuiView(tk.Tk):
         submit_btn.grid(row=r, columnspan=2, pady=10)
 
     def refresh_all_tabs(self):
-        """Atualiza todas as treeviews das abas abertas (quando houver)."""
+        """Recarrega a primeira página de todas as treeviews das abas abertas (quando houver)."""
         for child in self.notebook.winfo_children():
             tree = getattr(child, "tree", None)
-            if tree:
-                # tenta descobrir o callback usado originalmente lendo um atributo; se não houver, apenas recarrega produtos/sales conforme tab text
-                tab_text = self.notebook.tab(child, option="text")
-                if tab_text == "Produtos":
-                    self.refresh_tree(tree, self.controller.list_products)
-                elif tab_text == "Vendas":
-                    self.refresh_tree(tree, self.controller.list_sales)
-                elif tab_text == "Clientes":
-                    self.refresh_tree(tree, self.controller.list_customers)
-                elif tab_text == "Fornecedores":
-                    self.refresh_tree(tree, self.controller.list_suppliers)
\ No newline at end of file
+            if tree is not None and hasattr(tree, "page_callback"):
+                self.refresh_tree(tree)
@@ -0,0 +1,92 @@
+"""
+Benchmark: register_sale (SELECT ... FOR UPDATE + INSERT + UPDATE) contra
+register_sale_atomic (um único comando com CTE) em um produto "quente".
+
+1. Tempo de bloqueio: em uma única thread, mede o intervalo entre o envio do comando
+   que bloqueia a linha do produto e o fim do COMMIT, em cada implementação.
+2. Vazão: N threads vendem o mesmo produto durante alguns segundos; reporta vendas/s
+   e latência p50/p95/p99 de cada implementação.
+
+Cria um produto temporário e apaga ele e suas vendas ao final.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.atomic_sale --threads 16 --segundos 10
+"""
+import time
+import argparse
+
+from app.models.database import get_pool, prepared_statements
+from app.models.venda_model import (
+    VendaModel, VENDA_LOCK_PRODUTO, VENDA_INSERT, VENDA_BAIXA_ESTOQUE, VENDA_ATOMICA
+)
+from benchmarks.common import temporary_product, any_cliente_id, measure_throughput, percentile, print_table
+
+
+def lock_hold_legacy(cur, conn, produto_id, cliente_id):
+    start = time.perf_counter()
+    prepared_statements.execute(cur, VENDA_LOCK_PRODUTO, (produto_id,))
+    preco, _ = cur.fetchone()
+    prepared_statements.execute(cur, VENDA_INSERT, (produto_id, cliente_id, 1, float(preco), None))
+    cur.fetchone()
+    prepared_statements.execute(cur, VENDA_BAIXA_ESTOQUE, (1, produto_id))
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def lock_hold_atomic(cur, conn, produto_id, cliente_id):
+    start = time.perf_counter()
+    prepared_statements.execute(cur, VENDA_ATOMICA, (produto_id, cliente_id, 1, None))
+    cur.fetchone()
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def measure_lock_hold(fn, produto_id, cliente_id, n):
+    samples = []
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            for _ in range(n):
+                # Abre a transação antes de cronometrar para medir só o trecho sob bloqueio
+                cur.execute("SELECT 1")
+                samples.append(fn(cur, conn, produto_id, cliente_id))
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=10.0, help="duração da fase de vazão por implementação")
+    parser.add_argument("--amostras", type=int, default=500, help="vendas na medição do tempo de bloqueio")
+    args = parser.parse_args()
+
+    model = VendaModel()
+    implementations = [
+        ("register_sale", model.register_sale, lock_hold_legacy),
+        ("register_sale_atomic", model.register_sale_atomic, lock_hold_atomic),
+    ]
+    cliente_id = any_cliente_id()
+    hold_rows = []
+    throughput_rows = []
+    with temporary_product(estoque=10 ** 9) as produto_id:
+        for name, sale, hold_fn in implementations:
+            hold = measure_lock_hold(hold_fn, produto_id, cliente_id, args.amostras)
+            hold_rows.append([name, f"{percentile(hold, 50) * 1e6:.0f}", f"{percentile(hold, 99) * 1e6:.0f}"])
+
+            latencies, failures, elapsed = measure_throughput(sale, produto_id, cliente_id, args.threads, args.segundos)
+            throughput_rows.append([
+                name,
+                f"{len(latencies) / elapsed:.0f}",
+                f"{percentile(latencies, 50) * 1e3:.2f}",
+                f"{percentile(latencies, 95) * 1e3:.2f}",
+                f"{percentile(latencies, 99) * 1e3:.2f}",
+                failures,
+            ])
+
+    print("Tempo de bloqueio da linha do produto (1 thread, sem disputa):")
+    print_table(["implementação", "p50 µs", "p99 µs"], hold_rows)
+    print(f"\nVazão com {args.threads} threads no mesmo produto:")
+    print_table(["implementação", "vendas/s", "p50 ms", "p95 ms", "p99 ms", "falhas"], throughput_rows)
+
+
+if __name__ == "__main__":
+    main()
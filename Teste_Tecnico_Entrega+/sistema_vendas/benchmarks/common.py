@@ -0,0 +1,87 @@
+"""Utilitários compartilhados pelos benchmarks (produto temporário, percentis e relatório)."""
+import time
+import threading
+from contextlib import contextmanager
+
+from app.models.database import get_pool
+
+
+@contextmanager
+def temporary_product(estoque, preco=10.0, nome="Produto Benchmark", categoria="Benchmark"):
+    """
+    Cria um produto só para o benchmark e, ao final, apaga as vendas e reservas dele e o próprio produto,
+    deixando o banco como estava.
+    """
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO produtos (nome, preco, categoria, estoque) VALUES (%s, %s, %s, %s) RETURNING id",
+                (nome, preco, categoria, estoque)
+            )
+            produto_id = cur.fetchone()[0]
+        conn.commit()
+    try:
+        yield produto_id
+    finally:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM vendas WHERE produto_id = %s", (produto_id,))
+                cur.execute("DELETE FROM reservas WHERE produto_id = %s", (produto_id,))
+                cur.execute("DELETE FROM produtos WHERE id = %s", (produto_id,))
+            conn.commit()
+
+
+def any_cliente_id():
+    """ID de um cliente existente, usado como comprador nas vendas simuladas."""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MIN(id) FROM clientes")
+            return cur.fetchone()[0]
+
+
+def percentile(sorted_values, p):
+    """Percentil `p` (0-100) de uma lista já ordenada, por interpolação do vizinho mais próximo."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def print_table(header, rows):
+    """Imprime uma tabela simples com colunas alinhadas."""
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    for line in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(line, widths)))
+
+
+def measure_throughput(sale, produto_id, cliente_id, threads, seconds):
+    """
+    Executa sale(produto_id, cliente_id, 1) em `threads` threads durante `seconds` segundos.
+    Retorna (latências ordenadas, vendas recusadas, tempo decorrido).
+    """
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker():
+        local = []
+        local_failures = 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            new_id, _ = sale(produto_id, cliente_id, 1)
+            local.append(time.perf_counter() - start)
+            if new_id is None:
+                local_failures += 1
+        with lock:
+            latencies.extend(local)
+            failures[0] += local_failures
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    return sorted(latencies), failures[0], elapsed
@@ -0,0 +1,53 @@
+"""
+Benchmark: register_sale (um COMMIT por venda) contra submit_sale (write-behind com
+commit em grupo). N threads vendem o mesmo produto durante alguns segundos; reporta
+vendas/s, latência p50/p95/p99 até a confirmação e o tamanho médio dos lotes gravados.
+
+Cria um produto temporário e apaga ele e suas vendas ao final.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.group_commit --threads 32 --segundos 10
+"""
+import argparse
+
+from app.models.venda_model import VendaModel, get_sale_writer, close_sale_writer
+from benchmarks.common import temporary_product, any_cliente_id, measure_throughput, percentile, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--segundos", type=float, default=10.0, help="duração da medição por implementação")
+    args = parser.parse_args()
+
+    model = VendaModel()
+
+    def write_behind(produto_id, cliente_id, quantidade):
+        return model.submit_sale(produto_id, cliente_id, quantidade).result()
+
+    cliente_id = any_cliente_id()
+    rows = []
+    try:
+        with temporary_product(estoque=10 ** 9) as produto_id:
+            for name, sale in (("register_sale", model.register_sale), ("submit_sale", write_behind)):
+                latencies, failures, elapsed = measure_throughput(sale, produto_id, cliente_id,
+                                                                  args.threads, args.segundos)
+                rows.append([
+                    name,
+                    f"{len(latencies) / elapsed:.0f}",
+                    f"{percentile(latencies, 50) * 1e3:.2f}",
+                    f"{percentile(latencies, 95) * 1e3:.2f}",
+                    f"{percentile(latencies, 99) * 1e3:.2f}",
+                    failures,
+                ])
+            avg_batch = get_sale_writer().stats()["avg_batch"]
+    finally:
+        close_sale_writer()
+
+    print(f"Vazão com {args.threads} threads:")
+    print_table(["implementação", "vendas/s", "p50 ms", "p95 ms", "p99 ms", "falhas"], rows)
+    print(f"\nVendas por COMMIT no modo write-behind: {avg_batch:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Gerador de carga de vendas concorrentes com verificação de estoque vendido a mais.
+
+Cria --quentes produtos "quentes" (disputados) e --frios produtos "frios" e dispara vendas
+a partir de --processos processos com --threads threads cada durante --segundos segundos.
+Uma fração --fracao-quente das vendas vai para os produtos quentes. Reporta vendas/s,
+latência p50/p95/p99, recusas por falta de estoque e erros, e depois confere as invariantes:
+
+  * nenhum estoque (nem fatia de estoque) ficou negativo;
+  * para cada produto, estoque inicial - estoque final = soma das quantidades vendidas
+    (gravadas em vendas) = soma das vendas confirmadas aos clientes da carga.
+
+A implementação de venda é plugável: um dos nomes em IMPLEMENTACOES ou "modulo:funcao",
+uma função f(produto_id, cliente_id, quantidade) que retorna (new_id, message) como
+VendaModel.register_sale. Os produtos temporários e suas vendas são apagados ao final.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.load_test --threads 16 --segundos 10
+    python -m benchmarks.load_test --implementacao register_sale_atomic --processos 4 --threads 8
+    python -m benchmarks.load_test --quentes 1 --estoque-quente 500 --fatias 8
+"""
+import sys
+import time
+import random
+import argparse
+import importlib
+import threading
+import multiprocessing
+from contextlib import ExitStack
+
+from app.models.database import get_pool, close_pool
+from benchmarks.common import temporary_product, any_cliente_id, percentile, print_table
+
+
+def _submit_sale():
+    from app.models.venda_model import VendaModel
+    model = VendaModel()
+    return lambda produto_id, cliente_id, quantidade: model.submit_sale(produto_id, cliente_id, quantidade).result()
+
+
+def _reserve_confirm():
+    from app.models.reserva_model import ReservaModel
+    model = ReservaModel()
+
+    def sale(produto_id, cliente_id, quantidade):
+        reserva_id, message = model.reserve(produto_id, quantidade, cliente_id=cliente_id)
+        if reserva_id is None:
+            return None, message
+        return model.confirm(reserva_id)
+    return sale
+
+
+def _venda_model_method(name):
+    def factory():
+        from app.models.venda_model import VendaModel
+        return getattr(VendaModel(), name)
+    return factory
+
+
+# Implementações de venda disponíveis por nome: cada uma é uma fábrica que devolve a função de venda
+IMPLEMENTACOES = {
+    "register_sale": _venda_model_method("register_sale"),
+    "register_sale_atomic": _venda_model_method("register_sale_atomic"),
+    "submit_sale": _submit_sale,
+    "reserve_confirm": _reserve_confirm,
+}
+
+
+def load_implementation(name):
+    """Resolve o nome da implementação (de IMPLEMENTACOES ou 'modulo:funcao') para a função de venda."""
+    if name in IMPLEMENTACOES:
+        return IMPLEMENTACOES[name]()
+    module_name, _, attr = name.partition(":")
+    if not attr:
+        raise SystemExit(f"Implementação desconhecida: {name} (use {', '.join(IMPLEMENTACOES)} ou modulo:funcao)")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def run_threads(implementacao, quentes, frios, fracao_quente, quantidade_max, cliente_id, threads, seconds, seed):
+    """
+    Executa a carga em `threads` threads deste processo. Retorna um dict com as latências
+    (ordenadas), contagens de resultado e a quantidade vendida com sucesso por produto.
+    """
+    sale = load_implementation(implementacao)
+    lock = threading.Lock()
+    resultado = {"latencies": [], "ok": 0, "sem_estoque": 0, "erros": 0, "vendido": {}, "exemplos_erro": []}
+    stop_at = time.perf_counter() + seconds
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        latencies, vendido = [], {}
+        ok = sem_estoque = erros = 0
+        exemplos = []
+        while time.perf_counter() < stop_at:
+            grupo = quentes if quentes and (not frios or rng.random() < fracao_quente) else frios
+            produto_id = rng.choice(grupo)
+            quantidade = rng.randint(1, quantidade_max)
+            start = time.perf_counter()
+            try:
+                new_id, message = sale(produto_id, cliente_id, quantidade)
+            except Exception as e:
+                new_id, message = None, f"exceção: {e}"
+            latencies.append(time.perf_counter() - start)
+            if new_id is not None:
+                ok += 1
+                vendido[produto_id] = vendido.get(produto_id, 0) + quantidade
+            elif "estoque insuficiente" in message:
+                sem_estoque += 1
+            else:
+                erros += 1
+                if len(exemplos) < 3:
+                    exemplos.append(message)
+        with lock:
+            resultado["latencies"].extend(latencies)
+            resultado["ok"] += ok
+            resultado["sem_estoque"] += sem_estoque
+            resultado["erros"] += erros
+            resultado["exemplos_erro"].extend(exemplos)
+            for produto_id, quantidade in vendido.items():
+                resultado["vendido"][produto_id] = resultado["vendido"].get(produto_id, 0) + quantidade
+
+    workers = [threading.Thread(target=worker, args=(seed * 1000 + i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    if implementacao == "submit_sale":
+        from app.models.venda_model import close_sale_writer
+        close_sale_writer()
+    return resultado
+
+
+def _process_main(queue, *args):
+    try:
+        queue.put(run_threads(*args))
+    finally:
+        close_pool()
+
+
+def merge_results(parciais):
+    total = {"latencies": [], "ok": 0, "sem_estoque": 0, "erros": 0, "vendido": {}, "exemplos_erro": []}
+    for parcial in parciais:
+        total["latencies"].extend(parcial["latencies"])
+        for chave in ("ok", "sem_estoque", "erros"):
+            total[chave] += parcial[chave]
+        total["exemplos_erro"].extend(parcial["exemplos_erro"])
+        for produto_id, quantidade in parcial["vendido"].items():
+            total["vendido"][produto_id] = total["vendido"].get(produto_id, 0) + quantidade
+    total["latencies"].sort()
+    return total
+
+
+def check_invariants(estoque_inicial, vendido_clientes):
+    """Confere as invariantes de estoque; retorna a lista de violações (vazia se tudo certo)."""
+    produto_ids = list(estoque_inicial)
+    violacoes = []
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, estoque FROM produtos_estoque WHERE id = ANY(%s)", (produto_ids,))
+            estoque_final = dict(cur.fetchall())
+            cur.execute("SELECT id FROM produtos WHERE id = ANY(%s) AND estoque < 0", (produto_ids,))
+            negativos = {row[0] for row in cur.fetchall()}
+            cur.execute("SELECT DISTINCT produto_id FROM estoque_shards WHERE produto_id = ANY(%s) AND estoque < 0",
+                        (produto_ids,))
+            negativos.update(row[0] for row in cur.fetchall())
+            cur.execute("SELECT produto_id, SUM(quantidade) FROM vendas WHERE produto_id = ANY(%s) GROUP BY produto_id",
+                        (produto_ids,))
+            vendido_banco = dict(cur.fetchall())
+        conn.rollback()
+    for produto_id in produto_ids:
+        baixa = estoque_inicial[produto_id] - estoque_final[produto_id]
+        no_banco = vendido_banco.get(produto_id, 0)
+        confirmado = vendido_clientes.get(produto_id, 0)
+        if produto_id in negativos or estoque_final[produto_id] < 0:
+            violacoes.append(f"produto {produto_id}: estoque negativo ({estoque_final[produto_id]})")
+        if not (baixa == no_banco == confirmado):
+            violacoes.append(f"produto {produto_id}: baixa de estoque {baixa}, vendido no banco {no_banco}, "
+                             f"vendas confirmadas {confirmado}")
+    return violacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--implementacao", default="register_sale",
+                        help=f"{', '.join(IMPLEMENTACOES)} ou modulo:funcao (padrão: register_sale)")
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16, help="threads por processo")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--quentes", type=int, default=2, help="produtos disputados")
+    parser.add_argument("--frios", type=int, default=50, help="produtos pouco disputados")
+    parser.add_argument("--fracao-quente", type=float, default=0.8, help="fração das vendas nos produtos quentes")
+    parser.add_argument("--estoque-quente", type=int, default=10 ** 6,
+                        help="estoque inicial dos produtos quentes (baixo = esgota durante o teste)")
+    parser.add_argument("--estoque-frio", type=int, default=10 ** 6)
+    parser.add_argument("--quantidade-max", type=int, default=3, help="quantidade por venda: 1..N")
+    parser.add_argument("--fatias", type=int, default=0, help="fatiar o estoque dos produtos quentes em N linhas")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    load_implementation(args.implementacao)  # falha cedo se o nome for inválido
+    cliente_id = any_cliente_id()
+    with ExitStack() as stack:
+        quentes = [stack.enter_context(temporary_product(args.estoque_quente, nome="Produto Quente Carga"))
+                   for _ in range(args.quentes)]
+        frios = [stack.enter_context(temporary_product(args.estoque_frio, nome="Produto Frio Carga"))
+                 for _ in range(args.frios)]
+        if args.fatias:
+            from app.models.produto_model import ProdutoModel
+            for produto_id in quentes:
+                ProdutoModel().enable_stock_sharding(produto_id, args.fatias)
+        estoque_inicial = dict([(p, args.estoque_quente) for p in quentes] + [(p, args.estoque_frio) for p in frios])
+
+        params = (args.implementacao, quentes, frios, args.fracao_quente, args.quantidade_max, cliente_id,
+                  args.threads, args.segundos)
+        started = time.perf_counter()
+        if args.processos <= 1:
+            parciais = [run_threads(*params, args.seed)]
+        else:
+            # spawn: cada processo abre o próprio pool em vez de herdar as conexões deste
+            ctx = multiprocessing.get_context("spawn")
+            queue = ctx.Queue()
+            processos = [ctx.Process(target=_process_main, args=(queue,) + params + (args.seed + i,))
+                         for i in range(args.processos)]
+            for p in processos:
+                p.start()
+            parciais = [queue.get() for _ in processos]
+            for p in processos:
+                p.join()
+        elapsed = time.perf_counter() - started
+        total = merge_results(parciais)
+        violacoes = check_invariants(estoque_inicial, total["vendido"])
+
+    lat = total["latencies"]
+    print(f"Implementação: {args.implementacao} | {args.processos} processo(s) x {args.threads} threads | "
+          f"{args.quentes} quentes ({args.fracao_quente:.0%} das vendas) + {args.frios} frios")
+    print_table(
+        ["vendas/s", "tentativas", "ok", "sem estoque", "erros", "p50 ms", "p95 ms", "p99 ms"],
+        [[f"{total['ok'] / elapsed:.0f}", len(lat), total["ok"], total["sem_estoque"], total["erros"],
+          f"{percentile(lat, 50) * 1e3:.2f}", f"{percentile(lat, 95) * 1e3:.2f}", f"{percentile(lat, 99) * 1e3:.2f}"]],
+    )
+    for exemplo in total["exemplos_erro"][:3]:
+        print(f"  erro: {exemplo}")
+    if violacoes:
+        print("\nINVARIANTES VIOLADAS:")
+        for violacao in violacoes:
+            print(f"  {violacao}")
+        return 1
+    print("\nInvariantes OK: nenhum estoque negativo e baixa de estoque = quantidade vendida em todos os produtos.")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        close_pool()
@@ -0,0 +1,168 @@
+"""
+Benchmark: consultas por período em vendas com e sem particionamento mensal.
+
+Cria no schema bench_particoes duas cópias sintéticas de vendas com o mesmo conteúdo
+(`--linhas` vendas espalhadas por `--meses` meses): uma tabela comum e uma particionada
+por mês, ambas com índice em data_venda. Mede a mediana de consultas de 1 dia, 1 mês e
+3 meses em cada uma, quantas partições o plano lê, e o custo de tirar o mês mais antigo
+(DELETE na tabela comum contra DETACH + DROP na particionada). O schema é apagado
+ao final, a não ser com --manter.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.partitioning                       # 50 milhões de linhas
+    python -m benchmarks.partitioning --linhas 2000000 --repeticoes 3
+"""
+import time
+import argparse
+from datetime import date, datetime, timedelta
+
+from app.models.database import get_pool
+from benchmarks.common import print_table
+
+SCHEMA = "bench_particoes"
+COLUNAS = """
+    id BIGINT NOT NULL,
+    produto_id INT NOT NULL,
+    cliente_id INT NOT NULL,
+    quantidade INT NOT NULL,
+    data_venda TIMESTAMP NOT NULL,
+    valor_total DECIMAL(10,2) NOT NULL
+"""
+# Vendas em ordem de data, como chegam na vida real, com produtos e clientes variados
+GERA_LOTE = """
+    INSERT INTO {tabela}
+    SELECT i, 1 + (i * 7919) %% 1000, 1 + (i * 104729) %% 5000, 1 + i %% 5,
+           %(inicio)s + (i - 1) * %(passo)s * INTERVAL '1 second', (1 + i %% 5) * 19.90
+    FROM generate_series(%(de)s::BIGINT, %(ate)s::BIGINT) AS i
+"""
+CONSULTAS = (
+    ("1 dia", "SELECT COUNT(*), SUM(valor_total) FROM {tabela} WHERE data_venda >= %s AND data_venda < %s", 1),
+    ("1 mês", "SELECT COUNT(*), SUM(valor_total) FROM {tabela} WHERE data_venda >= %s AND data_venda < %s", 31),
+    ("3 meses", "SELECT produto_id, SUM(valor_total) FROM {tabela} "
+                "WHERE data_venda >= %s AND data_venda < %s GROUP BY produto_id", 92),
+)
+LOTE = 1000000
+
+
+def _add_months(mes, meses):
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def create_tables(cur, inicio, meses):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"CREATE TABLE {SCHEMA}.plana ({COLUNAS}, PRIMARY KEY (id))")
+    cur.execute(f"CREATE TABLE {SCHEMA}.particionada ({COLUNAS}, PRIMARY KEY (id, data_venda)) "
+                "PARTITION BY RANGE (data_venda)")
+    for n in range(meses):
+        mes = _add_months(inicio, n)
+        cur.execute(f"CREATE TABLE {SCHEMA}.particionada_{mes:%Y_%m} PARTITION OF {SCHEMA}.particionada "
+                    "FOR VALUES FROM (%s) TO (%s)", (mes, _add_months(mes, 1)))
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.plana (data_venda)")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.particionada (data_venda)")
+
+
+def load(conn, linhas, inicio, meses):
+    segundos = (datetime.combine(_add_months(inicio, meses), datetime.min.time())
+                - datetime.combine(inicio, datetime.min.time())).total_seconds()
+    params = {"inicio": datetime.combine(inicio, datetime.min.time()), "passo": segundos / linhas}
+    with conn.cursor() as cur:
+        for de in range(1, linhas + 1, LOTE):
+            params.update({"de": de, "ate": min(linhas, de + LOTE - 1)})
+            for tabela in ("plana", "particionada"):
+                cur.execute(GERA_LOTE.format(tabela=f"{SCHEMA}.{tabela}"), params)
+            conn.commit()
+            print(f"\r{params['ate']}/{linhas} linhas carregadas", end="", flush=True)
+    print()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM ANALYZE {SCHEMA}.plana")
+            cur.execute(f"VACUUM ANALYZE {SCHEMA}.particionada")
+    finally:
+        conn.autocommit = False
+
+
+def scanned_partitions(cur, sql, params):
+    cur.execute("EXPLAIN " + sql.format(tabela=f"{SCHEMA}.particionada"), params)
+    return sum(1 for (linha,) in cur.fetchall() if " on particionada_" in linha)
+
+
+def run_queries(conn, inicio, meses, repeticoes):
+    # Período no meio da faixa, para nenhuma das tabelas ter vantagem de cache nas pontas
+    meio = datetime.combine(_add_months(inicio, meses // 2), datetime.min.time()) + timedelta(days=3)
+    rows = []
+    with conn.cursor() as cur:
+        for nome, sql, dias in CONSULTAS:
+            params = (meio, meio + timedelta(days=dias))
+            medianas = []
+            for tabela in ("plana", "particionada"):
+                consulta = sql.format(tabela=f"{SCHEMA}.{tabela}")
+                cur.execute(consulta, params)  # aquece o cache
+                cur.fetchall()
+                tempos = []
+                for _ in range(repeticoes):
+                    start = time.perf_counter()
+                    cur.execute(consulta, params)
+                    cur.fetchall()
+                    tempos.append(time.perf_counter() - start)
+                medianas.append(sorted(tempos)[len(tempos) // 2] * 1000)
+            rows.append((nome, f"{medianas[0]:.1f}", f"{medianas[1]:.1f}",
+                         f"{medianas[0] / medianas[1]:.2f}x", f"{scanned_partitions(cur, sql, params)}/{meses}"))
+        conn.rollback()
+    return rows
+
+
+def drop_oldest_month(conn, inicio):
+    proximo = _add_months(inicio, 1)
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        cur.execute(f"DELETE FROM {SCHEMA}.plana WHERE data_venda < %s", (proximo,))
+        conn.commit()
+        delete = time.perf_counter() - start
+        start = time.perf_counter()
+        cur.execute(f"ALTER TABLE {SCHEMA}.particionada DETACH PARTITION {SCHEMA}.particionada_{inicio:%Y_%m}")
+        cur.execute(f"DROP TABLE {SCHEMA}.particionada_{inicio:%Y_%m}")
+        conn.commit()
+        detach = time.perf_counter() - start
+    return delete, detach
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50000000)
+    parser.add_argument("--meses", type=int, default=24)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--manter", action="store_true", help="não apaga o schema bench_particoes ao final")
+    args = parser.parse_args()
+
+    inicio = _add_months(date.today().replace(day=1), -args.meses)
+    pool = get_pool()
+    with pool.connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                create_tables(cur, inicio, args.meses)
+            conn.commit()
+            print(f"Carregando {args.linhas} vendas em {args.meses} meses em cada tabela...")
+            start = time.perf_counter()
+            load(conn, args.linhas, inicio, args.meses)
+            print(f"Carga: {time.perf_counter() - start:.1f} s\n")
+
+            print(f"Mediana de {args.repeticoes} execuções (ms):")
+            print_table(("período", "comum", "particionada", "ganho", "partições lidas"),
+                        run_queries(conn, inicio, args.meses, args.repeticoes))
+
+            delete, detach = drop_oldest_month(conn, inicio)
+            print(f"\nRemover o mês mais antigo: DELETE {delete * 1000:.0f} ms, DETACH + DROP {detach * 1000:.0f} ms")
+        finally:
+            if not args.manter:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                conn.commit()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: custo de planejamento do caminho de venda com e sem comandos preparados.
+
+Executa o trio de register_sale (SELECT ... FOR UPDATE, INSERT em vendas e UPDATE
+do estoque) N vezes sobre o banco configurado no .env, desfazendo cada transação
+para não alterar os dados. Mede o tempo de parede por venda e, via EXPLAIN (SUMMARY),
+o tempo de planejamento gasto pelo servidor em cada modo.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.prepared_statements --vendas 2000 --produto 46 --cliente 1
+"""
+import re
+import time
+import argparse
+
+from app.models.database import get_pool, prepared_statements
+from app.models.venda_model import VENDA_LOCK_PRODUTO, VENDA_INSERT, VENDA_BAIXA_ESTOQUE
+
+PLAIN_SALE = (
+    ("SELECT preco, estoque FROM produtos WHERE id = %s FOR UPDATE", lambda p, c: (p,)),
+    ("INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda) "
+     "VALUES (%s, %s, %s, %s, COALESCE(%s, NOW())) RETURNING id", lambda p, c: (p, c, 1, 10.0, None)),
+    ("UPDATE produtos SET estoque = estoque - %s WHERE id = %s", lambda p, c: (1, p)),
+)
+PREPARED_SALE = (
+    (VENDA_LOCK_PRODUTO, lambda p, c: (p,)),
+    (VENDA_INSERT, lambda p, c: (p, c, 1, 10.0, None)),
+    (VENDA_BAIXA_ESTOQUE, lambda p, c: (1, p)),
+)
+
+_PLANNING_RE = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def _planning_ms(cur, sql, params):
+    cur.execute("EXPLAIN (SUMMARY) " + sql, params)
+    for (line,) in cur.fetchall():
+        match = _PLANNING_RE.search(line)
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+def run_plain(conn, n, produto_id, cliente_id):
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        for _ in range(n):
+            for sql, params in PLAIN_SALE:
+                cur.execute(sql, params(produto_id, cliente_id))
+            conn.rollback()
+        elapsed = time.perf_counter() - start
+        planning = sum(_planning_ms(cur, sql, params(produto_id, cliente_id)) for sql, params in PLAIN_SALE)
+        conn.rollback()
+    return elapsed, planning
+
+
+def run_prepared(conn, n, produto_id, cliente_id):
+    with conn.cursor() as cur:
+        start = time.perf_counter()
+        for _ in range(n):
+            for name, params in PREPARED_SALE:
+                prepared_statements.execute(cur, name, params(produto_id, cliente_id))
+            conn.rollback()
+        elapsed = time.perf_counter() - start
+        planning = 0.0
+        for name, params in PREPARED_SALE:
+            values = params(produto_id, cliente_id)
+            planning += _planning_ms(cur, f"EXECUTE {name} ({', '.join(['%s'] * len(values))})", values)
+        conn.rollback()
+    return elapsed, planning
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendas", type=int, default=2000, help="vendas simuladas por modo")
+    parser.add_argument("--produto", type=int, default=46, help="ID do produto usado nas vendas")
+    parser.add_argument("--cliente", type=int, default=1, help="ID do cliente usado nas vendas")
+    args = parser.parse_args()
+
+    with get_pool().connection() as conn:
+        # Aquecimento: conexão, catálogo e cache do plano genérico
+        run_plain(conn, 20, args.produto, args.cliente)
+        run_prepared(conn, 20, args.produto, args.cliente)
+
+        plain_s, plain_plan = run_plain(conn, args.vendas, args.produto, args.cliente)
+        prep_s, prep_plan = run_prepared(conn, args.vendas, args.produto, args.cliente)
+
+    print(f"{'modo':<12}{'vendas/s':>12}{'µs/venda':>12}{'planejamento/venda':>22}")
+    print(f"{'SQL comum':<12}{args.vendas / plain_s:>12.0f}{plain_s / args.vendas * 1e6:>12.1f}{plain_plan:>19.3f} ms")
+    print(f"{'PREPARE':<12}{args.vendas / prep_s:>12.0f}{prep_s / args.vendas * 1e6:>12.1f}{prep_plan:>19.3f} ms")
+    print(f"\nPlanejamento poupado por venda: {plain_plan - prep_plan:.3f} ms; "
+          f"tempo de parede poupado: {(plain_s - prep_s) / args.vendas * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
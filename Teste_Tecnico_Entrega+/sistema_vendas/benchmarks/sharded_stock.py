@@ -0,0 +1,52 @@
+"""
+Benchmark de disputa: N threads vendem o mesmo produto, uma vez com o estoque em uma
+única linha (produtos.estoque) e outra com o estoque fatiado em --shards linhas
+(ProdutoModel.enable_stock_sharding). Reporta vendas/s e latência p50/p95/p99 de
+register_sale e register_sale_atomic em cada caso.
+
+Cria produtos temporários e apaga eles e suas vendas ao final.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.sharded_stock --threads 32 --shards 16 --segundos 10
+"""
+import argparse
+
+from app.models.produto_model import ProdutoModel
+from app.models.venda_model import VendaModel
+from benchmarks.common import temporary_product, any_cliente_id, measure_throughput, percentile, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=10.0, help="duração de cada medição")
+    args = parser.parse_args()
+
+    model = VendaModel()
+    cliente_id = any_cliente_id()
+    rows = []
+    for shards in (0, args.shards):
+        with temporary_product(estoque=10 ** 9) as produto_id:
+            if shards:
+                ProdutoModel().enable_stock_sharding(produto_id, shards)
+            for name, sale in (("register_sale", model.register_sale),
+                               ("register_sale_atomic", model.register_sale_atomic)):
+                latencies, failures, elapsed = measure_throughput(sale, produto_id, cliente_id,
+                                                                  args.threads, args.segundos)
+                rows.append([
+                    f"{shards} fatias" if shards else "sem fatias",
+                    name,
+                    f"{len(latencies) / elapsed:.0f}",
+                    f"{percentile(latencies, 50) * 1e3:.2f}",
+                    f"{percentile(latencies, 95) * 1e3:.2f}",
+                    f"{percentile(latencies, 99) * 1e3:.2f}",
+                    failures,
+                ])
+
+    print(f"{args.threads} threads vendendo o mesmo produto:")
+    print_table(["estoque", "implementação", "vendas/s", "p50 ms", "p95 ms", "p99 ms", "falhas"], rows)
+
+
+if __name__ == "__main__":
+    main()
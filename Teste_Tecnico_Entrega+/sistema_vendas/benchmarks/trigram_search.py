@@ -0,0 +1,149 @@
+"""
+Benchmark: busca por trecho de categoria/nome (ILIKE '%termo%') com e sem índice de trigramas.
+
+Cria no schema bench_trgm uma cópia sintética de produtos com `--produtos` linhas e mede
+a mediana das consultas usadas por ProdutoModel.get_by_category e ProdutoModel.search:
+primeiro sem índice (varredura sequencial), depois com os índices GIN gin_trgm_ops em
+categoria e nome, como os do schema.sql. Requer a extensão pg_trgm no servidor.
+O schema é apagado ao final, a não ser com --manter.
+
+Uso (a partir de sistema_vendas/):
+    python -m benchmarks.trigram_search                 # 1 milhão de produtos
+    python -m benchmarks.trigram_search --produtos 200000 --repeticoes 3
+"""
+import sys
+import time
+import argparse
+
+from app.models.database import get_pool
+from benchmarks.common import print_table
+
+SCHEMA = "bench_trgm"
+CATEGORIAS = ("Eletrônicos", "Informática", "Livros", "Vestuário", "Calçados", "Papelaria",
+              "Móveis", "Eletrodomésticos", "Brinquedos", "Esporte e Lazer", "Beleza", "Ferramentas")
+NOMES = ("Notebook", "Mouse", "Teclado", "Monitor", "Cadeira", "Mesa", "Camisa", "Tênis",
+         "Livro", "Caderno", "Fone", "Geladeira", "Bola", "Perfume", "Furadeira", "Caneta")
+ADJETIVOS = ("Gamer", "Básico", "Premium", "Slim", "Pro", "Infantil", "Sem Fio", "Ergonômico",
+             "Compacto", "Duplex", "Esportivo", "Clássico")
+
+# Nome = substantivo + adjetivo + modelo numérico; categoria sorteada com subcategoria
+GERA_PRODUTOS = """
+    INSERT INTO {schema}.produtos (id, nome, categoria)
+    SELECT i,
+           (%(nomes)s::TEXT[])[1 + i %% cardinality(%(nomes)s::TEXT[])] || ' ' ||
+           (%(adjetivos)s::TEXT[])[1 + (i / 7) %% cardinality(%(adjetivos)s::TEXT[])] || ' ' ||
+           'X' || (i * 7919) %% 100000,
+           (%(categorias)s::TEXT[])[1 + (i / 3) %% cardinality(%(categorias)s::TEXT[])] ||
+           ' - Linha ' || (i %% 50)
+    FROM generate_series(1, %(total)s) AS i
+"""
+CONSULTAS = (
+    ("categoria comum", "SELECT id FROM {schema}.produtos WHERE categoria ILIKE %s ORDER BY id", "%letrodom%"),
+    ("categoria rara", "SELECT id FROM {schema}.produtos WHERE categoria ILIKE %s ORDER BY id", "%lazer - linha 42%"),
+    ("search('gamer')", "SELECT id FROM {schema}.produtos WHERE nome ILIKE %s "
+                        "ORDER BY nome ILIKE %s DESC, length(nome), id LIMIT 50", "%gamer%"),
+    ("search('x4242')", "SELECT id FROM {schema}.produtos WHERE nome ILIKE %s "
+                        "ORDER BY nome ILIKE %s DESC, length(nome), id LIMIT 50", "%x4242%"),
+)
+
+
+def trgm_available(cur):
+    cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return cur.fetchone() is not None
+
+
+def load(conn, total):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"CREATE TABLE {SCHEMA}.produtos (id INT PRIMARY KEY, nome TEXT NOT NULL, categoria TEXT NOT NULL)")
+        cur.execute(GERA_PRODUTOS.format(schema=SCHEMA), {
+            "nomes": list(NOMES), "adjetivos": list(ADJETIVOS), "categorias": list(CATEGORIAS), "total": total,
+        })
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM ANALYZE {SCHEMA}.produtos")
+    finally:
+        conn.autocommit = False
+
+
+def create_indexes(conn):
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cur.execute(f"CREATE INDEX ON {SCHEMA}.produtos USING gin (categoria gin_trgm_ops)")
+        cur.execute(f"CREATE INDEX ON {SCHEMA}.produtos USING gin (nome gin_trgm_ops)")
+        cur.execute(f"ANALYZE {SCHEMA}.produtos")
+        cur.execute(f"SELECT pg_indexes_size('{SCHEMA}.produtos'::regclass) - "
+                    f"pg_relation_size('{SCHEMA}.produtos_pkey'::regclass)")
+        tamanho = cur.fetchone()[0]
+    conn.commit()
+    return time.perf_counter() - start, tamanho
+
+
+def measure(conn, repeticoes):
+    """Mediana (ms), linhas devolvidas e o nó de acesso do plano de cada consulta."""
+    resultados = []
+    with conn.cursor() as cur:
+        for _, sql, termo in CONSULTAS:
+            consulta = sql.format(schema=SCHEMA)
+            params = (termo, termo[1:]) if consulta.count("%s") == 2 else (termo,)
+            tempos = []
+            for _ in range(repeticoes + 1):
+                start = time.perf_counter()
+                cur.execute(consulta, params)
+                linhas = len(cur.fetchall())
+                tempos.append(time.perf_counter() - start)
+            tempos = sorted(tempos[1:])  # a primeira execução só aquece o cache
+            cur.execute("EXPLAIN " + consulta, params)
+            plano = next((l.strip().lstrip("-> ").split("  ")[0] for (l,) in cur.fetchall()
+                          if " Scan" in l), "?")
+            resultados.append((tempos[len(tempos) // 2] * 1000, linhas, plano))
+        conn.rollback()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--produtos", type=int, default=1000000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--manter", action="store_true", help="não apaga o schema bench_trgm ao final")
+    args = parser.parse_args()
+
+    pool = get_pool()
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            disponivel = trgm_available(cur)
+        conn.rollback()
+        if not disponivel:
+            print("A extensão pg_trgm não está instalada no servidor (pacote postgresql-contrib).")
+            pool.close()
+            return 1
+        try:
+            print(f"Gerando {args.produtos} produtos...")
+            load(conn, args.produtos)
+            sem_indice = measure(conn, args.repeticoes)
+            duracao, tamanho = create_indexes(conn)
+            print(f"Índices de trigramas criados em {duracao:.1f} s ({tamanho / 1024 / 1024:.0f} MB)\n")
+            com_indice = measure(conn, args.repeticoes)
+
+            rows = []
+            for (nome, _, _), antes, depois in zip(CONSULTAS, sem_indice, com_indice):
+                rows.append((nome, antes[1], f"{antes[0]:.1f}", f"{depois[0]:.1f}",
+                             f"{antes[0] / depois[0]:.1f}x", depois[2]))
+            print(f"Mediana de {args.repeticoes} execuções (ms):")
+            print_table(("consulta", "linhas", "sem índice", "com trigramas", "ganho", "plano com índice"), rows)
+        finally:
+            if not args.manter:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                conn.commit()
+    pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
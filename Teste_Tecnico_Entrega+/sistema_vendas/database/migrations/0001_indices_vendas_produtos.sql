@@ -0,0 +1,16 @@
+-- Índices das colunas usadas nos JOINs de VendaModel/RelatorioModel e na busca por período.
+-- CONCURRENTLY: criados sem bloquear vendas em andamento. Em vendas (particionada) o
+-- migrar.py cria o índice partição por partição e anexa ao índice da tabela.
+
+-- JOIN vendas -> produtos (listagens, top vendidos, vendas por categoria, nunca vendidos)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vendas_produto ON vendas (produto_id);
+
+-- JOIN vendas -> clientes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vendas_cliente ON vendas (cliente_id);
+
+-- Filtro por período: as vendas chegam em ordem de data, então um BRIN (um resumo por
+-- bloco de páginas) descarta quase toda a partição ocupando alguns KB
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vendas_data_brin ON vendas USING brin (data_venda);
+
+-- JOIN produtos -> fornecedores
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_produtos_fornecedor ON produtos (fornecedor_id);
@@ -0,0 +1,30 @@
+-- Notificações do catálogo de produtos em memória (app/models/catalogo_cache.py).
+-- Cada mudança em produtos, nas fatias de estoque ou no nome de um fornecedor avisa os
+-- processos que escutam o canal; o aviso sai no COMMIT (nada é enviado se a transação
+-- for desfeita) e avisos repetidos na mesma transação chegam uma vez só.
+
+-- Argumentos do gatilho: canal e coluna com o id a enviar
+CREATE OR REPLACE FUNCTION notifica_catalogo() RETURNS TRIGGER AS $$
+DECLARE
+    linha JSONB := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+BEGIN
+    PERFORM pg_notify(TG_ARGV[0], linha ->> TG_ARGV[1]);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS produtos_notifica_catalogo ON produtos;
+CREATE TRIGGER produtos_notifica_catalogo
+    AFTER INSERT OR UPDATE OR DELETE ON produtos
+    FOR EACH ROW EXECUTE FUNCTION notifica_catalogo('catalogo_produtos', 'id');
+
+-- O estoque de produtos fatiados muda nas fatias, não na linha do produto
+DROP TRIGGER IF EXISTS estoque_shards_notifica_catalogo ON estoque_shards;
+CREATE TRIGGER estoque_shards_notifica_catalogo
+    AFTER INSERT OR UPDATE OR DELETE ON estoque_shards
+    FOR EACH ROW EXECUTE FUNCTION notifica_catalogo('catalogo_produtos', 'produto_id');
+
+DROP TRIGGER IF EXISTS fornecedores_notifica_catalogo ON fornecedores;
+CREATE TRIGGER fornecedores_notifica_catalogo
+    AFTER UPDATE OF nome_empresa ON fornecedores
+    FOR EACH ROW EXECUTE FUNCTION notifica_catalogo('catalogo_fornecedores', 'id');
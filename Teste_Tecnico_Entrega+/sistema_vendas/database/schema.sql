@@ -1,8 +1,25 @@
 -- Remove tabelas existentes para garantir um ambiente limpo (ideal para teste, nesse caso o teste técnico)
+DROP TABLE IF EXISTS schema_migracoes;
+DROP VIEW IF EXISTS itens_pedido;
+DROP VIEW IF EXISTS produtos_estoque;
+DROP TABLE IF EXISTS estoque_shards;
+DROP TABLE IF EXISTS vendas_idempotencia;
+DROP TABLE IF EXISTS reservas;
 DROP TABLE IF EXISTS vendas;
+DROP FUNCTION IF EXISTS criar_particoes_vendas(DATE, DATE);
+DROP TABLE IF EXISTS pedidos;
 DROP TABLE IF EXISTS produtos;
 DROP TABLE IF EXISTS clientes;
 DROP TABLE IF EXISTS fornecedores;
+DROP FUNCTION IF EXISTS sem_acento(TEXT);
+DROP FUNCTION IF EXISTS notifica_catalogo();
+
+-- Remove acentos (em minúsculas) para a busca por palavras não depender deles.
+-- IMMUTABLE para poder ser usada na coluna gerada produtos.busca.
+CREATE FUNCTION sem_acento(texto TEXT) RETURNS TEXT AS $$
+    SELECT lower(translate(texto, 'áàâãäéèêëíìîïóòôõöúùûüçÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇ',
+                                  'aaaaaeeeeiiiiooooouuuucAAAAAEEEEIIIIOOOOOUUUUC'))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
 
 -- Tabela de Fornecedores
 CREATE TABLE fornecedores (
@@ -29,17 +46,156 @@ CREATE TABLE produtos (
     estoque INT DEFAULT 0,
     fornecedor_id INT, 
     created_at TIMESTAMP DEFAULT NOW(),
+    num_shards INT NOT NULL DEFAULT 0,
+    -- Texto para busca por palavras (ProdutoModel.search_text), mantido pelo próprio banco
+    -- a cada INSERT/UPDATE, sem acentos; o nome pesa mais que a categoria no ranking
+    busca TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', sem_acento(COALESCE(nome, ''))), 'A') ||
+        setweight(to_tsvector('portuguese', sem_acento(COALESCE(categoria, ''))), 'B')
+    ) STORED,
     FOREIGN KEY (fornecedor_id) REFERENCES fornecedores(id) 
 );
 
--- Tabela de vendas
-CREATE TABLE vendas (
+CREATE INDEX idx_produtos_busca ON produtos USING gin (busca);
+
+-- Estoque fatiado de produtos muito vendidos (num_shards > 0): o estoque fica dividido em
+-- várias linhas e cada venda baixa uma delas, sem disputar o bloqueio da linha do produto.
+-- Estoque total = produtos.estoque + soma das fatias.
+CREATE TABLE estoque_shards (
+    produto_id INT NOT NULL,
+    shard INT NOT NULL,
+    estoque INT NOT NULL DEFAULT 0 CHECK (estoque >= 0),
+    PRIMARY KEY (produto_id, shard),
+    FOREIGN KEY (produto_id) REFERENCES produtos(id) ON DELETE CASCADE
+);
+
+-- Produtos com o estoque total (somando as fatias); usada nas leituras de produtos e relatórios.
+-- É o estoque disponível: o que está em reservas ativas já foi descontado ao reservar.
+CREATE VIEW produtos_estoque AS
+SELECT
+    p.id,
+    p.nome,
+    p.preco,
+    p.categoria,
+    CASE
+        WHEN p.num_shards > 0 THEN p.estoque + COALESCE(
+            (SELECT SUM(s.estoque) FROM estoque_shards s WHERE s.produto_id = p.id), 0)::INT
+        ELSE p.estoque
+    END AS estoque,
+    p.fornecedor_id,
+    p.created_at,
+    p.num_shards
+FROM produtos p;
+
+-- Busca por trecho do nome/categoria (ILIKE '%termo%'): índices de trigramas (pg_trgm)
+-- atendem o curinga inicial sem varrer a tabela. Se a extensão não estiver instalada
+-- no servidor (feature_not_supported no PG 15+, undefined_file até o 14, sem o pacote
+-- contrib), as buscas continuam funcionando, só que sem índice.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX idx_produtos_categoria_trgm ON produtos USING gin (categoria gin_trgm_ops);
+    CREATE INDEX idx_produtos_nome_trgm ON produtos USING gin (nome gin_trgm_ops);
+EXCEPTION WHEN feature_not_supported OR insufficient_privilege OR undefined_file THEN
+    RAISE NOTICE 'pg_trgm indisponível (%): buscas por trecho de nome/categoria sem índice', SQLERRM;
+END
+$$;
+
+-- Tabela de pedidos (cabeçalho de uma compra com vários itens)
+CREATE TABLE pedidos (
     id SERIAL PRIMARY KEY,
+    cliente_id INT NOT NULL,
+    data_pedido TIMESTAMP DEFAULT NOW(),
+    valor_total DECIMAL(12,2) NOT NULL,
+    FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+);
+
+-- Tabela de vendas, particionada por mês de data_venda. Consultas por período só leem
+-- as partições do intervalo; meses antigos saem com DETACH PARTITION, sem DELETE.
+-- A chave primária de uma tabela particionada precisa incluir a coluna de partição.
+CREATE TABLE vendas (
+    id SERIAL,
     produto_id INT,
     cliente_id INT, 
     quantidade INT NOT NULL,
-    data_venda TIMESTAMP DEFAULT NOW(),
+    data_venda TIMESTAMP NOT NULL DEFAULT NOW(),
     valor_total DECIMAL(10,2) NOT NULL,
+    pedido_id INT,
+    PRIMARY KEY (id, data_venda),
+    FOREIGN KEY (produto_id) REFERENCES produtos(id),
+    FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+    FOREIGN KEY (pedido_id) REFERENCES pedidos(id)
+) PARTITION BY RANGE (data_venda);
+
+-- Cria (se ainda não existem) as partições mensais vendas_AAAA_MM dos meses entre
+-- `inicio` e `fim` (exclusivo). Retorna quantas partições foram criadas.
+CREATE FUNCTION criar_particoes_vendas(inicio DATE, fim DATE) RETURNS INT AS $$
+DECLARE
+    mes DATE := date_trunc('month', inicio)::DATE;
+    nome TEXT;
+    criadas INT := 0;
+BEGIN
+    WHILE mes < fim LOOP
+        nome := 'vendas_' || to_char(mes, 'YYYY_MM');
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF vendas FOR VALUES FROM (%L) TO (%L)',
+                           nome, mes, (mes + INTERVAL '1 month')::DATE);
+            criadas := criadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partições dos últimos 12 meses e dos 3 próximos; as seguintes são criadas com
+-- particoes_vendas.py criar (ou pela importação, para datas antigas)
+SELECT criar_particoes_vendas((date_trunc('month', NOW()) - INTERVAL '12 months')::DATE,
+                              (date_trunc('month', NOW()) + INTERVAL '4 months')::DATE);
+
+-- Recebe vendas fora das partições mensais, para uma data inesperada não barrar a venda
+CREATE TABLE vendas_default PARTITION OF vendas DEFAULT;
+
+CREATE INDEX idx_vendas_pedido ON vendas (pedido_id) WHERE pedido_id IS NOT NULL;
+-- Listagem paginada de vendas (VendaModel.get_page), da mais recente para a mais antiga
+CREATE INDEX idx_vendas_data_id ON vendas (data_venda, id);
+
+-- Itens de pedido: cada item é gravado como uma venda ligada ao pedido, de modo que
+-- os relatórios de vendas continuam enxergando tudo o que saiu do estoque
+CREATE VIEW itens_pedido AS
+SELECT
+    v.pedido_id,
+    v.id AS venda_id,
+    v.produto_id,
+    v.quantidade,
+    (v.valor_total / v.quantidade)::DECIMAL(10,2) AS preco_unitario,
+    v.valor_total
+FROM vendas v
+WHERE v.pedido_id IS NOT NULL;
+
+-- Chaves de idempotência de register_sale: uma requisição repetida com a mesma chave
+-- devolve a venda original. Sem FK para vendas, para não depender da chave primária dela.
+CREATE TABLE vendas_idempotencia (
+    chave VARCHAR(100) PRIMARY KEY,
+    venda_id INT,
+    criado_em TIMESTAMP DEFAULT NOW()
+);
+
+-- Reservas de estoque (checkout): o estoque sai de produtos/estoque_shards ao reservar e
+-- volta ao liberar ou expirar; ao confirmar a reserva vira uma venda
+CREATE TABLE reservas (
+    id SERIAL PRIMARY KEY,
+    produto_id INT NOT NULL,
+    cliente_id INT,
+    quantidade INT NOT NULL CHECK (quantidade > 0),
+    status VARCHAR(20) NOT NULL DEFAULT 'ativa'
+        CHECK (status IN ('ativa', 'confirmada', 'liberada', 'expirada')),
+    criado_em TIMESTAMP DEFAULT NOW(),
+    expira_em TIMESTAMP NOT NULL,
+    venda_id INT,
     FOREIGN KEY (produto_id) REFERENCES produtos(id),
-    FOREIGN KEY (cliente_id) REFERENCES clientes(id) 
-);
\ No newline at end of file
+    FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+);
+
+-- Só as reservas ativas interessam à varredura de expiração
+CREATE INDEX idx_reservas_ativas_expira ON reservas (expira_em) WHERE status = 'ativa';
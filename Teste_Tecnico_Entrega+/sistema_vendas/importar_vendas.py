@@ -0,0 +1,53 @@
+"""
+Importa vendas históricas de um arquivo CSV ou JSONL para a tabela vendas.
+
+Uso (a partir de sistema_vendas/):
+    python importar_vendas.py vendas_2019.csv
+    python importar_vendas.py vendas.jsonl --sem-baixa-estoque --bloco 50000
+
+Campos: produto_id, cliente_id, quantidade e, opcionais, valor_total e data_venda (ISO).
+"""
+import sys
+import argparse
+
+from app.models.importacao_model import ImportacaoModel
+from app.models.database import close_pool
+
+
+def print_progress(processadas, total, importadas):
+    percentual = 100.0 * processadas / total if total else 100.0
+    print(f"\r{processadas}/{total} linhas processadas ({percentual:.0f}%), {importadas} importadas",
+          end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="padrão: deduzido da extensão")
+    parser.add_argument("--sem-baixa-estoque", action="store_true",
+                        help="não decrementa o estoque (dados históricos)")
+    parser.add_argument("--bloco", type=int, help="linhas por transação (padrão: DB_IMPORT_CHUNK_SIZE)")
+    args = parser.parse_args()
+
+    resumo = ImportacaoModel().import_file(
+        args.arquivo,
+        formato=args.formato,
+        baixar_estoque=not args.sem_baixa_estoque,
+        chunk_size=args.bloco,
+        progress=print_progress,
+    )
+    print()
+    print(f"Linhas lidas: {resumo['lidas']}")
+    print(f"Vendas importadas: {resumo['importadas']}")
+    for motivo, quantidade in resumo["rejeitadas"].items():
+        print(f"Rejeitadas ({motivo}): {quantidade}")
+    for linha, erro in resumo["erros"]:
+        print(f"  linha {linha}: {erro}")
+    return 0 if not resumo["rejeitadas"] else 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        close_pool()
@@ -1,5 +1,16 @@
 from app.controllers.controller import Controller
+from app.models.database import close_pool
+from app.models.catalogo_cache import CATALOG_CACHE, start_catalog_cache, stop_catalog_cache
+from app.models.reserva_model import start_reservation_sweeper, stop_reservation_sweeper
 
 if __name__ == "__main__":
+    if CATALOG_CACHE:
+        start_catalog_cache()
+    start_reservation_sweeper()
     app_controller = Controller()
-    app_controller.run()
\ No newline at end of file
+    try:
+        app_controller.run()
+    finally:
+        stop_reservation_sweeper()
+        stop_catalog_cache()
+        close_pool()
\ No newline at end of file
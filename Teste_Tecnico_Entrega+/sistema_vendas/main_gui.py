@@ -1,8 +1,19 @@
 from app.controllers.gui_controller import GuiController
 from app.views.gui_view import GuiView
+from app.models.database import close_pool
+from app.models.catalogo_cache import CATALOG_CACHE, start_catalog_cache, stop_catalog_cache
+from app.models.reserva_model import start_reservation_sweeper, stop_reservation_sweeper
 
 # Este é o ponto de entrada (entry point) para a aplicação com interface gráfica (GUI).
 if __name__ == "__main__":
+    # 0. Catálogo de produtos em memória (DB_CATALOG_CACHE): as abas e buscas de produtos
+    #    passam a ser lidas da memória, mantida em dia pelos avisos (NOTIFY) do banco.
+    #    Espera um pouco pela carga para a primeira tela já sair da memória.
+    if CATALOG_CACHE:
+        start_catalog_cache(wait=2)
+    # Varredura que devolve ao estoque as reservas vencidas (DB_RESERVA_SWEEP_INTERVAL)
+    start_reservation_sweeper()
+
     # 1. Instancia o Controller: O controller é o cérebro que se comunica com os models
     #    para buscar e manipular dados.
     controller = GuiController()
@@ -14,4 +25,11 @@ if __name__ == "__main__":
     
     # 3. Inicia a aplicação: O método main() da view inicia o loop principal do Tkinter,
     #    que desenha a janela e a mantém aberta, aguardando a interação do usuário.
-    view.main()
\ No newline at end of file
+    try:
+        view.main()
+    finally:
+        # 4. Encerra a varredura de reservas e o catálogo e fecha as conexões do pool
+        #    ao encerrar a janela.
+        stop_reservation_sweeper()
+        stop_catalog_cache()
+        close_pool()
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Aplica as migrações pendentes de database/migrations ao banco configurado no .env.
+
+Uso (a partir de sistema_vendas/):
+    python migrar.py            # aplica as pendentes, em ordem
+    python migrar.py --listar   # mostra as aplicadas e as pendentes
+
+Pode rodar com a aplicação no ar: os índices são criados com CREATE INDEX CONCURRENTLY,
+sem bloquear o registro de vendas.
+"""
+import sys
+import argparse
+
+from app.models.migracao_model import MigracaoModel, MigrationLockedError
+from app.models.database import close_pool, DataAccessError
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listar", action="store_true", help="só mostra a situação das migrações")
+    args = parser.parse_args()
+
+    model = MigracaoModel()
+    try:
+        if args.listar:
+            for versao, descricao, aplicada_em in model.list_migrations():
+                situacao = aplicada_em.strftime("%Y-%m-%d %H:%M") if aplicada_em else "pendente"
+                print(f"{versao}  {situacao:<16}  {descricao}")
+            return 0
+        aplicadas = model.apply_pending(progress=print)
+        print(f"Migrações aplicadas: {', '.join(aplicadas) if aplicadas else 'nenhuma (banco atualizado)'}")
+    except (MigrationLockedError, DataAccessError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        close_pool()
@@ -0,0 +1,63 @@
+"""
+Manutenção das partições mensais da tabela vendas.
+
+Uso (a partir de sistema_vendas/):
+    python particoes_vendas.py listar
+    python particoes_vendas.py criar --meses 6          # rodar mensalmente (ex.: cron)
+    python particoes_vendas.py criar --desde 2019-01    # meses antigos, antes de uma carga
+    python particoes_vendas.py desanexar --antes 2024-01 [--remover]
+
+desanexar tira de vendas as partições anteriores ao mês informado sem apagar linha por
+linha; sem --remover elas ficam como tabelas comuns (vendas_AAAA_MM) para arquivamento.
+"""
+import sys
+import argparse
+from datetime import datetime
+
+from app.models.particao_model import ParticaoModel
+from app.models.database import close_pool, DataAccessError
+
+
+def parse_month(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mês inválido: {valor!r} (use AAAA-MM)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("listar", help="lista as partições, com linhas estimadas e tamanho")
+    criar = comandos.add_parser("criar", help="cria as partições que faltam")
+    criar.add_argument("--meses", type=int, help="meses à frente (padrão: DB_PARTICOES_MESES_FRENTE)")
+    criar.add_argument("--desde", type=parse_month, help="primeiro mês a criar, AAAA-MM (padrão: o atual)")
+    desanexar = comandos.add_parser("desanexar", help="desanexa as partições antigas")
+    desanexar.add_argument("--antes", type=parse_month, required=True, help="desanexa os meses anteriores a AAAA-MM")
+    desanexar.add_argument("--remover", action="store_true", help="apaga as tabelas desanexadas")
+    args = parser.parse_args()
+
+    model = ParticaoModel()
+    try:
+        if args.comando == "listar":
+            for nome, mes, linhas, tamanho in model.list_partitions():
+                periodo = mes.strftime("%Y-%m") if mes else "padrão"
+                print(f"{nome:<20} {periodo:<8} ~{linhas} linhas  {tamanho / 1024 / 1024:.1f} MB")
+        elif args.comando == "criar":
+            criadas = model.ensure_partitions(meses_a_frente=args.meses, desde=args.desde)
+            print(f"Partições criadas: {criadas}")
+        else:
+            desanexadas = model.detach_before(args.antes, remover=args.remover)
+            acao = "removidas" if args.remover else "desanexadas"
+            print(f"Partições {acao}: {', '.join(desanexadas) if desanexadas else 'nenhuma'}")
+    except DataAccessError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        close_pool()
@@ -0,0 +1,152 @@
+"""
+Testes de ConnectionPool sem banco: psycopg2.connect é substituído por conexões falsas.
+
+Uso (a partir de sistema_vendas/):
+    python -m pytest tests
+"""
+import time
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+from app.models.database import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """O mínimo de uma conexão psycopg2 usado pelo pool."""
+    def __init__(self, **params):
+        self.params = params
+        self.closed = 0
+        self.rollbacks = 0
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+
+    def begin(self):
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("psycopg2.connect", side_effect=FakeConnection)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pool(self, **options):
+        pool = ConnectionPool(**options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_abre_minconn_na_criacao(self):
+        pool = self._pool(minconn=2, maxconn=4, host="h")
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["idle"], stats["in_use"]), (2, 2, 0))
+        self.connect.assert_called_with(host="h")
+
+    def test_reusa_conexao_devolvida(self):
+        pool = self._pool(minconn=0, maxconn=2)
+        with pool.connection() as primeira:
+            pass
+        with pool.connection() as segunda:
+            pass
+        self.assertIs(primeira, segunda)
+        stats = pool.stats()
+        self.assertEqual((stats["connections_created"], stats["checkouts"], stats["idle"]), (1, 2, 1))
+
+    def test_espera_devolucao_com_pool_cheio(self):
+        pool = self._pool(minconn=0, maxconn=1, timeout=5)
+        emprestada = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=(emprestada,)).start()
+        inicio = time.monotonic()
+        conn = pool.getconn()
+        self.assertIs(conn, emprestada)
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.04)
+        self.assertGreater(pool.stats()["wait_time_max"], 0)
+        pool.putconn(conn)
+
+    def test_tempo_limite_de_emprestimo(self):
+        pool = self._pool(minconn=0, maxconn=1, timeout=0.1)
+        conn = pool.getconn()
+        inicio = time.monotonic()
+        with self.assertRaises(PoolTimeoutError):
+            pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.09)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        pool.putconn(conn)
+
+    def test_detecta_vazamento_uma_vez(self):
+        pool = self._pool(minconn=0, maxconn=2, leak_timeout=0.05)
+        conn = pool.getconn()
+        time.sleep(0.1)
+        with self.assertLogs("app.models.database", level="WARNING") as logs:
+            vazamentos = pool.check_leaks()
+        self.assertEqual(len(vazamentos), 1)
+        self.assertEqual(vazamentos[0]["thread"], threading.current_thread().name)
+        self.assertIn("Possível vazamento", logs.output[0])
+        pool.check_leaks()
+        pool.putconn(conn)
+        self.assertEqual(pool.stats()["leaks_detected"], 1)
+
+    def test_devolucao_tardia_conta_como_vazamento(self):
+        pool = self._pool(minconn=0, maxconn=2, leak_timeout=0.05)
+        conn = pool.getconn()
+        time.sleep(0.1)
+        with self.assertLogs("app.models.database", level="WARNING"):
+            pool.putconn(conn)
+        self.assertEqual(pool.stats()["leaks_detected"], 1)
+
+    def test_desfaz_transacao_deixada_aberta(self):
+        pool = self._pool(minconn=0, maxconn=1)
+        conn = pool.getconn()
+        conn.begin()
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertIs(pool.getconn(), conn)
+
+    def test_excecao_no_bloco_desfaz_e_devolve(self):
+        pool = self._pool(minconn=0, maxconn=1)
+        with self.assertRaises(ZeroDivisionError):
+            with pool.connection() as conn:
+                conn.begin()
+                1 / 0
+        self.assertGreaterEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_descarta_conexao_fechada(self):
+        pool = self._pool(minconn=0, maxconn=1)
+        conn = pool.getconn()
+        conn.close()
+        pool.putconn(conn)
+        nova = pool.getconn()
+        self.assertIsNot(nova, conn)
+        stats = pool.stats()
+        self.assertEqual((stats["connections_discarded"], stats["connections_created"]), (1, 2))
+        pool.putconn(nova)
+
+    def test_falha_ao_abrir_libera_a_vaga(self):
+        pool = self._pool(minconn=0, maxconn=1)
+        self.connect.side_effect = psycopg2.OperationalError("fora do ar")
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn()
+        self.connect.side_effect = FakeConnection
+        pool.putconn(pool.getconn())
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_close_recusa_novos_emprestimos(self):
+        pool = self._pool(minconn=1, maxconn=1)
+        pool.close()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Testes de GroupCommitWriter (fila de escrita com commit em grupo), sem banco: a função
+de gravação é um stub que registra os lotes recebidos.
+
+Uso (a partir de sistema_vendas/):
+    python -m pytest tests
+"""
+import time
+import threading
+import unittest
+
+from app.models.group_commit import GroupCommitWriter
+
+
+class FlushStub:
+    """Grava lotes em memória: devolve item * 10 para cada item e guarda os lotes recebidos."""
+    def __init__(self, delay=0.0, falha=None):
+        self.delay = delay
+        self.falha = falha  # item que faz o lote inteiro falhar
+        self.lotes = []
+        self.liberado = threading.Event()
+        self.liberado.set()
+
+    def __call__(self, itens):
+        self.liberado.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        self.lotes.append(list(itens))
+        if self.falha is not None and self.falha in itens:
+            raise ValueError(f"lote com {self.falha}")
+        return [item * 10 for item in itens]
+
+
+class GroupCommitWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.writers = []
+
+    def tearDown(self):
+        for writer in self.writers:
+            writer.close(timeout=5)
+
+    def _writer(self, flush, **options):
+        writer = GroupCommitWriter(flush, **options)
+        self.writers.append(writer)
+        return writer
+
+    def test_lote_fecha_ao_atingir_max_batch(self):
+        flush = FlushStub()
+        flush.liberado.clear()
+        writer = self._writer(flush, max_batch=3, max_wait_ms=10000)
+        # Com a gravação travada no primeiro lote, os demais itens se acumulam na fila
+        futures = [writer.submit(i) for i in range(7)]
+        inicio = time.monotonic()
+        flush.liberado.set()
+        for future in futures[:6]:
+            future.result(timeout=5)
+        # Lotes cheios são gravados sem esperar max_wait_ms; o item 6 fica esperando mais itens
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(flush.lotes, [[0, 1, 2], [3, 4, 5]])
+        self.assertFalse(futures[6].done())
+
+    def test_lote_fecha_ao_vencer_max_wait(self):
+        flush = FlushStub()
+        writer = self._writer(flush, max_batch=100, max_wait_ms=50)
+        inicio = time.monotonic()
+        primeiros = [writer.submit(1), writer.submit(2)]
+        self.assertEqual([f.result(timeout=5) for f in primeiros], [10, 20])
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.04)
+        self.assertEqual(writer.submit(3).result(timeout=5), 30)
+        self.assertEqual(flush.lotes, [[1, 2], [3]])
+        stats = writer.stats()
+        self.assertEqual((stats["batches"], stats["items"], stats["avg_batch"]), (2, 3, 1.5))
+
+    def test_cada_chamador_recebe_o_seu_resultado(self):
+        flush = FlushStub()
+        writer = self._writer(flush, max_batch=8, max_wait_ms=5)
+        resultados = {}
+
+        def chamador(i):
+            resultados[i] = writer.submit(i).result(timeout=5)
+
+        threads = [threading.Thread(target=chamador, args=(i,)) for i in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(resultados, {i: i * 10 for i in range(50)})
+        self.assertEqual(sorted(item for lote in flush.lotes for item in lote), list(range(50)))
+
+    def test_falha_vai_para_todos_do_lote_e_so_para_eles(self):
+        flush = FlushStub(falha=2)
+        flush.liberado.clear()
+        writer = self._writer(flush, max_batch=2, max_wait_ms=10000)
+        futures = [writer.submit(i) for i in range(4)]
+        flush.liberado.set()
+        with self.assertLogs("app.models.group_commit", level="ERROR"):
+            for future in futures:
+                future.exception(timeout=5)
+        lote_com_falha = next(lote for lote in flush.lotes if 2 in lote)
+        for i, future in enumerate(futures):
+            if i in lote_com_falha:
+                self.assertIsInstance(future.exception(), ValueError)
+            else:
+                self.assertEqual(future.result(), i * 10)
+
+    def test_close_grava_o_que_ja_estava_na_fila(self):
+        flush = FlushStub(delay=0.02)
+        writer = self._writer(flush, max_batch=2, max_wait_ms=1)
+        futures = [writer.submit(i) for i in range(10)]
+        writer.close(timeout=5)
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual([future.result() for future in futures], [i * 10 for i in range(10)])
+        with self.assertRaises(RuntimeError):
+            writer.submit(99)
+
+    def test_submit_concorrente_com_close(self):
+        # Nenhum item aceito por submit pode ficar sem resposta depois do close
+        for _ in range(20):
+            flush = FlushStub()
+            writer = self._writer(flush, max_batch=4, max_wait_ms=1)
+            aceitos = []
+
+            def produtor():
+                for i in range(200):
+                    try:
+                        aceitos.append(writer.submit(i))
+                    except RuntimeError:
+                        return
+
+            threads = [threading.Thread(target=produtor) for _ in range(4)]
+            for t in threads:
+                t.start()
+            writer.close(timeout=5)
+            for t in threads:
+                t.join(5)
+            self.assertTrue(all(future.done() for future in aceitos))
+
+
+if __name__ == "__main__":
+    unittest.main()
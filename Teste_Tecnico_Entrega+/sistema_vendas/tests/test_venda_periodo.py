@@ -0,0 +1,153 @@
+"""
+Regressão dos limites de período de get_by_period: um `fim` só com a data inclui o dia
+inteiro (intervalo semiaberto [inicio, fim + 1 dia)); com hora, inclui o próprio instante.
+Vale também na virada do mês (duas partições mensais) e na partição padrão (vendas_default).
+
+Os testes com banco usam o .env e são pulados se o banco não responde.
+
+Uso (a partir de sistema_vendas/):
+    python -m pytest tests
+"""
+import asyncio
+import unittest
+from datetime import date, datetime, timedelta
+
+from app.models.database import get_connection
+from app.models.venda_model import VendaModel, _normalize_period
+
+try:
+    from app.models.aio.venda_model import AsyncVendaModel, _period_bounds
+    from app.models.aio.database import close_async_pool
+except ImportError:  # asyncpg não instalado
+    _period_bounds = None
+
+
+class NormalizePeriodTest(unittest.TestCase):
+    CASOS = (
+        # (inicio, fim, intervalo esperado)
+        ("2024-01-01", "2024-01-31",
+         (datetime(2024, 1, 1), datetime(2024, 2, 1))),
+        # Virada de mês e de ano: o fim exclusivo é o primeiro dia do mês seguinte
+        ("2024-01-01", "2024-12-31",
+         (datetime(2024, 1, 1), datetime(2025, 1, 1))),
+        ("2024-02-01", "2024-02-29",
+         (datetime(2024, 2, 1), datetime(2024, 3, 1))),
+        (date(2024, 3, 1), date(2024, 3, 31),
+         (datetime(2024, 3, 1), datetime(2024, 4, 1))),
+        # Com hora: inclui o instante informado e nada depois dele
+        ("2024-01-01", "2024-01-31 23:59:59",
+         (datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59, 1))),
+        ("2024-01-01T00:00:00", datetime(2024, 1, 31, 12, 0),
+         (datetime(2024, 1, 1), datetime(2024, 1, 31, 12, 0, 0, 1))),
+    )
+
+    def test_fim_so_com_data_inclui_o_dia_inteiro(self):
+        for inicio, fim, esperado in self.CASOS:
+            with self.subTest(inicio=inicio, fim=fim):
+                self.assertEqual(_normalize_period(inicio, fim), esperado)
+
+    @unittest.skipIf(_period_bounds is None, "asyncpg não instalado")
+    def test_versao_assincrona_usa_os_mesmos_limites(self):
+        for inicio, fim, esperado in self.CASOS:
+            with self.subTest(inicio=inicio, fim=fim):
+                self.assertEqual(_period_bounds(inicio, fim), esperado)
+
+
+class GetByPeriodBoundariesTest(unittest.TestCase):
+    """
+    Grava vendas de um produto temporário nos dois lados de cada limite e confere quais
+    get_by_period devolve. Apaga as vendas e o produto ao final.
+    """
+    @classmethod
+    def setUpClass(cls):
+        try:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT MIN(id), to_regclass('vendas_default') IS NOT NULL FROM clientes")
+                    cls.cliente_id, tem_default = cur.fetchone()
+        except Exception as e:
+            raise unittest.SkipTest(f"banco indisponível ({e})")
+        if cls.cliente_id is None or not tem_default:
+            raise unittest.SkipTest("banco sem clientes ou sem a partição vendas_default")
+
+        # Virada de mês dentro das partições criadas pelo schema (último dia do mês passado)
+        cls.fim_do_mes = date.today().replace(day=1) - timedelta(days=1)
+        # Anterior a todas as partições mensais: cai em vendas_default
+        cls.dia_antigo = date(2000, 1, 31)
+
+        cls.vendas = {}  # (dia, "inicio" | "ultimo" | "seguinte") -> (id, partição)
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO produtos (nome, preco, categoria, estoque) "
+                    "VALUES ('Produto Teste Período', 10, 'Teste', 0) RETURNING id"
+                )
+                cls.produto_id = cur.fetchone()[0]
+                for dia in (cls.fim_do_mes, cls.dia_antigo):
+                    for nome, instante in (
+                        ("inicio", datetime.combine(dia, datetime.min.time())),
+                        ("ultimo", datetime.combine(dia, datetime.max.time())),
+                        ("seguinte", datetime.combine(dia + timedelta(days=1), datetime.min.time())),
+                    ):
+                        cur.execute(
+                            "INSERT INTO vendas (produto_id, cliente_id, quantidade, valor_total, data_venda) "
+                            "VALUES (%s, %s, 1, 10, %s) RETURNING id, tableoid::regclass::text",
+                            (cls.produto_id, cls.cliente_id, instante),
+                        )
+                        cls.vendas[(dia, nome)] = cur.fetchone()
+            conn.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM vendas WHERE produto_id = %s", (cls.produto_id,))
+                cur.execute("DELETE FROM produtos WHERE id = %s", (cls.produto_id,))
+            conn.commit()
+
+    def _ids(self, dia, *nomes):
+        return {self.vendas[(dia, nome)][0] for nome in nomes}
+
+    def _ids_no_periodo(self, inicio, fim):
+        return {row[0] for row in VendaModel().get_by_period(inicio, fim)} & {v[0] for v in self.vendas.values()}
+
+    def test_particoes_usadas(self):
+        self.assertEqual(self.vendas[(self.dia_antigo, "ultimo")][1], "vendas_default")
+        self.assertNotEqual(self.vendas[(self.fim_do_mes, "ultimo")][1], "vendas_default")
+        self.assertNotEqual(self.vendas[(self.fim_do_mes, "ultimo")][1],
+                            self.vendas[(self.fim_do_mes, "seguinte")][1])
+
+    def test_fim_so_com_data(self):
+        for dia in (self.fim_do_mes, self.dia_antigo):
+            with self.subTest(dia=dia):
+                self.assertEqual(self._ids_no_periodo(dia.isoformat(), dia.isoformat()),
+                                 self._ids(dia, "inicio", "ultimo"))
+                self.assertEqual(self._ids_no_periodo(dia, dia), self._ids(dia, "inicio", "ultimo"))
+
+    def test_fim_com_hora(self):
+        for dia in (self.fim_do_mes, self.dia_antigo):
+            with self.subTest(dia=dia):
+                meio_dia = datetime.combine(dia, datetime.min.time()).replace(hour=12)
+                self.assertEqual(self._ids_no_periodo(dia.isoformat(), meio_dia.isoformat(" ")),
+                                 self._ids(dia, "inicio"))
+                seguinte = datetime.combine(dia + timedelta(days=1), datetime.min.time())
+                self.assertEqual(self._ids_no_periodo(dia, seguinte),
+                                 self._ids(dia, "inicio", "ultimo", "seguinte"))
+
+    @unittest.skipIf(_period_bounds is None, "asyncpg não instalado")
+    def test_versao_assincrona(self):
+        async def consulta(inicio, fim):
+            try:
+                return await AsyncVendaModel().get_by_period(inicio, fim)
+            finally:
+                await close_async_pool()
+
+        todas = {v[0] for v in self.vendas.values()}
+        for dia in (self.fim_do_mes, self.dia_antigo):
+            with self.subTest(dia=dia):
+                rows = asyncio.run(consulta(dia.isoformat(), dia.isoformat()))
+                self.assertEqual({row[0] for row in rows} & todas, self._ids(dia, "inicio", "ultimo"))
+
+
+if __name__ == "__main__":
+    unittest.main()